@@ -0,0 +1,189 @@
+"""
+범용 캐시 저장소
+
+프로세스 내 LRU 캐시와 SQLite 기반 디스크 캐시를 제공합니다.
+- LRUCache: 메모리 캐시 (최대 개수 + 선택적 TTL)
+- SQLiteCache: 디스크 캐시 (최대 용량 + 선택적 TTL, 여러 워커 프로세스가 공유 가능)
+- normalize_query_text: 캐시 키용 쿼리 정규화
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def normalize_query_text(text: str) -> str:
+    """
+    캐시 키용 텍스트 정규화
+
+    유니코드 정규화(NFKC) + 연속 공백 압축 + 앞뒤 공백 제거
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class LRUCache:
+    """
+    스레드 안전한 메모리 LRU 캐시
+
+    max_items를 넘으면 가장 오래 사용되지 않은 항목부터 제거하고,
+    ttl_seconds가 설정되면 만료된 항목은 조회 시점에 제거합니다.
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: Optional[float] = None):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """키에 해당하는 값 반환 (없거나 만료되면 None)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)  # 최근 사용으로 갱신
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """값 저장 (용량 초과 시 LRU 항목 제거)"""
+        if self.max_items <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """모든 항목 제거"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    SQLite 기반 디스크 캐시 (key → bytes)
+
+    같은 호스트의 여러 uvicorn 워커가 하나의 파일을 공유할 수 있도록 WAL 모드를 사용합니다.
+    전체 값 크기가 max_bytes를 넘으면 마지막 접근 시각이 오래된 항목부터 제거합니다.
+    DB 파일은 처음 get/set할 때 엽니다 (모듈 import만으로 파일을 만들지 않음).
+    get/set은 블로킹 I/O이므로 이벤트 루프에서는 asyncio.to_thread 등으로 호출해야 합니다.
+    """
+
+    # 매 set마다 용량을 검사하지 않고 일정 횟수마다 검사 (쓰기 비용 절감)
+    EVICT_CHECK_INTERVAL = 64
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: Optional[float] = None, table: str = "cache"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.table = table
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """DB 연결 (첫 사용 시 파일 / 테이블 생성, lock 보유 상태에서 호출)"""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed ON {self.table} (accessed_at)")
+            self._db = conn
+        return self._db
+
+    @property
+    def opened(self) -> bool:
+        """DB 파일이 열렸는지 여부 (열기 전 실패와 조회 실패 구분용)"""
+        return self._db is not None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """키에 해당하는 값 반환 (없거나 만료되면 None)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds and created_at + self.ttl_seconds < now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        """값 저장 (주기적으로 용량 초과분 제거)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now)
+            )
+            self._writes_since_check += 1
+            if self._writes_since_check >= self.EVICT_CHECK_INTERVAL:
+                self._writes_since_check = 0
+                self._evict()
+
+    def _evict(self) -> None:
+        """만료 항목 및 용량 초과분 제거 (lock 보유 상태에서 호출)"""
+        if self.ttl_seconds:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # 오래 접근되지 않은 항목부터 누적 크기가 초과분을 넘을 때까지 삭제
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        rows = self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
+
+    def clear(self) -> None:
+        """모든 항목 제거"""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
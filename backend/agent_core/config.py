@@ -5,9 +5,13 @@
 """
 
 import os
+import asyncio
+import tempfile
+import weakref
+import httpx
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from openai import OpenAI
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
 
 # 환경 변수 로드
 load_dotenv()
@@ -26,6 +30,143 @@ qdrant_client = QdrantClient(
 # OpenAI 클라이언트 (Embedding 및 Agent용)
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# ----- 비동기 클라이언트 (async Tool 전용) -----
+# asyncio.to_thread 없이 이벤트 루프에서 직접 await → 기본 스레드풀 크기에 동시성이 묶이지 않음
+
+# HTTP 커넥션 풀 설정 (keep-alive 재사용으로 TCP/TLS 핸드셰이크 생략)
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30"))
+
+# 이벤트 루프별 비동기 클라이언트 보관소
+# httpx 커넥션은 생성된 루프에 묶이므로, 동기 뷰의 asyncio.run()처럼 다른 루프에서 호출돼도
+# 안전하도록 루프마다 하나씩 생성 (uvicorn 워커에서는 사실상 싱글톤)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def _http_pool_limits() -> httpx.Limits:
+    """비동기 클라이언트 공통 커넥션 풀 설정"""
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY
+    )
+
+
+def _loop_clients() -> dict:
+    """현재 실행 중인 이벤트 루프의 클라이언트 딕셔너리 반환"""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        clients = {}
+        _async_clients[loop] = clients
+    return clients
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """
+    비동기 Qdrant 클라이언트 반환 (현재 이벤트 루프 기준 싱글톤)
+
+    코루틴 안에서만 호출하세요.
+    """
+    clients = _loop_clients()
+    if "qdrant" not in clients:
+        clients["qdrant"] = AsyncQdrantClient(
+            url=os.getenv("QDRANT_URL"),
+            api_key=os.getenv("QDRANT_API_KEY"),
+            timeout=60,
+            limits=_http_pool_limits()
+        )
+    return clients["qdrant"]
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    비동기 OpenAI 클라이언트 반환 (현재 이벤트 루프 기준 싱글톤)
+
+    코루틴 안에서만 호출하세요.
+    """
+    clients = _loop_clients()
+    if "openai" not in clients:
+        clients["openai"] = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=DefaultAsyncHttpxClient(limits=_http_pool_limits())
+        )
+    return clients["openai"]
+
+
+# Reranker(RunPod 프록시) 전용 HTTP 클라이언트 설정
+# 매 호출마다 TCP+TLS 핸드셰이크를 하지 않도록 keep-alive 커넥션을 재사용
+RERANKER_HTTP2 = os.getenv("RERANKER_HTTP2", "false").lower() in ("1", "true", "yes")  # h2 패키지 필요
+RERANKER_POOL_MAX_CONNECTIONS = int(os.getenv("RERANKER_POOL_MAX_CONNECTIONS", "20"))
+RERANKER_POOL_MAX_KEEPALIVE = int(os.getenv("RERANKER_POOL_MAX_KEEPALIVE", "10"))
+RERANKER_POOL_KEEPALIVE_EXPIRY = float(os.getenv("RERANKER_POOL_KEEPALIVE_EXPIRY", "60"))
+RERANKER_CONNECT_TIMEOUT = float(os.getenv("RERANKER_CONNECT_TIMEOUT", "5"))
+RERANKER_REQUEST_TIMEOUT = float(os.getenv("RERANKER_REQUEST_TIMEOUT", "30"))  # 읽기/쓰기/풀 대기 타임아웃
+
+
+def _http2_available() -> bool:
+    """HTTP/2 사용 가능 여부 (httpx의 HTTP/2 지원은 h2 패키지가 있어야 함)"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_async_reranker_client() -> httpx.AsyncClient:
+    """
+    Reranker API용 비동기 HTTP 클라이언트 반환 (현재 이벤트 루프 기준 싱글톤)
+
+    keep-alive 커넥션 풀을 재사용하므로 Reranker 호출은 추론 시간만 부담합니다.
+    코루틴 안에서만 호출하세요.
+    """
+    clients = _loop_clients()
+    if "reranker" not in clients:
+        http2 = RERANKER_HTTP2
+        if http2 and not _http2_available():
+            print("⚠️ RERANKER_HTTP2=true 이지만 h2 패키지가 없어 HTTP/1.1로 연결합니다 (pip install 'httpx[http2]')")
+            http2 = False
+
+        clients["reranker"] = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(RERANKER_REQUEST_TIMEOUT, connect=RERANKER_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=RERANKER_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=RERANKER_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=RERANKER_POOL_KEEPALIVE_EXPIRY
+            ),
+            headers={"Content-Type": "application/json"}
+        )
+    return clients["reranker"]
+
+
+async def close_async_clients():
+    """현재 이벤트 루프의 비동기 클라이언트 종료 (ASGI shutdown / run_with_async_clients 종료 시 호출)"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    if "qdrant" in clients:
+        await clients["qdrant"].close()
+    if "openai" in clients:
+        await clients["openai"].close()
+    if "reranker" in clients:
+        await clients["reranker"].aclose()
+
+
+def run_with_async_clients(coro):
+    """
+    동기 코드(Django 동기 뷰)에서 코루틴 실행
+
+    asyncio.run()은 요청마다 새 이벤트 루프를 만들기 때문에 그 루프에서 생성된
+    비동기 클라이언트(커넥션 풀)를 루프가 끝나기 전에 닫아서 소켓이 새지 않게 함
+    """
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await close_async_clients()
+
+    return asyncio.run(runner())
+
 # =====================================================================
 # 설정 상수
 # =====================================================================
@@ -41,8 +182,48 @@ COLLECTION_NAME = COLLECTION_KNOWLEDGE
 EMBEDDING_MODEL = "text-embedding-3-large"  # OpenAI Embedding 모델
 VECTOR_SIZE = 3072  # text-embedding-3-large 차원
 
+# Embedding 캐시 설정 (동일 질문 반복 시 OpenAI 호출 생략)
+EMBEDDING_CACHE_MAX_ITEMS = int(os.getenv("EMBEDDING_CACHE_MAX_ITEMS", "2048"))  # 메모리 LRU 최대 개수
+# 디스크 캐시 경로 (빈 문자열이면 디스크 캐시 비활성화, 같은 호스트의 워커끼리 공유)
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "trade_embedding_cache.sqlite3")
+)
+EMBEDDING_CACHE_MAX_DISK_MB = int(os.getenv("EMBEDDING_CACHE_MAX_DISK_MB", "512"))  # 디스크 캐시 최대 용량
+
+# 단순 질문 Fast-path 사용 여부
+# True: "~란?", "절차", "주의사항", 짧은 질문 등은 로컬 규칙으로 판별해서 쿼리 변환 LLM 호출 생략
+# False: 모든 질문을 LLM으로 변환
+USE_QUERY_FAST_PATH = True  # 기본값
+
+# 추측 검색(Speculative retrieval) 사용 여부
+# True: 쿼리 변환 LLM 호출과 동시에 원본 쿼리로 Embedding+검색 → 단일 쿼리 결과면 재사용
+# False: 쿼리 변환 완료 후 검색 (순차)
+USE_SPECULATIVE_SEARCH = True  # 기본값
+# 변환 결과가 단일 쿼리일 때 추측 후보 처리 방식
+# "reuse": 추측 후보를 그대로 사용 (두 번째 검색 없음, Rerank는 개선된 쿼리 기준)
+# "merge": 개선된 쿼리로도 검색해서 추측 후보와 병합 (재현율 우선, 지연 절감 없음)
+SPECULATIVE_SEARCH_MODE = "reuse"  # 기본값
+
+# 스트리밍 분해 사용 여부
+# True: 쿼리 변환 응답을 스트리밍으로 받으면서 서브쿼리가 완성되는 즉시 해당 검색 시작 (LLM 디코딩과 검색 병행)
+# False: 변환 JSON이 모두 도착한 뒤 서브쿼리 전체를 배치 검색
+USE_STREAMED_DECOMPOSITION = True  # 기본값
+
+# 쿼리 변환(rewrite/decompose) LLM 호출 타임아웃 (초) - 초과 시 원본 쿼리로 검색
+QUERY_TRANSFORM_TIMEOUT = float(os.getenv("QUERY_TRANSFORM_TIMEOUT", "8"))
+
+# 쿼리 변환 결과 캐시 설정 (프롬프트가 바뀌면 자동 무효화)
+QUERY_TRANSFORM_CACHE_MAX_ITEMS = int(os.getenv("QUERY_TRANSFORM_CACHE_MAX_ITEMS", "1024"))  # 메모리 최대 개수
+QUERY_TRANSFORM_CACHE_TTL = float(os.getenv("QUERY_TRANSFORM_CACHE_TTL", "86400"))  # 유효 시간 (초, 기본 1일)
+# 공유 캐시(SQLite) 경로 - 비워두면 프로세스 내 캐시만 사용
+QUERY_TRANSFORM_CACHE_PATH = os.getenv("QUERY_TRANSFORM_CACHE_PATH", "")
+QUERY_TRANSFORM_CACHE_MAX_DISK_MB = int(os.getenv("QUERY_TRANSFORM_CACHE_MAX_DISK_MB", "64"))
+
 # Reranker 설정
 RERANKER_API_URL = os.getenv("RERANKER_API_URL", "http://your-runpod-server/rerank")  # Reranker API 엔드포인트
+# 배치 Reranker API 엔드포인트 (기본: RERANKER_API_URL + "/batch")
+RERANKER_BATCH_API_URL = os.getenv("RERANKER_BATCH_API_URL", RERANKER_API_URL.rstrip("/") + "/batch")
 
 # Reranker 사용 여부 (실행 시 설정됨)
 USE_RERANKER = True  # 기본값
@@ -50,6 +231,68 @@ USE_RERANKER = True  # 기본값
 # True: 각 서브 쿼리마다 개별 rerank → 모든 토픽 균형 보장
 # False: 통합 rerank → 전체 품질 우선 (일부 토픽 누락 가능)
 USE_PER_QUERY_RERANK = True  # 기본값
+# 개별 Rerank 시 동시에 보낼 최대 Reranker 호출 수 / 호출당 타임아웃 (초)
+RERANK_MAX_CONCURRENCY = int(os.getenv("RERANK_MAX_CONCURRENCY", "4"))
+RERANK_TIMEOUT = float(os.getenv("RERANK_TIMEOUT", "10"))
+# 개별 Rerank를 배치 엔드포인트(/rerank/batch) 1회 호출로 처리할지 여부
+# True: 서브 쿼리 전체를 한 번에 전송 (실패 시 서브 쿼리별 동시 호출로 대체)
+# False: 서브 쿼리마다 /rerank 호출
+USE_BATCH_RERANK = True  # 기본값
+# Rerank 점수 분포 기반 적응형 top_k 사용 여부
+# True: top_k개(최대 RERANK_ADAPTIVE_MAX_K개)를 받은 뒤 점수 임계값 / 점수 간격(elbow) 기준으로 더 줄일 수 있음
+# False: 항상 top_k개 전달
+USE_ADAPTIVE_TOP_K = True  # 기본값
+RERANK_ADAPTIVE_MIN_K = int(os.getenv("RERANK_ADAPTIVE_MIN_K", "3"))  # 점수가 낮아도 최소 전달 개수
+RERANK_ADAPTIVE_MAX_K = int(os.getenv("RERANK_ADAPTIVE_MAX_K", "10"))  # 최대 전달 개수 (Tool의 top_k가 더 작으면 top_k)
+# Rerank 점수(logit)가 이 값보다 낮으면 제외
+RERANK_SCORE_THRESHOLD = float(os.getenv("RERANK_SCORE_THRESHOLD", "-2.0"))
+# 1위 점수보다 이 값 이상 낮으면 제외
+RERANK_SCORE_MARGIN = float(os.getenv("RERANK_SCORE_MARGIN", "6.0"))
+# 인접 문서 간 점수 차이가 이 값 이상이면 그 지점(elbow)에서 자름
+RERANK_SCORE_GAP = float(os.getenv("RERANK_SCORE_GAP", "2.0"))
+
+# 검색 결과 토큰 예산 패킹 사용 여부
+# True: 청크를 tiktoken 토큰 수로 재서 순위 순서대로 CONTEXT_TOKEN_BUDGET 안에 채움 (문장 경계에서 자르고 연속 중복 라인 제거)
+# False: 청크마다 앞 500자만 전달
+USE_TOKEN_BUDGET_PACKING = True  # 기본값
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))  # 검색 1회 Tool 출력 전체 토큰 예산
+CONTEXT_CHUNK_MAX_TOKENS = int(os.getenv("CONTEXT_CHUNK_MAX_TOKENS", "700"))  # 청크 1개 최대 토큰 수
+CONTEXT_TOKEN_ENCODING = os.getenv("CONTEXT_TOKEN_ENCODING", "o200k_base")  # Agent 모델(gpt-5.1) 토크나이저
+
+# Reranker 문서 해시 전송 사용 여부
+# True: 청크 본문 대신 SHA-256 해시만 전송 (서버가 모르는 해시만 본문 전송 → 요청 크기 대폭 감소)
+# False: 매번 청크 본문 전체 전송
+USE_RERANK_DOC_HASHES = True  # 기본값
+# 서버에 이미 보낸 것으로 기억할 해시 개수 (서버 문서 저장소 크기보다 작게)
+RERANK_SENT_HASH_CACHE_ITEMS = int(os.getenv("RERANK_SENT_HASH_CACHE_ITEMS", "20000"))
+
+# Reranker 동일 요청 합치기(singleflight) 사용 여부
+# True: 같은 (query, documents, top_k) 요청이 동시에 진행 중이면 HTTP 1회만 보내고 결과 공유 (인기 질문 동시 폭주 완화)
+# False: 요청마다 개별 전송
+USE_RERANK_SINGLEFLIGHT = True  # 기본값
+
+# Reranker 서킷 브레이커 (Reranker 장애/지연 시 Rerank를 건너뛰고 즉시 검색 점수 순서 사용)
+# 최근 RERANK_BREAKER_WINDOW회 호출 중 실패율 또는 느린 호출 비율이 임계값 이상이면 열림
+RERANK_BREAKER_WINDOW = int(os.getenv("RERANK_BREAKER_WINDOW", "20"))
+RERANK_BREAKER_MIN_CALLS = int(os.getenv("RERANK_BREAKER_MIN_CALLS", "5"))  # 판단에 필요한 최소 호출 수
+RERANK_BREAKER_FAILURE_RATE = float(os.getenv("RERANK_BREAKER_FAILURE_RATE", "0.5"))
+RERANK_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("RERANK_BREAKER_SLOW_CALL_SECONDS", "3"))
+RERANK_BREAKER_SLOW_CALL_RATE = float(os.getenv("RERANK_BREAKER_SLOW_CALL_RATE", "0.5"))
+RERANK_BREAKER_OPEN_SECONDS = float(os.getenv("RERANK_BREAKER_OPEN_SECONDS", "30"))  # 열린 후 복구 확인까지 대기
+
+# Reranker 헤지 요청 사용 여부
+# True: 첫 요청이 최근 p95 응답 시간 안에 끝나지 않으면 같은 요청을 한 번 더 보내고 먼저 온 응답 사용
+# False: 요청 1회만 전송
+USE_RERANK_HEDGING = False  # 기본값
+RERANK_HEDGE_PERCENTILE = float(os.getenv("RERANK_HEDGE_PERCENTILE", "0.95"))
+RERANK_HEDGE_MIN_SAMPLES = int(os.getenv("RERANK_HEDGE_MIN_SAMPLES", "20"))  # 이보다 샘플이 적으면 최대 지연 사용
+RERANK_HEDGE_MIN_DELAY = float(os.getenv("RERANK_HEDGE_MIN_DELAY", "0.2"))  # 헤지 지연 하한 (초)
+RERANK_HEDGE_MAX_DELAY = float(os.getenv("RERANK_HEDGE_MAX_DELAY", "2"))  # 헤지 지연 상한 (초)
+
+# Qdrant 배치 검색 사용 여부
+# True: 모든 서브 쿼리를 query_batch_points 1회 요청으로 검색 (원격 Qdrant 왕복 최소화)
+# False: 서브 쿼리마다 query_points 개별 요청
+USE_BATCH_SEARCH = True  # 기본값
 
 
 # =====================================================================
@@ -1,5 +1,19 @@
 """Reranker API 모델 패키지"""
 
-from .reranker import RerankRequest, RerankResult, RerankResponse
+from .reranker import (
+    RerankRequest,
+    RerankResult,
+    RerankResponse,
+    RerankGroup,
+    RerankBatchRequest,
+    RerankBatchResponse,
+)
 
-__all__ = ["RerankRequest", "RerankResult", "RerankResponse"]
+__all__ = [
+    "RerankRequest",
+    "RerankResult",
+    "RerankResponse",
+    "RerankGroup",
+    "RerankBatchRequest",
+    "RerankBatchResponse",
+]
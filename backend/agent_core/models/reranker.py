@@ -4,7 +4,7 @@ Reranker API 모델 정의 (Pydantic)
 RunPod 서버와 통신하기 위한 요청/응답 데이터 모델
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -15,9 +15,11 @@ class RerankRequest(BaseModel):
     RunPod 서버로 전송할 리랭킹 요청 데이터 구조
     """
     query: str = Field(..., description="검색 쿼리")
-    documents: List[str] = Field(..., description="리랭킹할 문서 리스트")
+    documents: List[str] = Field(default_factory=list, description="리랭킹할 문서 리스트")
+    document_hashes: Optional[List[str]] = Field(default=None, description="문서 본문 SHA-256 해시 리스트 (documents 대신 사용)")
+    document_texts: Dict[str, str] = Field(default_factory=dict, description="서버에 없을 수 있는 문서의 {해시: 본문}")
     top_k: int = Field(default=5, ge=1, le=100, description="반환할 상위 문서 개수")
-    return_documents: bool = Field(default=True, description="문서 내용 포함 여부")
+    return_documents: bool = Field(default=False, description="문서 내용 포함 여부")
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -54,3 +56,35 @@ class RerankResponse(BaseModel):
     results: List[RerankResult]  # 재정렬된 문서 리스트
     query: str  # 원본 쿼리
     total_documents: int  # 총 문서 개수
+    missing_hashes: List[str] = []  # 서버에 본문이 없는 해시 (있으면 results는 비어 있음)
+
+
+class RerankGroup(BaseModel):
+    """
+    배치 리랭킹 그룹 (쿼리 1개 + 문서 리스트 + top_k)
+    """
+    query: str = Field(..., description="검색 쿼리")
+    documents: List[str] = Field(default_factory=list, description="리랭킹할 문서 리스트")
+    document_hashes: Optional[List[str]] = Field(default=None, description="문서 본문 SHA-256 해시 리스트 (documents 대신 사용)")
+    top_k: int = Field(default=5, ge=1, le=100, description="반환할 상위 문서 개수")
+
+
+class RerankBatchRequest(BaseModel):
+    """
+    배치 Reranker API 요청 모델
+
+    서브 쿼리별 리랭킹을 한 번의 요청으로 전송 (POST /rerank/batch)
+    """
+    groups: List[RerankGroup] = Field(..., description="리랭킹 그룹 리스트")
+    document_texts: Dict[str, str] = Field(default_factory=dict, description="서버에 없을 수 있는 문서의 {해시: 본문} (그룹 공용)")
+    return_documents: bool = Field(default=False, description="문서 내용 포함 여부")
+
+
+class RerankBatchResponse(BaseModel):
+    """
+    배치 Reranker API 응답 모델
+
+    groups와 같은 순서의 그룹별 리랭킹 결과
+    """
+    results: List[RerankResponse]
+    missing_hashes: List[str] = []  # 서버에 본문이 없는 해시 (있으면 results는 비어 있음)
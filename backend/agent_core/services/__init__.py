@@ -1,5 +1,15 @@
-"""Reranker 서비스 패키지"""
+"""Reranker / Embedding / 쿼리 변환 서비스 패키지"""
 
-from .reranker_service import call_reranker_api
+from .reranker_service import call_reranker_api, call_reranker_batch_api, reranker_breaker
+from .embedding_service import get_query_embedding, get_query_embeddings, embedding_cache
+from .query_transform_cache import query_transform_cache
 
-__all__ = ["call_reranker_api"]
+__all__ = [
+    "call_reranker_api",
+    "call_reranker_batch_api",
+    "reranker_breaker",
+    "get_query_embedding",
+    "get_query_embeddings",
+    "embedding_cache",
+    "query_transform_cache",
+]
@@ -0,0 +1,210 @@
+"""
+외부 의존성 보호용 서킷 브레이커 + 헤지(Hedged) 요청
+
+Reranker(RunPod)가 느리거나 죽었을 때 매 검색마다 타임아웃까지 기다리지 않도록 함
+- CircuitBreaker: 최근 호출의 실패율/지연 비율이 임계값을 넘으면 열림(OPEN) → 호출 즉시 거절
+  open_seconds가 지나면 반열림(HALF_OPEN) 상태에서 탐색 호출 1건만 허용해서 복구 여부 확인
+- LatencyTracker: 최근 응답 시간 분포 (헤지 지연 계산용 p95)
+- hedged_call: 첫 요청이 delay 안에 끝나지 않으면 같은 요청을 한 번 더 보내고 먼저 끝난 결과 사용
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """서킷 브레이커가 열려 있어 호출을 건너뜀"""
+
+
+class CircuitBreaker:
+    """
+    실패율 + 느린 호출 비율 기반 서킷 브레이커
+
+    Args:
+        name: 로그에 표시할 의존성 이름
+        window_size: 판단에 사용할 최근 호출 개수
+        min_calls: 이 개수 이상 기록돼야 열림 여부를 판단
+        failure_rate_threshold: 실패 비율이 이 값 이상이면 열림
+        slow_call_seconds: 이 시간 이상 걸린 호출은 느린 호출로 집계
+        slow_call_rate_threshold: 느린 호출 비율이 이 값 이상이면 열림
+        open_seconds: 열린 뒤 탐색 호출을 허용하기까지 대기 시간
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 3.0,
+        slow_call_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+
+        self.state = self.CLOSED
+        self._window: deque = deque(maxlen=window_size)  # (실패 여부, 느린 호출 여부)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        호출 전 검사 (열려 있으면 CircuitOpenError)
+
+        반열림 상태에서는 탐색 호출 1건만 통과시킴
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(f"{self.name} 서킷 브레이커 열림 ({remaining:.0f}초 후 재시도)")
+                self.state = self.HALF_OPEN
+                print(f"🟡 {self.name} 서킷 브레이커 반열림 - 복구 확인용 호출 1건 허용")
+
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(f"{self.name} 서킷 브레이커 반열림 (복구 확인 중)")
+                self._probe_in_flight = True
+
+    def record_success(self, latency: float) -> None:
+        """성공한 호출 기록 (느린 호출이면 느린 호출로도 집계)"""
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if slow:
+                    self._trip(f"복구 확인 호출 지연 {latency:.1f}초")
+                else:
+                    self.state = self.CLOSED
+                    self._window.clear()
+                    print(f"🟢 {self.name} 서킷 브레이커 닫힘 - 정상 복구")
+                return
+
+            self._window.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self) -> None:
+        """실패한 호출 기록 (에러 또는 타임아웃)"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._trip("복구 확인 호출 실패")
+                return
+
+            self._window.append((True, True))
+            self._evaluate()
+
+    def release_probe(self) -> None:
+        """
+        결과 판단 없이 끝난 호출 정리 (빠르게 취소된 호출 등)
+
+        반열림 상태의 탐색 호출이었다면 탐색 슬롯을 풀어서 다음 호출이 다시 복구 확인을 하도록 함
+        (풀지 않으면 이후 모든 호출이 "복구 확인 중"으로 거절됨)
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _evaluate(self) -> None:
+        """최근 호출 통계로 열림 여부 판단 (lock 보유 상태에서 호출)"""
+        if self.state != self.CLOSED or len(self._window) < self.min_calls:
+            return
+
+        total = len(self._window)
+        failure_rate = sum(1 for failed, _ in self._window if failed) / total
+        slow_rate = sum(1 for _, slow in self._window if slow) / total
+
+        if failure_rate >= self.failure_rate_threshold:
+            self._trip(f"실패율 {failure_rate:.0%}")
+        elif slow_rate >= self.slow_call_rate_threshold:
+            self._trip(f"느린 호출 비율 {slow_rate:.0%} (≥{self.slow_call_seconds}초)")
+
+    def _trip(self, reason: str) -> None:
+        """열림 상태로 전환 (lock 보유 상태에서 호출)"""
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        print(f"🔴 {self.name} 서킷 브레이커 열림: {reason} → {self.open_seconds:.0f}초 동안 호출 생략")
+
+    def stats(self) -> dict:
+        """현재 상태 및 최근 호출 통계"""
+        with self._lock:
+            total = len(self._window)
+            return {
+                "state": self.state,
+                "window_calls": total,
+                "failure_rate": sum(1 for failed, _ in self._window if failed) / total if total else 0.0,
+                "slow_rate": sum(1 for _, slow in self._window if slow) / total if total else 0.0,
+            }
+
+
+class LatencyTracker:
+    """최근 성공 호출의 응답 시간 분포 (백분위 계산용)"""
+
+    def __init__(self, window_size: int = 200):
+        self._samples: deque = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    def add(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q 백분위 응답 시간 (q: 0~1, 샘플이 없으면 None)"""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+async def hedged_call(factory: Callable[[], Awaitable[T]], delay: float) -> T:
+    """
+    헤지 요청: 첫 요청이 delay초 안에 끝나지 않으면 같은 요청을 한 번 더 보내고 먼저 성공한 결과 반환
+
+    멱등(idempotent)한 호출에만 사용하세요. 남은 요청은 취소됩니다.
+
+    Args:
+        factory: 호출할 때마다 새 코루틴을 만드는 함수
+        delay: 헤지 요청을 보내기 전 대기 시간 (초)
+    """
+    primary = asyncio.ensure_future(factory())
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    print(f"   ↪ 헤지 요청 전송 (첫 요청 {delay:.2f}초 초과)")
+    hedge = asyncio.ensure_future(factory())
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
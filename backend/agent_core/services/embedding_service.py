@@ -0,0 +1,218 @@
+"""
+쿼리 Embedding 서비스 (캐시 포함)
+
+같은 Incoterms/CISG 질문이 반복되므로 (EMBEDDING_MODEL, 정규화된 텍스트) 기준으로
+Embedding을 캐싱해서 OpenAI 왕복(150~400ms)과 API 비용을 줄임
+- 1차: 프로세스 내 LRU 캐시
+- 2차: SQLite 디스크 캐시 (float32로 저장, 워커끼리 공유)
+  디스크 조회/저장은 스레드에서 실행해서 이벤트 루프를 막지 않음
+"""
+
+import asyncio
+import hashlib
+from array import array
+from typing import List, Optional
+
+from agent_core.cache import LRUCache, SQLiteCache, normalize_query_text
+from agent_core.config import (
+    get_async_openai_client,
+    EMBEDDING_MODEL,
+    EMBEDDING_CACHE_MAX_ITEMS,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MAX_DISK_MB,
+)
+
+
+class EmbeddingCache:
+    """
+    2단계 Embedding 캐시 (메모리 LRU → 디스크)
+
+    벡터는 float32 배열로 저장해서 메모리/디스크 사용량을 줄임 (3072차원 ≒ 12KB)
+    """
+
+    def __init__(self, model: str, max_items: int, disk_path: str = "", disk_max_mb: int = 0):
+        self.model = model
+        self.memory = LRUCache(max_items=max_items)
+        self.disk: Optional[SQLiteCache] = None
+
+        if disk_path and disk_max_mb > 0:
+            # DB 파일은 첫 조회/저장 시 열림
+            self.disk = SQLiteCache(disk_path, max_bytes=disk_max_mb * 1024 * 1024, table="embeddings")
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def make_key(self, text: str) -> str:
+        """(모델, 정규화 텍스트) 기반 캐시 키 생성"""
+        raw = f"{self.model}\x00{normalize_query_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _disk_failed(self, action: str, error: Exception) -> None:
+        """디스크 캐시 오류 처리 (DB 파일을 열지 못했으면 이후 메모리 캐시만 사용)"""
+        if self.disk is not None and not self.disk.opened:
+            print(f"⚠️ Embedding 디스크 캐시 초기화 실패 (메모리 캐시만 사용): {error}")
+            self.disk = None
+        else:
+            print(f"⚠️ Embedding 디스크 캐시 {action} 실패: {error}")
+
+    def _get_disk(self, key: str) -> Optional[array]:
+        """디스크 캐시 조회 (블로킹, 적중 시 메모리 캐시로 승격)"""
+        disk = self.disk
+        if disk is None:
+            return None
+        try:
+            blob = disk.get(key)
+        except Exception as e:
+            self._disk_failed("조회", e)
+            return None
+        if blob is None:
+            return None
+
+        vector = array("f")
+        vector.frombytes(blob)
+        self.memory.set(key, vector)  # 메모리 캐시로 승격
+        return vector
+
+    def _set_disk(self, key: str, blob: bytes) -> None:
+        """디스크 캐시 저장 (블로킹)"""
+        disk = self.disk
+        if disk is None:
+            return
+        try:
+            disk.set(key, blob)
+        except Exception as e:
+            self._disk_failed("저장", e)
+
+    def _count(self, vector: Optional[array], from_memory: bool) -> Optional[List[float]]:
+        """적중/미스 통계 갱신 후 리스트로 변환"""
+        if vector is None:
+            self.misses += 1
+            return None
+        if from_memory:
+            self.memory_hits += 1
+        else:
+            self.disk_hits += 1
+        return vector.tolist()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """캐시된 벡터 반환 (없으면 None, 디스크 조회는 현재 스레드에서 실행)"""
+        key = self.make_key(text)
+        vector = self.memory.get(key)
+        if vector is not None:
+            return self._count(vector, from_memory=True)
+        return self._count(self._get_disk(key), from_memory=False)
+
+    async def aget(self, text: str) -> Optional[List[float]]:
+        """get의 비동기 버전 (메모리 미스일 때만 디스크 조회를 스레드에서 실행)"""
+        key = self.make_key(text)
+        vector = self.memory.get(key)
+        if vector is not None:
+            return self._count(vector, from_memory=True)
+        if self.disk is None:
+            return self._count(None, from_memory=False)
+        return self._count(await asyncio.to_thread(self._get_disk, key), from_memory=False)
+
+    def set(self, text: str, embedding: List[float]) -> None:
+        """벡터를 메모리/디스크 캐시에 저장 (디스크 저장은 현재 스레드에서 실행)"""
+        key = self.make_key(text)
+        vector = array("f", embedding)
+        self.memory.set(key, vector)
+        self._set_disk(key, vector.tobytes())
+
+    def aset(self, text: str, embedding: List[float]) -> None:
+        """
+        이벤트 루프용 저장: 메모리 캐시에 바로 넣고 디스크 저장은 스레드 풀에서 진행 (write-through)
+
+        결과를 기다리지 않으므로 호출 측 응답이 디스크 쓰기만큼 늦어지지 않음
+        """
+        key = self.make_key(text)
+        vector = array("f", embedding)
+        self.memory.set(key, vector)
+        if self.disk is not None:
+            asyncio.get_running_loop().run_in_executor(None, self._set_disk, key, vector.tobytes())
+
+    def stats(self) -> dict:
+        """캐시 적중/미스 통계"""
+        total = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_items": len(self.memory),
+        }
+
+
+# 전역 캐시 인스턴스 (모든 검색 Tool이 공유)
+embedding_cache = EmbeddingCache(
+    model=EMBEDDING_MODEL,
+    max_items=EMBEDDING_CACHE_MAX_ITEMS,
+    disk_path=EMBEDDING_CACHE_PATH,
+    disk_max_mb=EMBEDDING_CACHE_MAX_DISK_MB,
+)
+
+
+async def get_query_embedding(text: str) -> List[float]:
+    """
+    쿼리 텍스트의 Embedding 벡터 반환 (캐시 우선)
+
+    Args:
+        text: 검색 쿼리
+
+    Returns:
+        List[float]: Embedding 벡터
+    """
+    cached = await embedding_cache.aget(text)
+    if cached is not None:
+        return cached
+
+    response = await get_async_openai_client().embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=normalize_query_text(text)
+    )
+    embedding = response.data[0].embedding
+    embedding_cache.aset(text, embedding)
+    return embedding
+
+
+async def get_query_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    여러 쿼리의 Embedding을 한 번에 반환 (캐시 우선 + 미스만 1회 배치 호출)
+
+    서브쿼리 4개 → HTTP 요청 4번 대신 1번 (Embeddings API는 list 입력 지원)
+
+    Args:
+        texts: 검색 쿼리 리스트
+
+    Returns:
+        List[List[float]]: 입력 순서와 동일한 순서의 Embedding 벡터 리스트
+    """
+    embeddings: List[Optional[List[float]]] = list(
+        await asyncio.gather(*(embedding_cache.aget(text) for text in texts))
+    )
+
+    # 캐시 미스만 모아서 중복 제거 (정규화 텍스트 기준)
+    missing: List[str] = []
+    for text, embedding in zip(texts, embeddings):
+        normalized = normalize_query_text(text)
+        if embedding is None and normalized not in missing:
+            missing.append(normalized)
+
+    if missing:
+        response = await get_async_openai_client().embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=missing
+        )
+        # 응답 순서가 아닌 index 기준으로 원래 텍스트에 매핑
+        fetched = {missing[item.index]: item.embedding for item in response.data}
+        for normalized, embedding in fetched.items():
+            embedding_cache.aset(normalized, embedding)
+
+        embeddings = [
+            embedding if embedding is not None else fetched[normalize_query_text(text)]
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+    return embeddings
@@ -0,0 +1,195 @@
+"""
+쿼리 변환 Fast-path 분류기
+
+QUERY_TRANSFORM_PROMPT D섹션("과도한 분해 방지 규칙")에서 분해하지 않는다고 정한 질문은
+LLM 호출 없이 로컬 규칙으로 판별해서 rewrite_and_decompose_query를 건너뜀
+- "~란?", "~의 정의" 같은 단일 개념 질문
+- "절차", "과정", "단계", "흐름" 같은 프로세스 질문
+- "주의사항", "고려사항" 같은 포괄적 키워드 질문
+- 아주 짧은 질문
+
+반대로 C섹션(숨겨진 의도)이나 비교/나열 신호가 있으면 항상 LLM에게 넘김 (보수적 판단)
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from agent_core.cache import normalize_query_text
+from agent_core.models.query_transformer import QueryTransformResult
+
+
+# ===== 분해 불필요 신호 (D섹션) =====
+
+# D-1) 포괄적 키워드
+COMPREHENSIVE_KEYWORDS = ("주의사항", "주의할 점", "고려사항", "필요사항", "요구사항", "체크리스트")
+
+# D-2) 절차/프로세스
+PROCESS_KEYWORDS = ("절차", "과정", "단계", "흐름", "프로세스")
+
+# D-3) 단일 개념 설명 요청 ("FOB란?", "신용장이란 무엇인가요?", "CISG의 정의")
+DEFINITION_PATTERN = re.compile(
+    r"(이?란|의\s*정의|뜻)(\s*(무엇인가요|무엇입니까|무엇|뭐야|뭔가요|뭐예요))?\s*[?？]?$"
+    r"|(무엇인가요|무엇입니까|뭐야|뭔가요|뭐예요)\s*[?？]?$"
+)
+
+# 아주 짧은 질문 기준 (정규화 후 글자 수)
+SHORT_QUERY_MAX_CHARS = 12
+
+# 이보다 길면 복합 질문일 가능성이 높으므로 LLM 판단에 맡김
+FAST_PATH_MAX_CHARS = 40
+
+
+# ===== 분해 필요 신호 (B/C섹션, D-5) - 하나라도 있으면 Fast-path 사용 안 함 =====
+
+# 비교/선택 (C-3 인코텀즈 의도 감지 포함)
+COMPARE_KEYWORDS = ("비교", "차이", "vs", "대비", "장단점", "나을까", "나아", "뭐가 더", "어느")
+
+# 여러 정보 단위 나열
+CONJUNCTION_PATTERN = re.compile(r"(랑|하고|그리고|및|[,/&])|[와과]\s")
+
+# C-1/C-2) 사기·실체성·계약 공백 암시 신호
+IMPLICIT_INTENT_KEYWORDS = (
+    "사기", "진짜", "실체", "믿을", "의심", "수상", "이상", "확인하고", "바로 계약", "급하게",
+    "명시", "안 적", "적지 않", "정하지 않", "구두", "지연", "늦어", "예상 못", "클레임", "분쟁",
+)
+
+# C-4) 고위험 지역 (지역별 리스크 서브쿼리 필요)
+HIGH_RISK_REGIONS = ("두바이", "UAE", "홍콩", "중국", "남미", "아프리카")
+
+# "이란"(Iran)은 "신용장이란"의 "이란"과 글자가 같으므로 단어 첫머리에 올 때만 지역명으로 봄
+# ("이란 수출 절차", "이란으로 수출"은 고위험 지역 / "신용장이란?"은 정의 질문)
+HIGH_RISK_REGION_PATTERN = re.compile(r"(?<!\S)이란")
+
+INCOTERMS_PATTERN = re.compile(r"\b(EXW|FCA|FAS|FOB|CFR|CIF|CPT|CIP|DAP|DPU|DDP)\b", re.IGNORECASE)
+
+
+def _decomposition_signal(query: str) -> Optional[str]:
+    """분해가 필요할 수 있는 신호를 찾으면 그 이유를 반환 (없으면 None)"""
+    lowered = query.lower()
+
+    if len(query) > FAST_PATH_MAX_CHARS:
+        return "긴 질문"
+    if query.count("?") + query.count("？") > 1:
+        return "여러 개의 질문"
+    if any(keyword in lowered for keyword in COMPARE_KEYWORDS):
+        return "비교/선택 질문"
+    if CONJUNCTION_PATTERN.search(query):
+        return "나열/접속 표현"
+    if any(keyword in query for keyword in IMPLICIT_INTENT_KEYWORDS):
+        return "숨겨진 의도 신호"
+    if any(region.lower() in lowered for region in HIGH_RISK_REGIONS) or HIGH_RISK_REGION_PATTERN.search(query):
+        return "고위험 지역"
+    if len({term.upper() for term in INCOTERMS_PATTERN.findall(query)}) > 1:
+        return "여러 인코텀즈 조건"
+    return None
+
+
+def classify_simple_query(query: str) -> Optional[QueryTransformResult]:
+    """
+    LLM 없이 분해가 필요 없는 단순 질문인지 판별
+
+    Args:
+        query: 사용자가 입력한 원본 질문
+
+    Returns:
+        단순 질문이면 sub_queries=None인 QueryTransformResult,
+        판단이 애매하거나 복합 질문일 수 있으면 None (→ LLM 변환 사용)
+    """
+    normalized = normalize_query_text(query)
+    if not normalized or _decomposition_signal(normalized):
+        return None
+
+    if DEFINITION_PATTERN.search(normalized):
+        reason = "단일 개념 설명 요청 (D섹션 규칙 3)"
+    elif any(keyword in normalized for keyword in PROCESS_KEYWORDS):
+        reason = "절차/프로세스 질문 (D섹션 규칙 2)"
+    elif any(keyword in normalized for keyword in COMPREHENSIVE_KEYWORDS):
+        reason = "포괄적 키워드 질문 (D섹션 규칙 1)"
+    elif len(normalized) <= SHORT_QUERY_MAX_CHARS:
+        reason = "짧은 단일 주제 질문"
+    else:
+        return None
+
+    return QueryTransformResult(
+        rewritten_query=normalized,
+        sub_queries=None,
+        reasoning=f"로컬 Fast-path: {reason}"
+    )
+
+
+# ===== 라벨링된 평가 세트 =====
+# (질문, Fast-path로 처리해도 되는지) - QUERY_TRANSFORM_PROMPT의 D섹션 규칙과 예시 기준
+LABELLED_QUERIES: List[Tuple[str, bool]] = [
+    # 단일 개념 설명
+    ("FOB란?", True),
+    ("CIF란?", True),
+    ("신용장이란 무엇인가요?", True),
+    ("CISG의 정의", True),
+    ("인코텀즈 2020이란?", True),
+    ("원산지 증명서란 뭐야?", True),
+    ("선하증권 뜻", True),
+    # 절차/프로세스
+    ("수출 절차", True),
+    ("수입 통관 과정", True),
+    ("신용장 개설 절차 알려줘", True),
+    ("수출 신고 단계", True),
+    ("무역 결제 흐름", True),
+    # 포괄적 키워드
+    ("수출 계약서 작성 시 주의사항", True),
+    ("수출 시 고려사항", True),
+    ("선적 서류 체크리스트", True),
+    ("FOB 계약 시 주의할 점", True),
+    # 짧은 단일 주제
+    ("DDP 조건", True),
+    ("해상보험", True),
+    ("CISG 66조", True),
+    # 복합 질문 (LLM 분해 필요)
+    ("수출과 수입의 차이점을 알려줘", False),
+    ("FOB, CIF, EXW 인코텀즈 비교해줘", False),
+    ("FOB가 나을까 CIF가 나을까?", False),
+    ("FOB 조건으로 미국과 중국에 수출할 때 계약서 주의사항", False),
+    ("미국으로 화장품 수출할 때 필요한 서류랑 통관 절차, 자주 발생하는 클레임 사례까지 알려줘", False),
+    ("CIF 조건으로 계약할 때 매도인·매수인 의무랑 보험 범위, 주요 리스크와 협상 시 주의사항까지 정리해줘", False),
+    ("두바이에 있는 미국 회사가 바로 계약하자고 하는데 괜찮을까?", False),
+    ("계약서에 인도 시기를 명시 안 했는데 선적이 지연되면 어떻게 돼?", False),
+    ("홍콩 바이어 결제 절차", False),
+    ("이란 수출 절차", False),
+    ("이란이란?", False),
+    ("이란으로 수출 시 주의사항", False),
+    ("그냥 FOB로만 계약했는데 문제 없나요?", False),
+    ("거래처가 진짜인지 확인하고 싶어", False),
+    ("미국 중국 일본 수출 규제 비교", False),
+    ("FOB와 CIF 차이", False),
+]
+
+
+def evaluate_fast_path(labelled: List[Tuple[str, bool]] = LABELLED_QUERIES) -> dict:
+    """
+    라벨링된 질문 세트로 Fast-path 분류기 평가
+
+    precision이 1.0이어야 함 (복합 질문을 Fast-path로 잘못 넘기면 검색 품질 저하)
+
+    Returns:
+        dict: precision, recall, bypass_rate(LLM 생략 비율), 오분류 목록
+    """
+    true_pos = false_pos = false_neg = 0
+    mistakes = []
+
+    for query, expected in labelled:
+        predicted = classify_simple_query(query) is not None
+        if predicted and expected:
+            true_pos += 1
+        elif predicted and not expected:
+            false_pos += 1
+            mistakes.append((query, "잘못된 Fast-path"))
+        elif expected and not predicted:
+            false_neg += 1
+            mistakes.append((query, "Fast-path 누락"))
+
+    bypassed = true_pos + false_pos
+    return {
+        "precision": true_pos / bypassed if bypassed else 1.0,
+        "recall": true_pos / (true_pos + false_neg) if (true_pos + false_neg) else 1.0,
+        "bypass_rate": bypassed / len(labelled) if labelled else 0.0,
+        "mistakes": mistakes,
+    }
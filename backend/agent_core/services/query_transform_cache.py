@@ -0,0 +1,168 @@
+"""
+쿼리 변환 결과 캐시
+
+같은 질문이 반복되면 gpt-4o-mini rewrite/decompose 호출(긴 QUERY_TRANSFORM_PROMPT 포함)을 생략
+- 키: (모델, 프롬프트 해시, 정규화된 질문) → 프롬프트가 바뀌면 기존 항목은 자동으로 미스
+- 1차: 프로세스 내 TTL LRU 캐시
+- 2차: (선택) SQLite 공유 캐시 - 같은 호스트의 워커끼리 공유
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Optional
+
+from agent_core.cache import LRUCache, SQLiteCache, normalize_query_text
+from agent_core.config import (
+    QUERY_TRANSFORM_CACHE_MAX_ITEMS,
+    QUERY_TRANSFORM_CACHE_TTL,
+    QUERY_TRANSFORM_CACHE_PATH,
+    QUERY_TRANSFORM_CACHE_MAX_DISK_MB,
+)
+from agent_core.models.query_transformer import QueryTransformResult
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    """프롬프트 내용 해시 (프롬프트 변경 시 캐시 무효화용)"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class QueryTransformCache:
+    """
+    QueryTransformResult 2단계 캐시 (메모리 TTL LRU → 공유 SQLite)
+
+    항목마다 원래 LLM 호출에 걸린 시간을 같이 저장해서,
+    적중 시 절약된 지연 시간을 통계로 누적
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: float, shared_path: str = "", shared_max_mb: int = 0):
+        self.memory = LRUCache(max_items=max_items, ttl_seconds=ttl_seconds)
+        self.shared: Optional[SQLiteCache] = None
+
+        if shared_path and shared_max_mb > 0:
+            # DB 파일은 첫 조회/저장 시 열림
+            self.shared = SQLiteCache(
+                shared_path,
+                max_bytes=shared_max_mb * 1024 * 1024,
+                ttl_seconds=ttl_seconds,
+                table="query_transforms"
+            )
+
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0  # 적중으로 생략된 LLM 호출 시간 합계 (초)
+
+    @staticmethod
+    def make_key(query: str, model: str, prompt: str) -> str:
+        """(모델, 프롬프트 해시, 정규화 질문) 기반 캐시 키 생성"""
+        raw = f"{model}\x00{prompt_fingerprint(prompt)}\x00{normalize_query_text(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _shared_failed(self, action: str, error: Exception) -> None:
+        """공유 캐시 오류 처리 (DB 파일을 열지 못했으면 이후 메모리 캐시만 사용)"""
+        if self.shared is not None and not self.shared.opened:
+            print(f"⚠️ 쿼리 변환 공유 캐시 초기화 실패 (메모리 캐시만 사용): {error}")
+            self.shared = None
+        else:
+            print(f"⚠️ 쿼리 변환 공유 캐시 {action} 실패: {error}")
+
+    def _get_shared(self, key: str) -> Optional[tuple]:
+        """공유 캐시 조회 (블로킹, 적중 시 메모리 캐시로 승격, 깨진 항목은 미스로 처리)"""
+        shared = self.shared
+        if shared is None:
+            return None
+        try:
+            blob = shared.get(key)
+        except Exception as e:
+            self._shared_failed("조회", e)
+            return None
+        if blob is None:
+            return None
+
+        try:
+            data = json.loads(blob)
+            entry = (QueryTransformResult(**data["result"]), float(data["latency"]))
+        except Exception as e:
+            print(f"⚠️ 쿼리 변환 공유 캐시 항목 손상 (무시): {e}")
+            return None
+        self.memory.set(key, entry)  # 메모리 캐시로 승격
+        return entry
+
+    def _set_shared(self, key: str, blob: bytes) -> None:
+        """공유 캐시 저장 (블로킹)"""
+        shared = self.shared
+        if shared is None:
+            return
+        try:
+            shared.set(key, blob)
+        except Exception as e:
+            self._shared_failed("저장", e)
+
+    def _count(self, entry: Optional[tuple]) -> Optional[QueryTransformResult]:
+        """적중/미스 통계 갱신 후 결과 복사본 반환"""
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_latency += entry[1]
+
+        # 호출 측에서 수정해도 캐시가 오염되지 않도록 복사본 반환
+        return entry[0].model_copy(deep=True)
+
+    @staticmethod
+    def _encode(result: QueryTransformResult, latency: float) -> bytes:
+        payload = {"result": result.model_dump(), "latency": latency}
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    def get(self, query: str, model: str, prompt: str) -> Optional[QueryTransformResult]:
+        """캐시된 변환 결과 반환 (없거나 만료되면 None, 공유 캐시 조회는 현재 스레드에서 실행)"""
+        key = self.make_key(query, model, prompt)
+        entry = self.memory.get(key)
+        if entry is None:
+            entry = self._get_shared(key)
+        return self._count(entry)
+
+    async def aget(self, query: str, model: str, prompt: str) -> Optional[QueryTransformResult]:
+        """get의 비동기 버전 (메모리 미스일 때만 공유 캐시 조회를 스레드에서 실행)"""
+        key = self.make_key(query, model, prompt)
+        entry = self.memory.get(key)
+        if entry is None and self.shared is not None:
+            entry = await asyncio.to_thread(self._get_shared, key)
+        return self._count(entry)
+
+    def set(self, query: str, model: str, prompt: str, result: QueryTransformResult, latency: float) -> None:
+        """변환 결과 저장 (latency: 원래 LLM 호출 소요 시간, 초, 공유 캐시 저장은 현재 스레드에서 실행)"""
+        key = self.make_key(query, model, prompt)
+        self.memory.set(key, (result.model_copy(deep=True), latency))
+        if self.shared is not None:
+            self._set_shared(key, self._encode(result, latency))
+
+    def aset(self, query: str, model: str, prompt: str, result: QueryTransformResult, latency: float) -> None:
+        """이벤트 루프용 저장: 메모리 캐시에 바로 넣고 공유 캐시 저장은 스레드 풀에서 진행 (결과를 기다리지 않음)"""
+        key = self.make_key(query, model, prompt)
+        self.memory.set(key, (result.model_copy(deep=True), latency))
+        if self.shared is not None:
+            asyncio.get_running_loop().run_in_executor(None, self._set_shared, key, self._encode(result, latency))
+
+    def stats(self) -> dict:
+        """적중률 및 절약된 지연 시간 통계"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_latency_seconds": round(self.saved_latency, 3),
+            "memory_items": len(self.memory),
+        }
+
+
+# 전역 캐시 인스턴스
+query_transform_cache = QueryTransformCache(
+    max_items=QUERY_TRANSFORM_CACHE_MAX_ITEMS,
+    ttl_seconds=QUERY_TRANSFORM_CACHE_TTL,
+    shared_path=QUERY_TRANSFORM_CACHE_PATH,
+    shared_max_mb=QUERY_TRANSFORM_CACHE_MAX_DISK_MB,
+)
@@ -7,10 +7,13 @@ LLM을 사용해서 검색 쿼리를 개선하고, 복합 질문이면 분해
 """
 
 import json
-from typing import Dict, Any
+import time
+import asyncio
+from typing import Dict, Any, Callable, List, Optional
 
-from agent_core.config import openai_client
+from agent_core.config import get_async_openai_client, QUERY_TRANSFORM_TIMEOUT
 from agent_core.models.query_transformer import QueryTransformResult
+from agent_core.services.query_transform_cache import query_transform_cache
 
 
 # LLM 프롬프트
@@ -256,9 +259,120 @@ F. 출력 형식 (JSON)
 """
 
 
+class SubQueryStreamParser:
+    """
+    스트리밍 JSON 증분 파서
+
+    LLM 응답을 조각(delta) 단위로 받아서, "sub_queries" 배열의 문자열이 닫히는 즉시 꺼냄
+    → 전체 JSON이 완성되기 전에 서브쿼리 검색을 시작할 수 있음
+
+    예: '{"rewritten_query": "...", "sub_queries": ["수출 절' + '차", "수입 절차"' + ']}'
+        → 두 번째 조각에서 "수출 절차", "수입 절차" 반환
+    """
+
+    def __init__(self, key: str = "sub_queries"):
+        self.key = key
+        self._depth = 0              # { / [ 중첩 깊이
+        self._in_string = False
+        self._escape = False
+        self._chars: List[str] = []  # 현재 읽고 있는 문자열 (이스케이프 포함 원문)
+        self._last_string = None     # 최상위 객체에서 마지막으로 닫힌 문자열 (키 후보)
+        self._current_key = None     # 최상위 객체에서 현재 값의 키
+        self._in_target = False      # "sub_queries" 배열 내부 여부
+        self.emitted: List[str] = []
+
+    def feed(self, chunk: str) -> List[str]:
+        """조각을 입력받아 이번에 새로 완성된 서브쿼리 리스트 반환"""
+        completed = []
+
+        for ch in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string(json.loads('"' + "".join(self._chars) + '"'), completed)
+                    continue
+                self._chars.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._chars = []
+            elif ch in "{[":
+                if ch == "[" and self._depth == 1 and self._current_key == self.key:
+                    self._in_target = True
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth <= 1:
+                    self._in_target = False
+            elif ch == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif ch == "," and self._depth == 1:
+                self._current_key = None
+
+        return completed
+
+    def _on_string(self, value: str, completed: List[str]) -> None:
+        """문자열 하나가 닫혔을 때 처리"""
+        if self._in_target and self._depth == 2:
+            value = value.strip()
+            if value and value not in self.emitted:
+                self.emitted.append(value)
+                completed.append(value)
+        elif self._depth == 1:
+            self._last_string = value
+
+
+async def _request_transform(
+    query: str,
+    model: str,
+    on_sub_query: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    쿼리 변환 LLM 호출 후 JSON 문자열 반환
+
+    on_sub_query가 주어지면 스트리밍으로 받아서, 서브쿼리가 완성될 때마다 콜백 호출
+    """
+    client = get_async_openai_client()
+    request_kwargs = dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": QUERY_TRANSFORM_PROMPT},
+            {"role": "user", "content": query}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.3  # 낮게 설정 → 매번 비슷한 결과 나옴 (일관성)
+    )
+
+    if on_sub_query is None:
+        response = await client.chat.completions.create(**request_kwargs)
+        return response.choices[0].message.content
+
+    # 스트리밍: 디코딩과 서브쿼리 검색이 겹치도록 조각 단위로 파싱
+    parser = SubQueryStreamParser()
+    chunks = []
+    stream = await client.chat.completions.create(stream=True, **request_kwargs)
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        chunks.append(delta)
+        for sub_query in parser.feed(delta):
+            on_sub_query(sub_query)
+
+    return "".join(chunks)
+
+
 async def rewrite_and_decompose_query(
     query: str,
-    model: str = "gpt-4o-mini"
+    model: str = "gpt-4o-mini",
+    on_sub_query: Optional[Callable[[str], None]] = None
 ) -> QueryTransformResult:
     """
     사용자 쿼리를 검색에 최적화된 형태로 변환
@@ -267,9 +381,15 @@ async def rewrite_and_decompose_query(
     1. 검색에 더 잘 걸리는 용어로 개선
     2. 복합 질문이면 개별 서브쿼리로 분해 (아니면 그냥 None)
 
+    비동기 클라이언트로 호출하므로 변환 중에도 이벤트 루프(다른 SSE 스트림)는 멈추지 않음.
+    QUERY_TRANSFORM_TIMEOUT 초 안에 응답이 없으면 원본 쿼리를 그대로 사용.
+    같은 질문(정규화 기준) + 같은 프롬프트 버전이면 캐시된 결과를 바로 반환.
+
     Args:
         query: 사용자가 입력한 원본 질문
         model: 사용할 LLM 모델 (기본값: gpt-4o-mini)
+        on_sub_query: (선택) 응답을 스트리밍으로 받으면서 서브쿼리가 완성될 때마다 호출할 콜백
+            캐시 적중 시에는 호출되지 않음 (최종 결과의 sub_queries 사용)
 
     Returns:
         QueryTransformResult 객체
@@ -279,22 +399,32 @@ async def rewrite_and_decompose_query(
     """
     print(f"\n🔄 쿼리 변환 중: '{query}'")
 
+    cached = await query_transform_cache.aget(query, model, QUERY_TRANSFORM_PROMPT)
+    if cached is not None:
+        print(f"✓ 캐시된 변환 결과 사용: '{cached.rewritten_query}'")
+        if cached.sub_queries:
+            print(f"✓ 서브쿼리 {len(cached.sub_queries)}개: {cached.sub_queries}")
+        print()
+        return cached
+
     try:
-        # LLM 호출해서 쿼리 변환 (JSON 응답 강제)
-        response = openai_client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": QUERY_TRANSFORM_PROMPT},
-                {"role": "user", "content": query}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.3  # 낮게 설정 → 매번 비슷한 결과 나옴 (일관성)
+        started_at = time.perf_counter()
+        # LLM 호출해서 쿼리 변환 (JSON 응답 강제, 타임아웃 적용)
+        content = await asyncio.wait_for(
+            _request_transform(query, model, on_sub_query),
+            timeout=QUERY_TRANSFORM_TIMEOUT
         )
 
         # JSON 파싱 후 Pydantic 모델로 변환
-        result_json = json.loads(response.choices[0].message.content)
+        result_json = json.loads(content)
         result = QueryTransformResult(**result_json)
 
+        # 정상 변환 결과만 캐싱 (타임아웃/실패 시의 원본 쿼리 대체 결과는 저장 안 함)
+        query_transform_cache.aset(
+            query, model, QUERY_TRANSFORM_PROMPT, result,
+            latency=time.perf_counter() - started_at
+        )
+
         # 결과 로그 출력
         print(f"✓ 개선된 쿼리: '{result.rewritten_query}'")
         if result.sub_queries and len(result.sub_queries) > 0:
@@ -310,6 +440,16 @@ async def rewrite_and_decompose_query(
         print()
         return result
 
+    except asyncio.TimeoutError:
+        # LLM 응답 지연 → 검색 자체가 늦어지지 않도록 원본 쿼리 사용
+        print(f"⚠️ 쿼리 변환 타임아웃 ({QUERY_TRANSFORM_TIMEOUT}초)")
+        print(f"⚠️ 원본 쿼리를 그대로 사용합니다.\n")
+        return QueryTransformResult(
+            rewritten_query=query,
+            sub_queries=None,
+            reasoning="변환 타임아웃으로 원본 쿼리 사용"
+        )
+
     except json.JSONDecodeError as e:
         # LLM이 이상한 응답 보낸 경우 (거의 없음)
         print(f"⚠️ JSON 파싱 실패: {e}")
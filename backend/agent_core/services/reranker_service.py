@@ -4,17 +4,163 @@ Reranker API 연동 서비스
 RunPod 서버의 Reranker API를 호출하여 문서를 재정렬
 """
 
-from typing import List
+import asyncio
+import hashlib
+import time
+from typing import List, Tuple
 import httpx
 
-from agent_core.config import RERANKER_API_URL
-from agent_core.models.reranker import RerankRequest, RerankResponse
+from agent_core.config import (
+    RERANKER_API_URL,
+    RERANKER_BATCH_API_URL,
+    get_async_reranker_client,
+    RERANK_BREAKER_WINDOW,
+    RERANK_BREAKER_MIN_CALLS,
+    RERANK_BREAKER_FAILURE_RATE,
+    RERANK_BREAKER_SLOW_CALL_SECONDS,
+    RERANK_BREAKER_SLOW_CALL_RATE,
+    RERANK_BREAKER_OPEN_SECONDS,
+    USE_RERANK_HEDGING,
+    RERANK_HEDGE_PERCENTILE,
+    RERANK_HEDGE_MIN_SAMPLES,
+    RERANK_HEDGE_MIN_DELAY,
+    RERANK_HEDGE_MAX_DELAY,
+    USE_RERANK_DOC_HASHES,
+    RERANK_SENT_HASH_CACHE_ITEMS,
+    USE_RERANK_SINGLEFLIGHT,
+)
+from agent_core.cache import LRUCache
+from agent_core.models.reranker import (
+    RerankRequest,
+    RerankResponse,
+    RerankGroup,
+    RerankBatchRequest,
+    RerankBatchResponse,
+)
+from agent_core.services.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    hedged_call,
+)
+from agent_core.services.singleflight import SingleFlight
+
+
+# Reranker 서킷 브레이커 / 응답 시간 기록 (프로세스 전역, 단일·배치 호출 공용)
+reranker_breaker = CircuitBreaker(
+    name="Reranker",
+    window_size=RERANK_BREAKER_WINDOW,
+    min_calls=RERANK_BREAKER_MIN_CALLS,
+    failure_rate_threshold=RERANK_BREAKER_FAILURE_RATE,
+    slow_call_seconds=RERANK_BREAKER_SLOW_CALL_SECONDS,
+    slow_call_rate_threshold=RERANK_BREAKER_SLOW_CALL_RATE,
+    open_seconds=RERANK_BREAKER_OPEN_SECONDS
+)
+reranker_latency = LatencyTracker()
+
+# 진행 중인 동일 Reranker 요청 (같은 질문이 동시에 몰릴 때 HTTP 1회로 합침)
+reranker_flight = SingleFlight()
+
+
+def _hedge_delay() -> float:
+    """헤지 요청 지연 = 최근 응답 시간 p95 (샘플이 부족하면 상한값)"""
+    if len(reranker_latency) < RERANK_HEDGE_MIN_SAMPLES:
+        return RERANK_HEDGE_MAX_DELAY
+    p95 = reranker_latency.percentile(RERANK_HEDGE_PERCENTILE)
+    return min(RERANK_HEDGE_MAX_DELAY, max(RERANK_HEDGE_MIN_DELAY, p95))
+
+
+async def _post_reranker(url: str, payload: dict) -> dict:
+    """
+    Reranker API POST (서킷 브레이커 + 선택적 헤지 요청)
+
+    Raises:
+        CircuitOpenError: 서킷 브레이커가 열려 있을 때 (네트워크 호출 없음)
+        httpx.HTTPError: API 호출 실패 시
+    """
+    reranker_breaker.before_call()
+
+    async def send() -> dict:
+        response = await get_async_reranker_client().post(url, json=payload)
+        response.raise_for_status()  # HTTP 에러 발생 시 예외 발생
+        return response.json()
+
+    started = time.monotonic()
+    try:
+        if USE_RERANK_HEDGING:
+            data = await hedged_call(send, _hedge_delay())
+        else:
+            data = await send()
+    except asyncio.CancelledError:
+        # 호출 측 타임아웃(wait_for)으로 취소된 경우도 장애 신호로 집계
+        # 빠르게 취소된 경우(클라이언트 연결 끊김 등)는 판단 없이 반열림 탐색 슬롯만 반환
+        if time.monotonic() - started >= RERANK_BREAKER_SLOW_CALL_SECONDS:
+            reranker_breaker.record_failure()
+        else:
+            reranker_breaker.release_probe()
+        raise
+    except Exception:
+        reranker_breaker.record_failure()
+        raise
+
+    latency = time.monotonic() - started
+    reranker_breaker.record_success(latency)
+    reranker_latency.add(latency)
+    return data
+
+
+def _request_key(query: str, documents: List[str], top_k: int) -> str:
+    """singleflight 키: (query, documents, top_k) 해시"""
+    digest = hashlib.sha256(f"{top_k}\x00{query}".encode("utf-8"))
+    for document in documents:
+        digest.update(b"\x00")
+        digest.update(document.encode("utf-8"))
+    return digest.hexdigest()
+
+
+# ===== 문서 해시 전송 (content-addressed) =====
+# 지식베이스 청크는 거의 바뀌지 않으므로 본문 대신 해시를 보내고,
+# 서버 문서 저장소에 없는 해시만 본문을 함께 보냄
+
+# 서버에 이미 본문을 보낸 것으로 기억하는 해시 (서버 재시작/삭제 시 missing_hashes로 복구)
+_sent_hashes = LRUCache(max_items=RERANK_SENT_HASH_CACHE_ITEMS)
+
+
+def document_hash(text: str) -> str:
+    """문서 본문 해시 (UTF-8 SHA-256 hex, Reranker 서버와 같은 방식)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _unsent_texts(texts_by_hash: dict) -> dict:
+    """서버에 아직 보내지 않은 문서의 {해시: 본문}"""
+    return {h: text for h, text in texts_by_hash.items() if _sent_hashes.get(h) is None}
+
+
+async def _post_with_hashes(url: str, payload: dict, texts_by_hash: dict) -> dict:
+    """
+    해시 기반 요청 전송 (서버가 missing_hashes를 돌려주면 해당 본문을 넣어 1회 재요청)
+    """
+    data = await _post_reranker(url, payload)
+
+    missing = data.get("missing_hashes") or []
+    if missing:
+        print(f"   ↪ Reranker 서버에 없는 문서 {len(missing)}개 본문 포함해서 재요청")
+        payload = {**payload, "document_texts": {h: texts_by_hash[h] for h in missing}}
+        data = await _post_reranker(url, payload)
+        if data.get("missing_hashes"):
+            raise RuntimeError("Reranker 서버가 문서 본문을 저장하지 못했습니다")
+
+    for h in texts_by_hash:
+        _sent_hashes.set(h, True)
+    return data
 
 
 async def call_reranker_api(query: str, documents: List[str], top_k: int = 5) -> RerankResponse:
     """
     RunPod 서버의 Reranker API를 호출하여 문서를 재정렬
 
+    같은 (query, documents, top_k) 요청이 이미 진행 중이면 새로 보내지 않고 그 결과를 함께 받습니다.
+
     Args:
         query: 검색 쿼리
         documents: 재정렬할 문서 텍스트 리스트
@@ -24,35 +170,48 @@ async def call_reranker_api(query: str, documents: List[str], top_k: int = 5) ->
         RerankResponse: 재정렬된 결과 (인덱스, 점수 포함)
 
     Raises:
+        CircuitOpenError: Reranker 장애로 서킷 브레이커가 열려 있을 때 (즉시 발생)
         httpx.HTTPError: API 호출 실패 시
         Exception: 기타 예상치 못한 오류 시
     """
-    print(f"\n🔄 Reranker API 호출 중... (문서 {len(documents)}개 → top {top_k}개)")
+    if not USE_RERANK_SINGLEFLIGHT:
+        return await _call_reranker_api(query, documents, top_k)
+
+    key = _request_key(query, documents, top_k)
+    if reranker_flight.in_flight(key):
+        print(f"🔗 같은 Reranker 요청이 진행 중 → 결과 공유 (문서 {len(documents)}개)")
+    return await reranker_flight.do(key, lambda: _call_reranker_api(query, documents, top_k))
 
-    # 요청 데이터 생성 (Pydantic 모델 활용)
-    request_data = RerankRequest(
-        query=query,
-        documents=documents,
-        top_k=top_k,
-        return_documents=True
-    )
+
+async def _call_reranker_api(query: str, documents: List[str], top_k: int) -> RerankResponse:
+    """Reranker API 1회 호출 (call_reranker_api 본체)"""
+    print(f"\n🔄 Reranker API 호출 중... (문서 {len(documents)}개 → top {top_k}개)")
 
     try:
-        # 비동기 HTTP 클라이언트로 POST 요청 (reranker 서버는 동기 방식으로 처리함)
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                RERANKER_API_URL,
-                json=request_data.model_dump(),  # Pydantic 모델을 dict로 변환
-                headers={"Content-Type": "application/json"}
+        # 공유 커넥션 풀 클라이언트로 POST 요청 (keep-alive 재사용 → 핸드셰이크 생략)
+        # 응답은 인덱스와 점수만 받음 (원본 Point는 호출 측이 이미 가지고 있음)
+        if USE_RERANK_DOC_HASHES:
+            texts_by_hash = {document_hash(document): document for document in documents}
+            request_data = RerankRequest(
+                query=query,
+                document_hashes=[document_hash(document) for document in documents],
+                document_texts=_unsent_texts(texts_by_hash),
+                top_k=top_k
             )
-            response.raise_for_status()  # HTTP 에러 발생 시 예외 발생
+            data = await _post_with_hashes(RERANKER_API_URL, request_data.model_dump(), texts_by_hash)
+        else:
+            request_data = RerankRequest(query=query, documents=documents, top_k=top_k)
+            data = await _post_reranker(RERANKER_API_URL, request_data.model_dump())
 
-            # 응답을 Pydantic 모델로 변환
-            rerank_response = RerankResponse(**response.json())
-            print(f"✓ Reranker 완료: {len(rerank_response.results)}개 문서 반환\n")
+        # 응답을 Pydantic 모델로 변환
+        rerank_response = RerankResponse(**data)
+        print(f"✓ Reranker 완료: {len(rerank_response.results)}개 문서 반환\n")
 
-            return rerank_response
+        return rerank_response
 
+    except CircuitOpenError as e:
+        print(f"⏭️  Reranker 호출 생략: {e}")
+        raise
     except httpx.HTTPError as e:
         print(f"⚠️  Reranker API 호출 실패: {e}")
         print("기본 검색 결과를 사용합니다.\n")
@@ -61,3 +220,58 @@ async def call_reranker_api(query: str, documents: List[str], top_k: int = 5) ->
         print(f"⚠️  예상치 못한 오류: {e}")
         print("기본 검색 결과를 사용합니다.\n")
         raise
+
+
+async def call_reranker_batch_api(groups: List[Tuple[str, List[str], int]]) -> List[RerankResponse]:
+    """
+    배치 Reranker API를 호출하여 여러 쿼리의 문서를 한 번에 재정렬
+
+    서브 쿼리 N개 → HTTP 요청 N번 대신 1번 (서버에서도 모든 쌍을 하나의 배치로 계산)
+
+    Args:
+        groups: [(query, documents, top_k), ...] 리스트
+
+    Returns:
+        List[RerankResponse]: groups와 같은 순서의 재정렬 결과
+
+    Raises:
+        CircuitOpenError: Reranker 장애로 서킷 브레이커가 열려 있을 때 (즉시 발생)
+        httpx.HTTPError: API 호출 실패 시
+        Exception: 기타 예상치 못한 오류 시
+    """
+    total_docs = sum(len(documents) for _, documents, _ in groups)
+    print(f"\n🔄 배치 Reranker API 호출 중... ({len(groups)}개 쿼리, 문서 {total_docs}개)")
+
+    try:
+        # return_documents=False(기본값): 인덱스와 점수만 있으면 됨 (응답 크기 절감)
+        if USE_RERANK_DOC_HASHES:
+            texts_by_hash = {}
+            hashed_groups = []
+            for query, documents, top_k in groups:
+                hashes = [document_hash(document) for document in documents]
+                texts_by_hash.update(zip(hashes, documents))
+                hashed_groups.append(RerankGroup(query=query, document_hashes=hashes, top_k=top_k))
+
+            request_data = RerankBatchRequest(groups=hashed_groups, document_texts=_unsent_texts(texts_by_hash))
+            data = await _post_with_hashes(RERANKER_BATCH_API_URL, request_data.model_dump(), texts_by_hash)
+        else:
+            request_data = RerankBatchRequest(groups=[
+                RerankGroup(query=query, documents=documents, top_k=top_k)
+                for query, documents, top_k in groups
+            ])
+            data = await _post_reranker(RERANKER_BATCH_API_URL, request_data.model_dump())
+
+        batch_response = RerankBatchResponse(**data)
+        print(f"✓ 배치 Reranker 완료: {len(batch_response.results)}개 그룹 반환\n")
+
+        return batch_response.results
+
+    except CircuitOpenError as e:
+        print(f"⏭️  배치 Reranker 호출 생략: {e}")
+        raise
+    except httpx.HTTPError as e:
+        print(f"⚠️  배치 Reranker API 호출 실패: {e}")
+        raise
+    except Exception as e:
+        print(f"⚠️  예상치 못한 오류: {e}")
+        raise
@@ -0,0 +1,57 @@
+"""
+진행 중인 동일 요청 합치기 (singleflight)
+
+인기 질문이 동시에 몰리면 같은 (query, documents, top_k) Reranker 요청이 여러 번 나갑니다.
+이미 진행 중인 같은 요청이 있으면 HTTP를 다시 보내지 않고 그 응답을 함께 받습니다.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    키별 진행 중 호출 공유
+
+    같은 키의 호출이 이미 실행 중이면 새로 실행하지 않고 그 결과(또는 예외)를 기다립니다.
+    끝난 호출은 바로 잊으므로 응답 캐시 역할은 하지 않습니다.
+    httpx 클라이언트처럼 이벤트 루프별로 구분하고, 기다리는 쪽이 모두 취소되면 실제 호출도 취소합니다.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], list] = {}  # (루프 id, 키) → [task, 대기 중인 호출 수]
+        self.shared = 0  # 다른 호출의 결과를 공유받은 횟수
+
+    def in_flight(self, key: Hashable) -> bool:
+        """현재 이벤트 루프에서 같은 키의 호출이 진행 중인지"""
+        return (id(asyncio.get_running_loop()), key) in self._calls
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Args:
+            key: 같은 요청을 판별하는 키
+            factory: 실제 호출 코루틴을 만드는 함수 (첫 호출에서만 실행)
+        """
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        entry = self._calls.get(slot)
+        if entry is None:
+            entry = [loop.create_task(factory()), 0]
+            self._calls[slot] = entry
+            entry[0].add_done_callback(lambda _: self._forget(slot, entry))
+        else:
+            self.shared += 1
+
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()
+
+    def _forget(self, slot: Tuple[int, Hashable], entry: list) -> None:
+        if self._calls.get(slot) is entry:
+            del self._calls[slot]
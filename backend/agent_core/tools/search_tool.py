@@ -11,19 +11,39 @@
 import asyncio
 from typing import List
 from agents import function_tool
+from qdrant_client.models import QueryRequest
 
 from agent_core.config import (
-    qdrant_client,
-    openai_client,
+    get_async_qdrant_client,
     COLLECTION_NAME,
     COLLECTION_USER_DOCS,
-    EMBEDDING_MODEL,
     USE_RERANKER,
-    USE_PER_QUERY_RERANK
+    USE_PER_QUERY_RERANK,
+    USE_BATCH_SEARCH,
+    USE_QUERY_FAST_PATH,
+    USE_SPECULATIVE_SEARCH,
+    SPECULATIVE_SEARCH_MODE,
+    USE_STREAMED_DECOMPOSITION,
+    RERANK_MAX_CONCURRENCY,
+    RERANK_TIMEOUT,
+    USE_BATCH_RERANK,
+    USE_ADAPTIVE_TOP_K,
+    RERANK_ADAPTIVE_MIN_K,
+    RERANK_ADAPTIVE_MAX_K,
+    RERANK_SCORE_THRESHOLD,
+    RERANK_SCORE_MARGIN,
+    RERANK_SCORE_GAP,
+    USE_TOKEN_BUDGET_PACKING,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_CHUNK_MAX_TOKENS,
+    CONTEXT_TOKEN_ENCODING
 )
-from agent_core.utils import print_retrieved_documents
-from agent_core.services.reranker_service import call_reranker_api
+from agent_core.cache import normalize_query_text
+from agent_core.utils import print_retrieved_documents, count_tokens, pack_chunks
+from agent_core.services.reranker_service import call_reranker_api, call_reranker_batch_api
+from agent_core.services.embedding_service import get_query_embedding, get_query_embeddings
 from agent_core.services.query_transformer_service import rewrite_and_decompose_query
+from agent_core.services.query_classifier import classify_simple_query
 
 
 @function_tool
@@ -36,20 +56,15 @@ async def search_trade_documents(query: str, limit: int = 25, top_k: int = 10) -
     Args:
         query: 사용자 질문
         limit: Qdrant에서 가져올 문서 수 (기본 25개)
-        top_k: 최종적으로 Agent에게 전달할 문서 수 (기본 5개)
+        top_k: 최종적으로 Agent에게 전달할 최대 문서 수 (기본 10개, USE_ADAPTIVE_TOP_K면 점수 분포에 따라 더 적을 수 있음)
 
     Returns:
         Agent가 읽을 수 있게 포맷된 문서 텍스트
     """
     print(f"\n🔍 검색 시작: '{query}' (초기 검색: {limit}개, 최종 선정: {top_k}개)")
 
-    # 쿼리 개선 + 필요하면 복합 질문 분해
-    transform = await rewrite_and_decompose_query(query)
-    rewritten_query = transform.rewritten_query
-    sub_queries = transform.sub_queries or [rewritten_query]  # None이면 단일 쿼리로 변환
-
-    # ===== 통합 검색 (단순/복합 질문 모두 동일한 경로 사용) =====
-    grouped_points = await _multi_search(sub_queries, limit)
+    # ===== 쿼리 개선/분해 + 통합 검색 (단순/복합 질문 모두 동일한 경로 사용) =====
+    rewritten_query, sub_queries, grouped_points = await _transform_and_search(query, limit)
     total_docs = sum(len(pts) for pts in grouped_points.values())
     print(f"✓ 최종 {total_docs}개 문서 수집 ({len(sub_queries)}개 그룹)\n")
 
@@ -73,19 +88,28 @@ async def search_trade_documents(query: str, limit: int = 25, top_k: int = 10) -
             return "검색 결과가 없습니다."
 
         # 결과 포맷팅 (개별 rerank 결과)
+        meta_lines = [
+            f"   출처: {point.payload.get('doc_id', 'unknown')}, Rerank 점수: {rerank_score:.3f}, 서브쿼리: '{sub_query}'"
+            for point, rerank_score, sub_query in reranked_results
+        ]
+        contents = _pack_contents(
+            [point.payload.get("text") or point.payload.get("content") or "" for point, _, _ in reranked_results],
+            meta_lines
+        )
+
+        # 토큰 예산 패킹 후 실제로 전달되는 개수 기준
         print("="*60)
-        print(f"🎯 개별 Rerank로 선정된 최종 {len(reranked_results)}개 문서 (모델에게 전달)")
+        print(f"🎯 개별 Rerank로 선정된 최종 {len(contents)}개 문서 (모델에게 전달)")
         print("="*60)
 
         formatted = []
-        for rank, (point, rerank_score, sub_query) in enumerate(reranked_results, 1):
-            content = point.payload.get("text") or point.payload.get("content") or ""
-            if content:
-                content = content[:500]
+        for rank, ((point, rerank_score, sub_query), content, meta_line) in enumerate(
+            zip(reranked_results, contents, meta_lines), 1
+        ):
             source_tag = point.payload.get("doc_id", "unknown")
 
             # Agent에게 전달할 텍스트
-            doc_text = f"[{rank}] {content}\n   출처: {source_tag}, Rerank 점수: {rerank_score:.3f}, 서브쿼리: '{sub_query}'"
+            doc_text = f"[{rank}] {content}\n{meta_line}"
             formatted.append(doc_text)
 
             # 콘솔 디버깅 출력
@@ -126,10 +150,24 @@ async def search_trade_documents(query: str, limit: int = 25, top_k: int = 10) -
                 for point in all_points
             ]
 
+            # 적응형 top_k: top_k(최대 RERANK_ADAPTIVE_MAX_K)개를 받은 뒤 점수 분포로 더 줄일 수 있음
+            rerank_k = min(top_k, RERANK_ADAPTIVE_MAX_K) if USE_ADAPTIVE_TOP_K else top_k
+
             try:
-                rerank_response = await call_reranker_api(rewritten_query, documents_for_rerank, top_k=top_k)
+                rerank_response = await asyncio.wait_for(
+                    call_reranker_api(rewritten_query, documents_for_rerank, top_k=rerank_k),
+                    timeout=RERANK_TIMEOUT
+                )
+                if USE_ADAPTIVE_TOP_K:
+                    cutoff = _adaptive_cutoff(
+                        [result.score for result in rerank_response.results],
+                        min_k=RERANK_ADAPTIVE_MIN_K,
+                        max_k=rerank_k
+                    )
+                    rerank_response.results = rerank_response.results[:cutoff]
             except Exception as e:
-                print(f"⚠️  Reranker 실패: {e}")
+                reason = f"타임아웃 ({RERANK_TIMEOUT}초)" if isinstance(e, asyncio.TimeoutError) else str(e)
+                print(f"⚠️  Reranker 실패: {reason}")
                 print(f"⚠️  기본 검색 결과의 상위 {top_k}개를 사용합니다.\n")
         else:
             # Reranker 미사용
@@ -147,6 +185,177 @@ async def search_trade_documents(query: str, limit: int = 25, top_k: int = 10) -
 
 # ===== 내부 헬퍼 함수 =====
 
+def _adaptive_cutoff(scores: List[float], min_k: int, max_k: int, label: str = "") -> int:
+    """
+    Rerank 점수 분포로 Agent에게 전달할 문서 수 결정
+
+    1. 절대 임계값(RERANK_SCORE_THRESHOLD) 미만, 1위 대비 RERANK_SCORE_MARGIN 이상 낮은 문서 제외
+    2. 남은 문서 중 인접 점수 차이가 가장 큰 지점이 RERANK_SCORE_GAP 이상이면 그 앞에서 자름 (elbow)
+    3. 결과를 [min_k, max_k] 범위로 보정
+
+    Args:
+        scores: 내림차순으로 정렬된 Rerank 점수 리스트
+        min_k: 최소 전달 개수
+        max_k: 최대 전달 개수
+        label: 로그에 붙일 이름 (서브 쿼리 등)
+
+    Returns:
+        int: 전달할 문서 수 (scores 길이 이하)
+    """
+    if not scores:
+        return 0
+
+    max_k = min(max_k, len(scores))
+    min_k = min(max(1, min_k), max_k)
+    top = scores[0]
+
+    # 1. 점수 임계값
+    k = 0
+    while k < max_k and scores[k] >= RERANK_SCORE_THRESHOLD and top - scores[k] <= RERANK_SCORE_MARGIN:
+        k += 1
+    reason = "임계값" if k < max_k else "최대 개수"
+
+    # 2. 점수 간격 (min_k 이후 구간에서 가장 큰 하락 지점)
+    if k > min_k:
+        gap, position = max((scores[i - 1] - scores[i], i) for i in range(min_k, k))
+        if gap >= RERANK_SCORE_GAP:
+            k, reason = position, f"점수 간격 {gap:.2f}"
+
+    # 3. 최소 개수 보정
+    if k < min_k:
+        k, reason = min_k, "최소 개수"
+
+    prefix = f"'{label}' " if label else ""
+    print(
+        f"✂️  {prefix}적응형 top_k: {len(scores)}개 중 {k}개 선택 ({reason}, "
+        f"점수 {top:.3f} ~ {scores[k - 1]:.3f}, 제외된 최고 점수 "
+        f"{f'{scores[k]:.3f}' if k < len(scores) else '-'})"
+    )
+    return k
+
+
+async def _transform_and_search(query: str, limit: int) -> tuple:
+    """
+    쿼리 변환 후 검색 수행
+
+    - Fast-path: 단순 질문은 LLM 변환 없이 바로 검색
+    - 추측 검색(USE_SPECULATIVE_SEARCH): 변환 LLM이 도는 동안 원본 쿼리로 미리 Embedding+검색해두고,
+      변환 결과가 단일 쿼리(sub_queries=None)이면 그 후보를 재사용/병합 → 두 번째 검색 대기 생략
+      복합 질문이면 추측 결과는 버리고 서브쿼리별로 검색
+    - 스트리밍 분해(USE_STREAMED_DECOMPOSITION): 변환 응답을 스트리밍으로 받으면서
+      서브쿼리 문자열이 완성되는 즉시 해당 서브쿼리의 Embedding+검색 시작 (LLM 디코딩과 검색이 겹침)
+
+    Returns:
+        tuple: (rewritten_query, sub_queries, grouped_points)
+    """
+    # 1) 단순 질문 → 로컬 Fast-path로 LLM 호출 생략
+    transform = classify_simple_query(query) if USE_QUERY_FAST_PATH else None
+    if transform is not None:
+        print(f"⚡ {transform.reasoning} → 쿼리 변환 LLM 호출 생략")
+        sub_queries = [transform.rewritten_query]
+        return transform.rewritten_query, sub_queries, await _multi_search(sub_queries, limit)
+
+    # 2) 추측 검색: 원본 쿼리 검색을 쿼리 변환 LLM 호출과 동시에 시작
+    speculative_task = None
+    if USE_SPECULATIVE_SEARCH:
+        print("⚡ 추측 검색 시작 (쿼리 변환과 동시에 원본 쿼리로 검색)")
+        speculative_task = asyncio.create_task(_multi_search([query], limit))
+
+    # 3) 스트리밍 분해: 서브쿼리가 도착하는 즉시 검색 태스크 시작
+    streamed_tasks = {}
+
+    def on_sub_query(sub_query: str):
+        # 같은 서브쿼리가 두 번 스트리밍되면 먼저 시작한 태스크를 덮어써 취소되지 않은 채 남으므로 건너뜀
+        if sub_query in streamed_tasks:
+            return
+        print(f"   ⚡ 서브쿼리 수신 → 즉시 검색 시작: '{sub_query}'")
+        streamed_tasks[sub_query] = asyncio.create_task(_multi_search([sub_query], limit))
+
+    # 변환 실패/취소 등으로 중간에 빠져나가도 미리 시작한 검색 태스크가 남지 않도록 정리
+    try:
+        transform = await rewrite_and_decompose_query(
+            query,
+            on_sub_query=on_sub_query if USE_STREAMED_DECOMPOSITION else None
+        )
+        rewritten_query = transform.rewritten_query
+
+        if transform.sub_queries:
+            # 복합 질문 → 서브쿼리별 그룹이 필요하므로 추측 결과는 사용하지 않음
+            if speculative_task is not None:
+                speculative_task.cancel()
+            sub_queries = transform.sub_queries
+            return rewritten_query, sub_queries, await _collect_streamed_searches(sub_queries, streamed_tasks, limit)
+
+        # 단일 쿼리 → 스트리밍 중 시작된 검색이 있으면 취소 (타임아웃 후 원본 쿼리 대체 등)
+        for task in streamed_tasks.values():
+            task.cancel()
+
+        sub_queries = [rewritten_query]  # None이면 단일 쿼리로 변환
+        if speculative_task is None:
+            return rewritten_query, sub_queries, await _multi_search(sub_queries, limit)
+
+        try:
+            speculative_points = (await speculative_task).get(query, [])
+        except Exception as e:
+            print(f"⚠️ 추측 검색 실패: {e} → 개선된 쿼리로 다시 검색")
+            return rewritten_query, sub_queries, await _multi_search(sub_queries, limit)
+
+        if SPECULATIVE_SEARCH_MODE == "merge" and normalize_query_text(rewritten_query) != normalize_query_text(query):
+            # 병합: 개선된 쿼리로도 검색해서 추측 후보와 합침 (재현율 우선)
+            rewritten_points = (await _multi_search(sub_queries, limit)).get(rewritten_query, [])
+            points = _merge_points(rewritten_points, speculative_points, limit)
+            print(f"✓ 추측 검색 결과 병합: {len(points)}개")
+        else:
+            # 재사용: 추측 후보를 개선된 쿼리 그룹으로 그대로 사용 (Rerank는 개선된 쿼리 기준)
+            points = speculative_points
+            print(f"✓ 추측 검색 결과 재사용: {len(points)}개 (두 번째 검색 생략)")
+
+        return rewritten_query, sub_queries, {rewritten_query: points}
+    finally:
+        if speculative_task is not None and not speculative_task.done():
+            speculative_task.cancel()
+        for task in streamed_tasks.values():
+            if not task.done():
+                task.cancel()
+
+
+async def _collect_streamed_searches(sub_queries: List[str], streamed_tasks: dict, limit: int) -> dict:
+    """
+    스트리밍 중 시작된 서브쿼리 검색 결과를 모으고, 빠진 서브쿼리만 배치로 추가 검색
+
+    Returns:
+        Dict[str, List]: sub_queries 순서대로 정렬된 {서브쿼리: 검색결과Points}
+    """
+    collected = {}
+    for sq in sub_queries:
+        task = streamed_tasks.pop(sq, None)
+        if task is None:
+            continue
+        try:
+            collected.update(await task)
+        except Exception as e:
+            print(f"⚠️ 서브쿼리 선행 검색 실패: '{sq}' ({e}) → 다시 검색")
+
+    # 최종 결과에 없는 서브쿼리 검색은 취소
+    for task in streamed_tasks.values():
+        task.cancel()
+
+    missing = [sq for sq in sub_queries if sq not in collected]
+    if missing:
+        collected.update(await _multi_search(missing, limit))
+
+    return {sq: collected.get(sq, []) for sq in sub_queries}
+
+
+def _merge_points(primary: List, extra: List, limit: int) -> List:
+    """두 검색 결과를 point id 기준으로 합치고 (높은 점수 유지) 점수순 상위 limit개 반환"""
+    seen_ids = {}
+    for point in list(primary) + list(extra):
+        if point.id not in seen_ids or point.score > seen_ids[point.id].score:
+            seen_ids[point.id] = point
+    return sorted(seen_ids.values(), key=lambda p: p.score, reverse=True)[:limit]
+
+
 async def _multi_search(sub_queries: List[str], limit: int) -> dict:
     """
     병렬 검색 (단일/복합 질문 모두 처리)
@@ -154,7 +363,8 @@ async def _multi_search(sub_queries: List[str], limit: int) -> dict:
     예1 (단일): ["수출 절차"] 1개 검색
     예2 (복합): ["수출 절차", "수입 절차"] 2개를 동시에 검색 → 서브 쿼리별 그룹화
 
-    순차 검색보다 2~3배 빠름 (asyncio.gather 덕분)
+    Embedding은 1회 배치 요청, Qdrant 검색은 query_batch_points 1회 왕복
+    (USE_BATCH_SEARCH=False면 서브쿼리별 query_points를 asyncio.gather로 병렬 수행)
 
     Returns:
         Dict[str, List]: {서브쿼리: 검색결과Points} 형태의 딕셔너리
@@ -163,31 +373,34 @@ async def _multi_search(sub_queries: List[str], limit: int) -> dict:
     query_type = "단일 쿼리" if num_queries == 1 else f"{num_queries}개 서브쿼리"
     print(f"📌 검색 수행 ({query_type})")
 
-    # 1) 모든 서브쿼리를 동시에 벡터로 변환 (병렬 처리)
+    # 1) 모든 서브쿼리를 한 번의 배치 요청으로 벡터로 변환 (캐시 적중 시 API 호출 생략)
     print("   Step 1: Embedding 생성 중...")
-    embedding_tasks = [
-        asyncio.to_thread(  # 동기 함수를 비동기로 감싸기
-            openai_client.embeddings.create,
-            model=EMBEDDING_MODEL,
-            input=sq
-        )
-        for sq in sub_queries
-    ]
-    embeddings = await asyncio.gather(*embedding_tasks)  # 모두 완료될 때까지 대기
+    embeddings = await get_query_embeddings(sub_queries)
 
-    # 2) 모든 벡터로 동시에 Qdrant 검색 (병렬 처리)
-    print("   Step 2: Qdrant 검색 중...")
-    search_tasks = [
-        asyncio.to_thread(
-            qdrant_client.query_points,
+    # 2) 모든 벡터로 Qdrant 검색
+    if USE_BATCH_SEARCH:
+        # 배치 검색: 서브쿼리 벡터 전체를 query_batch_points 1회 왕복으로 검색 (원격 Qdrant 지연 절감)
+        print("   Step 2: Qdrant 배치 검색 중...")
+        search_results = await get_async_qdrant_client().query_batch_points(
             collection_name=COLLECTION_NAME,
-            query=emb.data[0].embedding,
-            limit=limit,
-            with_payload=True
+            requests=[
+                QueryRequest(query=emb, limit=limit, with_payload=True)
+                for emb in embeddings
+            ]
         )
-        for emb in embeddings
-    ]
-    search_results = await asyncio.gather(*search_tasks)
+    else:
+        # 개별 검색: 서브쿼리마다 query_points를 동시에 호출 (병렬 처리)
+        print("   Step 2: Qdrant 검색 중...")
+        search_tasks = [
+            get_async_qdrant_client().query_points(
+                collection_name=COLLECTION_NAME,
+                query=emb,
+                limit=limit,
+                with_payload=True
+            )
+            for emb in embeddings
+        ]
+        search_results = await asyncio.gather(*search_tasks)
 
     # 3) 서브 쿼리별로 그룹화
     print("   Step 3: 서브 쿼리별 그룹화 중...")
@@ -212,6 +425,40 @@ async def _multi_search(sub_queries: List[str], limit: int) -> dict:
     return grouped_points
 
 
+def _pack_contents(contents: List[str], meta_lines: List[str]) -> List[str]:
+    """
+    Agent에게 전달할 청크 본문을 토큰 예산에 맞게 패킹
+
+    USE_TOKEN_BUDGET_PACKING이면 순위 순서대로 CONTEXT_TOKEN_BUDGET 안에 채움
+    (번호 / 출처 / 점수 줄과 문서 구분 줄바꿈까지 예산에 포함 → 검색 1회 Tool 출력 토큰 수가 예산 이내).
+    아니면 청크마다 앞 500자만 사용
+
+    Args:
+        contents: 순위 순서의 청크 본문 리스트
+        meta_lines: 청크별 출처 / 점수 줄 (contents와 같은 순서)
+
+    Returns:
+        List[str]: 전달할 본문 리스트 (예산을 넘는 뒤쪽 청크는 제외되어 더 짧을 수 있음)
+    """
+    if not USE_TOKEN_BUDGET_PACKING:
+        return [content[:500] for content in contents]
+
+    overheads = [
+        count_tokens(f"[{rank}] \n{meta_line}\n\n", CONTEXT_TOKEN_ENCODING)
+        for rank, meta_line in enumerate(meta_lines, 1)
+    ]
+    packed = pack_chunks(
+        contents,
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        max_chunk_tokens=CONTEXT_CHUNK_MAX_TOKENS,
+        overheads=overheads,
+        encoding_name=CONTEXT_TOKEN_ENCODING
+    )
+    used = sum(count_tokens(content, CONTEXT_TOKEN_ENCODING) for content in packed) + sum(overheads[:len(packed)])
+    print(f"📦 컨텍스트 패킹: {len(contents)}개 중 {len(packed)}개 전달 ({used}/{CONTEXT_TOKEN_BUDGET} 토큰)")
+    return packed
+
+
 def _format_rerank_results(points: List, rerank_response, top_k: int) -> List[str]:
     """
     Rerank 결과를 Agent에게 전달할 형식으로 포맷팅
@@ -228,20 +475,29 @@ def _format_rerank_results(points: List, rerank_response, top_k: int) -> List[st
 
     if rerank_response:
         # Reranker 결과 사용
+        meta_lines = [
+            f"   출처: {points[result.index].payload.get('data_source', 'unknown')}, Rerank 점수: {result.score:.3f}"
+            for result in rerank_response.results
+        ]
+        contents = _pack_contents(
+            [
+                points[result.index].payload.get("text") or points[result.index].payload.get("content") or ""
+                for result in rerank_response.results
+            ],
+            meta_lines
+        )
+
         print("="*60)
-        print(f"🎯 Reranker로 선정된 최종 {len(rerank_response.results)}개 문서 (모델에게 전달)")
+        print(f"🎯 Reranker로 선정된 최종 {len(contents)}개 문서 (모델에게 전달)")
         print("="*60)
 
-        for rank, result in enumerate(rerank_response.results, 1):
+        for rank, (result, content, meta_line) in enumerate(zip(rerank_response.results, contents, meta_lines), 1):
             original_point = points[result.index]
-            content = original_point.payload.get("text") or original_point.payload.get("content") or ""
-            if content:
-                content = content[:500]  # 너무 길면 잘라냄
             source_tag = original_point.payload.get("data_source", "unknown")
             rerank_score = result.score
 
             # Agent에게 전달할 텍스트
-            doc_text = f"[{rank}] {content}\n   출처: {source_tag}, Rerank 점수: {rerank_score:.3f}"
+            doc_text = f"[{rank}] {content}\n{meta_line}"
             formatted.append(doc_text)
 
             # 콘솔 디버깅 출력
@@ -260,18 +516,21 @@ def _format_rerank_results(points: List, rerank_response, top_k: int) -> List[st
 
     else:
         # 기본 검색 결과 사용
+        meta_lines = [
+            f"   출처: {point.payload.get('data_source', 'unknown')}, 점수: {point.score:.3f}"
+            for point in points[:top_k]
+        ]
+        contents = _pack_contents(
+            [point.payload.get("text") or point.payload.get("content") or "" for point in points[:top_k]],
+            meta_lines
+        )
+
         print("="*60)
-        print(f"📄 기본 검색 결과 상위 {top_k}개 (모델에게 전달)")
+        print(f"📄 기본 검색 결과 상위 {len(contents)}개 (모델에게 전달)")
         print("="*60)
 
-        for i, point in enumerate(points[:top_k], 1):
-            content = point.payload.get("text") or point.payload.get("content") or ""
-            if content:
-                content = content[:500]
-            score = point.score
-            source_tag = point.payload.get("data_source", "unknown")
-
-            doc_text = f"[{i}] {content}\n   출처: {source_tag}, 점수: {score:.3f}"
+        for i, (content, meta_line) in enumerate(zip(contents, meta_lines), 1):
+            doc_text = f"[{i}] {content}\n{meta_line}"
             formatted.append(doc_text)
 
     return formatted
@@ -279,7 +538,13 @@ def _format_rerank_results(points: List, rerank_response, top_k: int) -> List[st
 
 async def _rerank_per_query(grouped_points: dict, sub_queries: List[str], total_topk: int) -> List:
     """
-    각 서브 쿼리별로 개별 reranking 수행
+    각 서브 쿼리별로 개별 reranking 수행 (동시 실행)
+
+    USE_BATCH_RERANK면 먼저 /rerank/batch 1회 호출로 처리하고, 실패 시 아래 방식으로 대체.
+    서브 쿼리별 Reranker 호출을 RERANK_MAX_CONCURRENCY개까지 동시에 보내고,
+    각 호출에 RERANK_TIMEOUT초 타임아웃을 적용.
+    실패/타임아웃된 서브 쿼리만 검색 점수 순 상위 문서로 대체.
+    결과는 항상 sub_queries 순서대로 합쳐짐 (완료 순서와 무관)
 
     Args:
         grouped_points: 서브 쿼리별로 그룹화된 검색 결과 {sub_query: [Points]}
@@ -291,20 +556,34 @@ async def _rerank_per_query(grouped_points: dict, sub_queries: List[str], total_
     """
     # Top-k를 서브 쿼리 개수로 균등 배분 (최소 1개)
     per_query_k = max(1, total_topk // len(sub_queries))
+    # 적응형 top_k: 서브 쿼리마다 최대 rerank_k개를 받아 점수 분포로 자름
+    # (total_topk와 RERANK_ADAPTIVE_MAX_K 중 작은 값이 전체 상한, 최소/최대 모두 균등 배분)
+    if USE_ADAPTIVE_TOP_K:
+        rerank_k = max(1, min(total_topk, RERANK_ADAPTIVE_MAX_K) // len(sub_queries))
+        min_k = min(rerank_k, max(1, RERANK_ADAPTIVE_MIN_K // len(sub_queries)))
+    else:
+        rerank_k = min_k = per_query_k
 
-    print(f"\n🎯 개별 Rerank 수행: {len(sub_queries)}개 서브 쿼리")
-    print(f"   각 서브 쿼리당 {per_query_k}개 선정 (총 약 {per_query_k * len(sub_queries)}개)")
+    print(f"\n🎯 개별 Rerank 수행: {len(sub_queries)}개 서브 쿼리 (동시 최대 {RERANK_MAX_CONCURRENCY}개)")
+    if USE_ADAPTIVE_TOP_K:
+        print(f"   각 서브 쿼리당 {min_k}~{rerank_k}개 선정 (점수 분포 기준)")
+    else:
+        print(f"   각 서브 쿼리당 {per_query_k}개 선정 (총 약 {per_query_k * len(sub_queries)}개)")
 
-    all_reranked = []
+    # 배치 Rerank: 서브 쿼리 전체를 /rerank/batch 1회 호출로 처리
+    if USE_BATCH_RERANK and len(sub_queries) > 1:
+        batch_reranked = await _rerank_batch(grouped_points, sub_queries, rerank_k, min_k)
+        if batch_reranked is not None:
+            return batch_reranked
+        print("   → 서브 쿼리별 개별 Rerank 호출로 대체")
 
-    for i, sq in enumerate(sub_queries, 1):
+    semaphore = asyncio.Semaphore(RERANK_MAX_CONCURRENCY)
+
+    async def rerank_one(i: int, sq: str) -> List:
         points = grouped_points.get(sq, [])
         if not points:
             print(f"\n   [{i}/{len(sub_queries)}] '{sq}' → 검색 결과 없음, 건너뜀")
-            continue
-
-        print(f"\n   [{i}/{len(sub_queries)}] '{sq}'")
-        print(f"      검색 결과: {len(points)}개 → Rerank → top {per_query_k}")
+            return []
 
         # 문서 텍스트 추출
         documents = [
@@ -312,29 +591,91 @@ async def _rerank_per_query(grouped_points: dict, sub_queries: List[str], total_
             for point in points
         ]
 
-        # 개별 rerank 수행
         try:
-            rerank_response = await call_reranker_api(sq, documents, top_k=per_query_k)
+            async with semaphore:
+                rerank_response = await asyncio.wait_for(
+                    call_reranker_api(sq, documents, top_k=rerank_k),
+                    timeout=RERANK_TIMEOUT
+                )
 
             # 결과 저장 (원본 Point, rerank 점수, 서브 쿼리)
-            for result in rerank_response.results:
-                original_point = points[result.index]
-                all_reranked.append((original_point, result.score, sq))
-
-            print(f"      ✓ Rerank 완료: {len(rerank_response.results)}개 선정")
+            reranked = [
+                (points[result.index], result.score, sq)
+                for result in rerank_response.results
+            ]
+            print(f"\n   [{i}/{len(sub_queries)}] '{sq}'")
+            print(f"      검색 결과: {len(points)}개 → Rerank → top {rerank_k}")
+            if USE_ADAPTIVE_TOP_K:
+                reranked = reranked[:_adaptive_cutoff([score for _, score, _ in reranked], min_k, rerank_k, sq)]
+            print(f"      ✓ Rerank 완료: {len(reranked)}개 선정")
+            return reranked
 
         except Exception as e:
-            print(f"      ⚠️ Rerank 실패: {e}")
+            reason = f"타임아웃 ({RERANK_TIMEOUT}초)" if isinstance(e, asyncio.TimeoutError) else str(e)
+            print(f"\n   [{i}/{len(sub_queries)}] '{sq}'")
+            print(f"      ⚠️ Rerank 실패: {reason}")
             print(f"      → 기본 검색 점수 기준 상위 {per_query_k}개 사용")
             # 실패 시 검색 점수 기준 상위 per_query_k개 사용
-            for point in points[:per_query_k]:
-                all_reranked.append((point, point.score, sq))
+            return [(point, point.score, sq) for point in points[:per_query_k]]
+
+    # gather는 입력 순서대로 결과를 반환 → 출력 순서가 항상 sub_queries 순서로 결정적
+    per_query_results = await asyncio.gather(
+        *(rerank_one(i, sq) for i, sq in enumerate(sub_queries, 1))
+    )
+
+    all_reranked = []
+    for reranked in per_query_results:
+        all_reranked.extend(reranked)
 
     print(f"\n✓ 개별 Rerank 완료: 총 {len(all_reranked)}개 문서 선정\n")
 
     return all_reranked
 
 
+async def _rerank_batch(grouped_points: dict, sub_queries: List[str], per_query_k: int, min_k: int):
+    """
+    서브 쿼리별 rerank를 배치 엔드포인트 1회 호출로 수행
+
+    USE_ADAPTIVE_TOP_K면 서브 쿼리마다 per_query_k개를 받아 점수 분포로 자름 (최소 min_k개)
+
+    Returns:
+        List[tuple] | None: [(Point, rerank_score, sub_query), ...] (sub_queries 순서),
+            배치 호출 실패 시 None
+    """
+    targets = [sq for sq in sub_queries if grouped_points.get(sq)]
+    if not targets:
+        return []
+
+    groups = [
+        (
+            sq,
+            [point.payload.get("text") or point.payload.get("content") or "" for point in grouped_points[sq]],
+            per_query_k
+        )
+        for sq in targets
+    ]
+
+    try:
+        responses = await asyncio.wait_for(call_reranker_batch_api(groups), timeout=RERANK_TIMEOUT)
+    except Exception as e:
+        reason = f"타임아웃 ({RERANK_TIMEOUT}초)" if isinstance(e, asyncio.TimeoutError) else str(e)
+        print(f"   ⚠️ 배치 Rerank 실패: {reason}")
+        return None
+
+    all_reranked = []
+    for sq, rerank_response in zip(targets, responses):
+        points = grouped_points[sq]
+        results = rerank_response.results
+        if USE_ADAPTIVE_TOP_K:
+            results = results[:_adaptive_cutoff([result.score for result in results], min_k, per_query_k, sq)]
+        for result in results:
+            all_reranked.append((points[result.index], result.score, sq))
+        print(f"   '{sq}' → {len(results)}개 선정")
+
+    print(f"\n✓ 배치 Rerank 완료: 총 {len(all_reranked)}개 문서 선정\n")
+    return all_reranked
+
+
 # ===== 사용자 업로드 문서 검색 =====
 
 @function_tool
@@ -357,17 +698,11 @@ async def search_user_document(document_id: int, query: str, limit: int = 10) ->
     try:
         # 1. Query embedding 생성
         print("   Step 1: Embedding 생성 중...")
-        embedding_response = await asyncio.to_thread(
-            openai_client.embeddings.create,
-            model=EMBEDDING_MODEL,
-            input=query
-        )
-        query_vector = embedding_response.data[0].embedding
+        query_vector = await get_query_embedding(query)
 
         # 2. Qdrant 검색 (document_id 필터 적용)
         print(f"   Step 2: Qdrant 검색 중 (collection: {COLLECTION_USER_DOCS})...")
-        search_result = await asyncio.to_thread(
-            qdrant_client.query_points,
+        search_result = await get_async_qdrant_client().query_points(
             collection_name=COLLECTION_USER_DOCS,
             query=query_vector,
             query_filter=Filter(
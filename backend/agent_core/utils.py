@@ -4,6 +4,14 @@
 텍스트 처리 및 문서 출력을 위한 헬퍼 함수들
 """
 
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+# 문장 단위 분할: 문장 부호(. ! ? 。) 뒤 공백 또는 줄바꿈까지를 한 조각으로 (원문 그대로 이어 붙일 수 있게 공백 보존)
+_SEGMENT_RE = re.compile(r".*?(?:[.!?。](?=\s|$)|\n|$)", re.S)
+_TRUNCATION_MARK = "…"
+
 
 def dedup_consecutive_lines(text: str) -> str:
     """
@@ -27,6 +35,114 @@ def dedup_consecutive_lines(text: str) -> str:
     return "\n".join(cleaned)
 
 
+@lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str):
+    """tiktoken 인코딩 로드 (실패 시 None → 바이트 길이 기반 근사치 사용)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:  # 미설치 / 오프라인 환경에서 인코딩 파일 다운로드 실패
+        print(f"⚠️ tiktoken 인코딩 '{encoding_name}' 로드 실패 - 토큰 수를 근사치로 계산합니다: {e}")
+        return None
+
+
+def count_tokens(text: str, encoding_name: str = "o200k_base") -> int:
+    """
+    모델 토큰 수 계산
+
+    tiktoken을 쓸 수 없으면 UTF-8 3바이트당 1토큰으로 근사 (한글은 실제보다 약간 많게 잡힘)
+    """
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return -(-len(text.encode("utf-8")) // 3)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _cut_to_tokens(text: str, max_tokens: int, encoding_name: str) -> str:
+    """토큰 단위로 앞에서부터 max_tokens개만 남김 (문장 경계를 찾지 못했을 때)"""
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return text.encode("utf-8")[:max_tokens * 3].decode("utf-8", errors="ignore")
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def trim_to_token_budget(text: str, max_tokens: int, encoding_name: str = "o200k_base") -> str:
+    """
+    텍스트를 max_tokens 이내로 자르기 (가능하면 문장 / 줄 경계에서)
+
+    첫 문장부터 예산을 넘으면 토큰 단위로 자름. 잘린 경우 끝에 "…" 표시
+
+    Args:
+        text: 원본 텍스트
+        max_tokens: 최대 토큰 수
+        encoding_name: tiktoken 인코딩 이름
+
+    Returns:
+        잘린 텍스트 (예산 안이면 원본 그대로)
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, encoding_name) <= max_tokens:
+        return text
+
+    budget = max_tokens - count_tokens(_TRUNCATION_MARK, encoding_name)
+    kept, used = [], 0
+    for segment in _SEGMENT_RE.findall(text):
+        if not segment:
+            continue
+        tokens = count_tokens(segment, encoding_name)
+        if used + tokens > budget:
+            break
+        kept.append(segment)
+        used += tokens
+
+    trimmed = "".join(kept).rstrip()
+    if not trimmed:
+        trimmed = _cut_to_tokens(text, budget, encoding_name).rstrip()
+    return trimmed + _TRUNCATION_MARK
+
+
+def pack_chunks(
+    texts: List[str],
+    token_budget: int,
+    max_chunk_tokens: int,
+    overheads: Optional[List[int]] = None,
+    min_chunk_tokens: int = 32,
+    encoding_name: str = "o200k_base"
+) -> List[str]:
+    """
+    검색 청크를 순위 순서대로 토큰 예산 안에 채워 넣기
+
+    청크마다 연속 중복 라인을 제거하고 min(max_chunk_tokens, 남은 예산)에 맞게 문장 경계에서 자름.
+    남은 예산이 min_chunk_tokens보다 작아지면 이후 청크는 제외 (첫 청크는 항상 포함)
+
+    Args:
+        texts: 순위 순서의 청크 본문 리스트
+        token_budget: 전체 토큰 예산 (overheads 포함)
+        max_chunk_tokens: 청크 1개 최대 토큰 수
+        overheads: 청크별로 본문 외에 붙는 텍스트(출처, 점수 등)의 토큰 수
+        min_chunk_tokens: 청크를 넣기 위한 최소 본문 토큰 수
+        encoding_name: tiktoken 인코딩 이름
+
+    Returns:
+        texts 앞에서부터 예산 안에 들어간 청크들 (길이 <= len(texts))
+    """
+    packed = []
+    remaining = token_budget
+    for i, text in enumerate(texts):
+        overhead = overheads[i] if overheads else 0
+        allowance = min(max_chunk_tokens, remaining - overhead)
+        if allowance < min_chunk_tokens:
+            if packed:
+                break
+            allowance = min_chunk_tokens
+
+        chunk = trim_to_token_budget(dedup_consecutive_lines(text).strip(), allowance, encoding_name)
+        packed.append(chunk)
+        remaining -= count_tokens(chunk, encoding_name) + overhead
+    return packed
+
+
 def print_retrieved_documents(points, n: int = None):
     """
     검색된 문서를 콘솔에 출력 (디버깅용)
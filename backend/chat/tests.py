@@ -1,3 +1,479 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from agent_core import config as agent_config
+from agent_core.services import query_transformer_service
+from agent_core.services.embedding_service import EmbeddingCache
+from agent_core.services.query_classifier import classify_simple_query, evaluate_fast_path
+from agent_core.models.query_transformer import QueryTransformResult
+from agent_core.services.query_transform_cache import QueryTransformCache, query_transform_cache
+from agent_core.services import reranker_service
+from agent_core.services.circuit_breaker import CircuitBreaker, CircuitOpenError, hedged_call
+from agent_core.tools import search_tool
+from agent_core.tools.search_tool import _adaptive_cutoff
+from agent_core.utils import count_tokens, pack_chunks, trim_to_token_budget
+
+
+class _SlowChatCompletions:
+    """응답까지 delay초 걸리는 비동기 LLM 대역 (실제 OpenAI 호출 없음)"""
+
+    def __init__(self, delay: float, content: dict):
+        self.delay = delay
+        self.content = content
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        message = SimpleNamespace(content=json.dumps(self.content, ensure_ascii=False))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _fake_client(delay: float, content: dict):
+    return SimpleNamespace(chat=SimpleNamespace(completions=_SlowChatCompletions(delay, content)))
+
+
+class QueryTransformNonBlockingTests(SimpleTestCase):
+    """쿼리 변환 중에도 이벤트 루프(다른 SSE 스트림)가 멈추지 않는지 검증"""
+
+    def setUp(self):
+        query_transform_cache.memory.clear()  # 캐시 적중으로 LLM 경로가 생략되지 않도록
+
+    def test_concurrent_stream_keeps_flowing_during_transform(self):
+        client = _fake_client(0.5, {"rewritten_query": "FOB 인코텀즈 조건", "sub_queries": None})
+
+        async def fake_stream(ticks: list, stop: asyncio.Event):
+            # 다른 사용자의 SSE 스트림 역할: 10ms마다 청크 전송
+            while not stop.is_set():
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            ticks, stop = [], asyncio.Event()
+            stream_task = asyncio.create_task(fake_stream(ticks, stop))
+            result = await query_transformer_service.rewrite_and_decompose_query("FOB란?")
+            stop.set()
+            await stream_task
+            return result, ticks
+
+        with patch.object(query_transformer_service, "get_async_openai_client", return_value=client):
+            result, ticks = asyncio.run(scenario())
+
+        self.assertEqual(result.rewritten_query, "FOB 인코텀즈 조건")
+        # 변환 0.5초 동안 스트림이 계속 진행돼야 함 (루프가 막히면 1~2틱에 그침)
+        self.assertGreater(len(ticks), 20)
+        max_gap = max(b - a for a, b in zip(ticks, ticks[1:]))
+        self.assertLess(max_gap, 0.2)
+
+    def test_timeout_falls_back_to_raw_query(self):
+        client = _fake_client(1.0, {"rewritten_query": "사용되지 않음", "sub_queries": ["a", "b"]})
+
+        with patch.object(query_transformer_service, "get_async_openai_client", return_value=client), \
+                patch.object(query_transformer_service, "QUERY_TRANSFORM_TIMEOUT", 0.05):
+            result = asyncio.run(query_transformer_service.rewrite_and_decompose_query("수출 절차"))
+
+        self.assertEqual(result.rewritten_query, "수출 절차")
+        self.assertIsNone(result.sub_queries)
+
+
+class QueryTransformCacheTests(SimpleTestCase):
+    """쿼리 변환 결과 캐시 적중 및 프롬프트 변경 시 무효화 검증"""
+
+    def setUp(self):
+        query_transform_cache.memory.clear()
+
+    def test_cache_hit_and_prompt_invalidation(self):
+        client = _fake_client(0.0, {"rewritten_query": "CIF 인코텀즈 조건", "sub_queries": None})
+        create_calls = []
+        original_create = client.chat.completions.create
+
+        async def counting_create(**kwargs):
+            create_calls.append(kwargs)
+            return await original_create(**kwargs)
+
+        client.chat.completions.create = counting_create
+
+        with patch.object(query_transformer_service, "get_async_openai_client", return_value=client):
+            asyncio.run(query_transformer_service.rewrite_and_decompose_query("CIF란?"))
+            asyncio.run(query_transformer_service.rewrite_and_decompose_query("  CIF란? "))
+            self.assertEqual(len(create_calls), 1)
+
+            with patch.object(query_transformer_service, "QUERY_TRANSFORM_PROMPT", "변경된 프롬프트"):
+                asyncio.run(query_transformer_service.rewrite_and_decompose_query("CIF란?"))
+            self.assertEqual(len(create_calls), 2)
+
+
+class EmbeddingDiskCacheTests(SimpleTestCase):
+    """디스크 캐시가 지연 생성되고, 비동기 경로에서는 이벤트 루프 밖에서 조회/저장되는지 검증"""
+
+    def test_disk_opened_lazily_and_used_off_loop(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "emb.sqlite3")
+            cache = EmbeddingCache(model="m", max_items=8, disk_path=path, disk_max_mb=1)
+            self.assertFalse(os.path.exists(path))  # 생성만으로는 파일을 만들지 않음
+
+            disk_threads = []
+            original_get = cache.disk.get
+
+            def recording_get(key):
+                disk_threads.append(threading.current_thread())
+                return original_get(key)
+
+            cache.disk.get = recording_get
+
+            async def scenario():
+                cache.aset("FOB 위험 이전", [0.5, 0.25])
+                await asyncio.sleep(0.2)  # 스레드 풀의 디스크 저장 완료 대기
+                cache.memory.clear()
+                return await cache.aget("FOB 위험 이전")
+
+            self.assertEqual(asyncio.run(scenario()), [0.5, 0.25])
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(cache.disk_hits, 1)
+            self.assertNotIn(threading.main_thread(), disk_threads)
+
+
+class QueryTransformSharedCacheTests(SimpleTestCase):
+    """쿼리 변환 공유 캐시가 이벤트 루프 밖에서 조회/저장되고, 깨진 항목은 미스로 처리되는지 검증"""
+
+    def test_shared_tier_used_off_loop_and_corrupt_row_is_miss(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "qt.sqlite3")
+            cache = QueryTransformCache(max_items=8, ttl_seconds=60, shared_path=path, shared_max_mb=1)
+            self.assertFalse(os.path.exists(path))  # 생성만으로는 파일을 만들지 않음
+
+            shared_threads = []
+            original_get = cache.shared.get
+
+            def recording_get(key):
+                shared_threads.append(threading.current_thread())
+                return original_get(key)
+
+            cache.shared.get = recording_get
+            result = QueryTransformResult(rewritten_query="FOB 위험 이전 시점", sub_queries=None)
+
+            async def scenario():
+                cache.aset("FOB란?", "m", "prompt", result, latency=0.8)
+                await asyncio.sleep(0.2)  # 스레드 풀의 공유 캐시 저장 완료 대기
+                cache.memory.clear()
+                hit = await cache.aget("FOB란?", "m", "prompt")
+
+                cache.memory.clear()
+                cache.shared.set(cache.make_key("FOB란?", "m", "prompt"), b"{not json")
+                corrupt = await cache.aget("FOB란?", "m", "prompt")
+                return hit, corrupt
+
+            hit, corrupt = asyncio.run(scenario())
+            self.assertEqual(hit.rewritten_query, "FOB 위험 이전 시점")
+            self.assertIsNone(corrupt)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertNotIn(threading.main_thread(), shared_threads)
+
+
+class SyncViewClientCleanupTests(SimpleTestCase):
+    """동기 뷰용 asyncio.run 래퍼가 루프별 비동기 클라이언트를 닫는지 검증"""
+
+    def test_clients_closed_when_loop_ends(self):
+        async def use_clients():
+            return agent_config.get_async_reranker_client(), agent_config.get_async_openai_client()
+
+        reranker_client, openai_client = agent_config.run_with_async_clients(use_clients())
+
+        self.assertTrue(reranker_client.is_closed)
+        self.assertTrue(openai_client.is_closed())
+        self.assertEqual(len(agent_config._async_clients), 0)
+
+
+class SubQueryStreamParserTests(SimpleTestCase):
+    """스트리밍 증분 JSON 파서 회귀 테스트 (조각 경계, 이스케이프, null, 중첩 키, 중복)"""
+
+    @staticmethod
+    def _feed_all(text: str, size: int) -> list:
+        parser = query_transformer_service.SubQueryStreamParser()
+        emitted = []
+        for i in range(0, len(text), size):
+            emitted.extend(parser.feed(text[i:i + size]))
+        return emitted
+
+    def test_emits_in_order_regardless_of_chunk_size(self):
+        text = json.dumps(
+            {"rewritten_query": "수출 수입 절차", "sub_queries": ["수출 절차", "수입 절차"], "reasoning": "복합"},
+            ensure_ascii=False
+        )
+        for size in (1, 3, 7, len(text)):
+            self.assertEqual(self._feed_all(text, size), ["수출 절차", "수입 절차"])
+
+    def test_escaped_quotes_and_unicode_escapes(self):
+        text = r'{"rewritten_query": "\"FOB\" 조건", "sub_queries": ["\"FOB\" 위험", "\uc218\ucd9c \\ 통관"]}'
+        self.assertEqual(self._feed_all(text, 2), ['"FOB" 위험', "수출 \\ 통관"])
+
+    def test_null_sub_queries(self):
+        text = '{"rewritten_query": "FOB란?", "sub_queries": null, "reasoning": "단순 질문"}'
+        self.assertEqual(self._feed_all(text, 4), [])
+
+    def test_ignores_nested_key_and_other_arrays(self):
+        text = json.dumps({
+            "meta": {"sub_queries": ["중첩 무시"]},
+            "examples": ["배열 무시"],
+            "rewritten_query": "sub_queries",
+            "sub_queries": ["CIF 보험", {"x": "객체 안 문자열"}, ["중첩 배열"], "CIF 운임"],
+        }, ensure_ascii=False)
+        self.assertEqual(self._feed_all(text, 5), ["CIF 보험", "CIF 운임"])
+
+    def test_duplicates_and_blank_values_emitted_once(self):
+        text = '{"sub_queries": ["수출 절차", " 수출 절차 ", "", "수입 절차", "수출 절차"]}'
+        self.assertEqual(self._feed_all(text, 3), ["수출 절차", "수입 절차"])
+
+
+class TransformAndSearchCleanupTests(SimpleTestCase):
+    """쿼리 변환이 실패하면 추측 검색 / 스트리밍 서브쿼리 검색 태스크가 취소되는지 검증"""
+
+    def test_transform_failure_cancels_pending_searches(self):
+        cancelled = []
+
+        async def slow_search(sub_queries, limit):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.extend(sub_queries)
+                raise
+
+        async def failing_transform(query, on_sub_query=None):
+            on_sub_query("수출 절차")
+            await asyncio.sleep(0)
+            raise RuntimeError("변환 실패")
+
+        async def scenario():
+            with self.assertRaises(RuntimeError):
+                await search_tool._transform_and_search("수출과 수입 절차 차이는?", 10)
+            await asyncio.sleep(0.05)  # 취소 전파 대기
+            # asyncio.run 종료 시 정리되기 전에, 함수가 직접 취소했는지 확인
+            self.assertCountEqual(cancelled, ["수출과 수입 절차 차이는?", "수출 절차"])
+
+        with patch.multiple(
+            search_tool,
+            USE_QUERY_FAST_PATH=False,
+            USE_SPECULATIVE_SEARCH=True,
+            USE_STREAMED_DECOMPOSITION=True,
+            _multi_search=slow_search,
+            rewrite_and_decompose_query=failing_transform,
+        ):
+            asyncio.run(scenario())
+
+    def test_duplicate_streamed_sub_query_starts_one_search(self):
+        started = []
+        cancelled = []
+
+        async def slow_search(sub_queries, limit):
+            started.extend(sub_queries)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.extend(sub_queries)
+                raise
+
+        async def failing_transform(query, on_sub_query=None):
+            on_sub_query("수출 절차")
+            on_sub_query("수출 절차")  # 스트림이 같은 서브쿼리를 다시 보냄
+            await asyncio.sleep(0)
+            raise RuntimeError("변환 실패")
+
+        async def scenario():
+            with self.assertRaises(RuntimeError):
+                await search_tool._transform_and_search("수출 절차는?", 10)
+            await asyncio.sleep(0.05)
+            self.assertEqual(started, ["수출 절차"])
+            self.assertEqual(cancelled, ["수출 절차"])
+
+        with patch.multiple(
+            search_tool,
+            USE_QUERY_FAST_PATH=False,
+            USE_SPECULATIVE_SEARCH=False,
+            USE_STREAMED_DECOMPOSITION=True,
+            _multi_search=slow_search,
+            rewrite_and_decompose_query=failing_transform,
+        ):
+            asyncio.run(scenario())
+
+
+class QueryFastPathTests(SimpleTestCase):
+    """로컬 Fast-path 분류기를 라벨링된 질문 세트로 평가"""
+
+    def test_labelled_set(self):
+        report = evaluate_fast_path()
+        # 복합 질문을 Fast-path로 넘기는 일은 없어야 함
+        self.assertEqual(report["precision"], 1.0, report["mistakes"])
+        self.assertGreaterEqual(report["recall"], 0.9, report["mistakes"])
+
+    def test_fast_path_result_has_no_sub_queries(self):
+        result = classify_simple_query("  FOB란? ")
+        self.assertEqual(result.rewritten_query, "FOB란?")
+        self.assertIsNone(result.sub_queries)
+
+
+class RerankerCircuitBreakerTests(SimpleTestCase):
+    """Reranker 서킷 브레이커 열림/반열림/복구 및 헤지 요청 검증"""
+
+    def _breaker(self):
+        return CircuitBreaker(
+            name="test", window_size=4, min_calls=4, failure_rate_threshold=0.5,
+            slow_call_seconds=1.0, slow_call_rate_threshold=0.75, open_seconds=0.05
+        )
+
+    def test_trips_on_failure_rate_and_recovers_after_probe(self):
+        breaker = self._breaker()
+        for ok in (True, False, True, False):
+            breaker.before_call()
+            breaker.record_success(0.1) if ok else breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # 열린 동안에는 호출 없이 즉시 거절
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        # open_seconds 이후 탐색 호출 1건만 허용
+        time.sleep(0.06)
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_trips_on_slow_calls(self):
+        breaker = self._breaker()
+        for latency in (2.0, 2.0, 2.0, 0.1):
+            breaker.before_call()
+            breaker.record_success(latency)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_cancelled_probe_releases_half_open_slot(self):
+        breaker = self._breaker()
+        for _ in range(4):
+            breaker.before_call()
+            breaker.record_failure()
+        time.sleep(0.06)  # 반열림 전환 대기
+
+        class _HangingClient:
+            async def post(self, url, json):
+                await asyncio.sleep(10)
+
+        async def probe():
+            # 탐색 호출이 느린 호출 기준(1초)보다 빨리 wait_for 타임아웃으로 취소됨
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(reranker_service._post_reranker("http://reranker/rerank", {}), timeout=0.05)
+
+        with patch.multiple(
+            reranker_service,
+            reranker_breaker=breaker,
+            USE_RERANK_HEDGING=False,
+            RERANK_BREAKER_SLOW_CALL_SECONDS=1.0,
+            get_async_reranker_client=lambda: _HangingClient(),
+        ):
+            asyncio.run(probe())
+
+        # 탐색 슬롯이 반환되어 다음 호출이 다시 복구 확인을 할 수 있음
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.before_call()
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_hedged_call_returns_faster_response(self):
+        delays = [1.0, 0.01]  # 첫 요청은 느리고, 헤지 요청은 빠름
+
+        async def call():
+            delay = delays.pop(0)
+            await asyncio.sleep(delay)
+            return delay
+
+        started = time.monotonic()
+        result = asyncio.run(hedged_call(call, delay=0.05))
+        self.assertEqual(result, 0.01)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+class RerankerSingleFlightTests(SimpleTestCase):
+    """동시에 들어온 같은 Reranker 요청이 HTTP 1회로 합쳐지는지 검증"""
+
+    def test_concurrent_duplicates_share_one_call(self):
+        calls = []
+
+        async def fake_post(url, payload):
+            calls.append(payload["query"])
+            await asyncio.sleep(0.05)
+            return {"results": [{"index": 1, "score": 0.9}], "query": payload["query"], "total_documents": 2}
+
+        async def scenario():
+            same = [reranker_service.call_reranker_api("FOB 위험 이전", ["a", "b"], top_k=1) for _ in range(5)]
+            other = reranker_service.call_reranker_api("FOB 위험 이전", ["a", "b"], top_k=2)
+            return await asyncio.gather(*same, other)
+
+        with patch.object(reranker_service, "_post_reranker", fake_post):
+            responses = asyncio.run(scenario())
+
+        self.assertEqual(len(calls), 2)  # top_k가 다른 요청만 따로 전송
+        self.assertTrue(all(r.results[0].index == 1 for r in responses))
+
+        # 완료된 요청은 캐시하지 않음 → 다시 호출하면 새로 전송
+        with patch.object(reranker_service, "_post_reranker", fake_post):
+            asyncio.run(reranker_service.call_reranker_api("FOB 위험 이전", ["a", "b"], top_k=1))
+        self.assertEqual(len(calls), 3)
+
+
+class AdaptiveTopKTests(SimpleTestCase):
+    """Rerank 점수 분포에 따라 전달할 문서 수가 정해지는지 검증"""
+
+    def test_cuts_at_largest_gap(self):
+        scores = [6.1, 5.8, 5.5, 5.2, 1.0, 0.8, 0.5, 0.1]
+        self.assertEqual(_adaptive_cutoff(scores, min_k=2, max_k=8), 4)
+
+    def test_tool_top_k_caps_per_query_rerank(self):
+        requested = []
+
+        async def fake_rerank(query, documents, top_k):
+            requested.append(top_k)
+            results = [{"index": i, "score": 5.0 - 0.1 * i} for i in range(min(top_k, len(documents)))]
+            return reranker_service.RerankResponse(results=results, query=query, total_documents=len(documents))
+
+        point = SimpleNamespace(payload={"text": "본문"}, score=0.5)
+        grouped = {"수출 절차": [point] * 8, "수입 절차": [point] * 8}
+        with patch.multiple(search_tool, call_reranker_api=fake_rerank, USE_BATCH_RERANK=False, USE_ADAPTIVE_TOP_K=True):
+            results = asyncio.run(search_tool._rerank_per_query(grouped, ["수출 절차", "수입 절차"], 4))
+
+        # Tool이 요청한 top_k=4를 넘지 않음 (RERANK_ADAPTIVE_MAX_K=10으로 올리지 않음)
+        self.assertEqual(requested, [2, 2])
+        self.assertLessEqual(len(results), 4)
+
+    def test_threshold_and_bounds(self):
+        # 임계값(-2.0) 미만 제외, 최소 개수는 점수와 무관하게 보장
+        self.assertEqual(_adaptive_cutoff([1.0, 0.5, 0.2, -2.5, -3.0], min_k=1, max_k=5), 3)
+        self.assertEqual(_adaptive_cutoff([-4.0, -4.2, -4.5, -5.0], min_k=3, max_k=4), 3)
+        # 점수가 고르면 최대 개수까지
+        self.assertEqual(_adaptive_cutoff([3.0 - 0.1 * i for i in range(12)], min_k=3, max_k=10), 10)
+        self.assertEqual(_adaptive_cutoff([], min_k=3, max_k=10), 0)
+
+
+class TokenBudgetPackingTests(SimpleTestCase):
+    """검색 청크가 토큰 예산 안에서 문장 경계로 잘리는지 검증"""
+
+    ARTICLE = "제1조(목적) 이 법은 대외무역을 진흥하기 위한 것이다. " * 40
+
+    def test_trim_keeps_whole_sentences(self):
+        trimmed = trim_to_token_budget(self.ARTICLE, 60)
+        self.assertLessEqual(count_tokens(trimmed), 60)
+        self.assertTrue(trimmed.endswith("것이다.…"))
+
+    def test_pack_respects_budget_and_rank_order(self):
+        texts = [self.ARTICLE, "짧은 청크\n짧은 청크\n짧은 청크"] + [self.ARTICLE] * 8
+        packed = pack_chunks(texts, token_budget=300, max_chunk_tokens=120, overheads=[10] * len(texts))
+
+        self.assertLess(len(packed), len(texts))  # 예산을 넘는 뒤쪽 청크는 제외
+        self.assertEqual(packed[1], "짧은 청크")  # 연속 중복 라인 제거
+        used = sum(count_tokens(chunk) + 10 for chunk in packed)
+        self.assertLessEqual(used, 300)
+        self.assertTrue(all(count_tokens(chunk) <= 120 for chunk in packed))
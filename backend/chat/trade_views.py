@@ -2,7 +2,6 @@
 Trade and Document Management Views with Mem0 Integration
 """
 
-import asyncio
 import json
 import logging
 import re
@@ -19,6 +18,7 @@ from django.utils.decorators import method_decorator
 from agents import Runner
 from agents.items import ToolCallItem
 from agent_core import get_document_writing_agent, get_read_document_agent
+from agent_core.config import run_with_async_clients
 from .config import PROMPT_VERSION, PROMPT_LABEL
 
 from .models import (
@@ -657,7 +657,7 @@ class DocumentChatView(APIView):
 
             logger.info(f"Agent input 준비 완료: {len(input_items)}개 메시지")
 
-            result = asyncio.run(Runner.run(
+            result = run_with_async_clients(Runner.run(
                 agent,
                 input=input_items if len(input_items) > 1 else enhanced_input,
             ))
@@ -14,6 +14,7 @@ from django.utils.decorators import method_decorator
 from agents import Runner
 from agents.items import ToolCallItem
 from agent_core import get_trade_agent, get_document_writing_agent
+from agent_core.config import run_with_async_clients
 from .config import PROMPT_VERSION, PROMPT_LABEL
 from .models import User, GenChat, GenMessage, Department
 from .serializers import GenChatSerializer, GenMessageSerializer
@@ -206,7 +207,7 @@ class ChatView(APIView):
                 full_input = message
 
             # Agent 실행
-            result = asyncio.run(Runner.run(agent, input=full_input))
+            result = run_with_async_clients(Runner.run(agent, input=full_input))
 
             # 사용된 툴 정보 추출
             tools_used = extract_tools_used(result)
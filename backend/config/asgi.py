@@ -13,4 +13,31 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def _handle_lifespan(receive, send):
+    """
+    ASGI lifespan 처리 (Django는 lifespan 스코프를 지원하지 않음)
+
+    shutdown 시 agent_core의 비동기 클라이언트(OpenAI, Qdrant, Reranker 커넥션 풀)를 닫습니다.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            try:
+                from agent_core.config import close_async_clients
+                await close_async_clients()
+            except Exception as e:
+                print(f"⚠️ 비동기 클라이언트 종료 실패: {e}")
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _handle_lifespan(receive, send)
+        return
+    await django_application(scope, receive, send)
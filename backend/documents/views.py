@@ -4,7 +4,6 @@ Document API Views
 새로운 DB 구조에 맞춘 View 정의
 """
 
-import asyncio
 import json
 import time
 import logging
@@ -41,6 +40,7 @@ from .serializers import (
     ChatRequestSerializer,
     ChatResponseSerializer,
 )
+from agent_core.config import run_with_async_clients
 from agent_core.s3_utils import s3_manager
 
 logger = logging.getLogger(__name__)
@@ -684,7 +684,7 @@ class DocumentChatView(APIView):
             if context.get('context_summary'):
                 enhanced_input = f"[{context['context_summary']}]\n\n{message}"
 
-            result = asyncio.run(Runner.run(agent, input=enhanced_input))
+            result = run_with_async_clients(Runner.run(agent, input=enhanced_input))
 
             # 사용된 툴 추출
             tools_used = []
@@ -0,0 +1,4 @@
+"""pytest 설정 (reranker 디렉토리 기준 import: from services.X import ...)"""
+
+# 서버에 직접 요청을 보내는 수동 점검 스크립트 (pytest 테스트 아님)
+collect_ignore = ["test_api.py", "load_test.py"]
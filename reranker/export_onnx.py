@@ -0,0 +1,149 @@
+"""
+Reranker ONNX 내보내기 + 점수 일치도 검증 스크립트
+
+사용법 (reranker 디렉토리에서 실행):
+    # fp32 ONNX 내보내기 → int8 동적 양자화 → torch 기준 백엔드와 점수 비교
+    python export_onnx.py export --output-dir onnx
+
+    # 이미 만든 모델 / torch-int8 백엔드만 검증
+    python export_onnx.py parity --backend onnx --onnx-path onnx/model.int8.onnx
+    python export_onnx.py parity --backend torch-int8
+
+필요 패키지: onnx, onnxruntime (CPU 백엔드 전용, 기본 requirements에는 포함되지 않음)
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import torch
+from mxbai_rerank import MxbaiRerankV2
+
+from services.backends import (
+    ONNX_INPUT_NAMES,
+    ONNX_OUTPUT_NAME,
+    load_reranker,
+    score_parity,
+)
+from services.onnx_backend import OnnxMxbaiRerankV2, RerankerScoreHead
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "mixedbread-ai/mxbai-rerank-large-v2"
+
+# 일치도 검증용 샘플 (무역 도메인 질문 + 관련/무관 문서 섞음)
+PARITY_QUERIES = [
+    "FOB 조건에서 위험은 언제 이전되나요?",
+    "신용장 개설 절차",
+    "수출 신고 시 필요한 서류",
+]
+PARITY_DOCUMENTS = [
+    "FOB 조건에서 물품의 멸실 또는 손상의 위험은 물품이 선적항에서 본선에 적재된 때 매도인으로부터 매수인에게 이전된다.",
+    "신용장은 수입자의 거래은행이 수출자에게 대금 지급을 확약하는 증서로, 수입자가 개설 신청서를 제출하면서 시작된다.",
+    "수출 신고 시에는 상업송장, 포장명세서, 그리고 필요에 따라 원산지 증명서 등을 함께 제출한다.",
+    "CIF 조건에서 매도인은 목적항까지의 운임과 최소 보험 조건의 적하보험료를 부담한다.",
+    "올림픽 게임의 역사는 기원전 776년경 고대 그리스로 거슬러 올라갑니다.",
+    "규칙적인 신체 활동은 칼로리를 연소하고 근육량을 늘려 체중 조절에 도움이 됩니다.",
+]
+
+
+def parity_pairs():
+    """모든 (쿼리, 문서) 조합"""
+    queries, documents = [], []
+    for query in PARITY_QUERIES:
+        queries.extend([query] * len(PARITY_DOCUMENTS))
+        documents.extend(PARITY_DOCUMENTS)
+    return queries, documents
+
+
+def export(model_name: str, output_dir: str, opset: int, quantize: bool) -> str:
+    """fp32 ONNX 내보내기 (+ int8 동적 양자화), 최종 모델 경로 반환"""
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, "model.onnx")
+
+    logger.info(f"🔄 기준 모델 로딩 (CPU, fp32): {model_name}")
+    reference = MxbaiRerankV2(model_name, device="cpu", torch_dtype=torch.float32)
+    head = RerankerScoreHead(reference).eval()
+
+    sample = reference.prepare_inputs(queries=PARITY_QUERIES[:2], documents=PARITY_DOCUMENTS[:2])
+    logger.info(f"📦 ONNX 내보내기: {fp32_path} (opset {opset})")
+    with torch.inference_mode():
+        torch.onnx.export(
+            head,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=ONNX_INPUT_NAMES,
+            output_names=[ONNX_OUTPUT_NAME],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                ONNX_OUTPUT_NAME: {0: "batch"},
+            },
+            opset_version=opset,
+        )
+
+    if not quantize:
+        return fp32_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = os.path.join(output_dir, "model.int8.onnx")
+    logger.info(f"🗜️ int8 동적 양자화: {int8_path}")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8, use_external_data_format=True)
+    return int8_path
+
+
+def check_parity(model_name: str, backend: str, onnx_path: str, num_threads: int,
+                 min_top1: float, min_spearman: float) -> bool:
+    """torch 기준 백엔드와 점수 비교 (기준 미달 시 False)"""
+    logger.info("🔄 기준(torch fp32) / 비교 대상 백엔드 로딩")
+    reference = MxbaiRerankV2(model_name, device="cpu", torch_dtype=torch.float32)
+    if backend == "onnx":
+        candidate = OnnxMxbaiRerankV2(model_name, onnx_path, num_threads=num_threads)
+    else:
+        candidate = load_reranker(model_name, backend=backend)
+
+    queries, documents = parity_pairs()
+    report = score_parity(reference, candidate, queries, documents)
+
+    print("\n" + "=" * 60)
+    print(f"📊 점수 일치도 ({backend} vs torch fp32, {report['pairs']}쌍)")
+    print("=" * 60)
+    print(f"  최대 절대 오차: {report['max_abs_diff']:.4f}")
+    print(f"  평균 절대 오차: {report['mean_abs_diff']:.4f}")
+    print(f"  쿼리별 top-1 일치율: {report['top1_agreement']:.2%}")
+    print(f"  순위 상관(스피어만): {report['spearman']:.4f}")
+
+    passed = report["top1_agreement"] >= min_top1 and report["spearman"] >= min_spearman
+    print(f"\n{'✅ 통과' if passed else '❌ 기준 미달'} (top-1 ≥ {min_top1:.0%}, 스피어만 ≥ {min_spearman})")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reranker ONNX 내보내기 및 점수 일치도 검증")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--output-dir", default="onnx")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--no-quantize", action="store_true", help="int8 양자화 생략 (fp32 ONNX만 생성)")
+    parser.add_argument("--backend", choices=["onnx", "torch-int8"], default="onnx")
+    parser.add_argument("--onnx-path", default=None)
+    parser.add_argument("--num-threads", type=int, default=0)
+    parser.add_argument("--min-top1", type=float, default=1.0)
+    parser.add_argument("--min-spearman", type=float, default=0.98)
+    args = parser.parse_args()
+
+    onnx_path = args.onnx_path
+    if args.command == "export":
+        onnx_path = export(args.model, args.output_dir, args.opset, quantize=not args.no_quantize)
+    elif args.backend == "onnx" and onnx_path is None:
+        onnx_path = os.path.join(args.output_dir, "model.int8.onnx")
+
+    passed = check_parity(args.model, args.backend, onnx_path, args.num_threads, args.min_top1, args.min_spearman)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Reranker 부하 테스트 / 지연 시간 벤치마크
+
+실제 사용 패턴(질문 1개 + 청크 25개)의 요청을 지정한 동시성 또는 초당 요청 수로 보내고
+p50/p95/p99 지연 시간, 처리량, 배치 크기 분포, 에러율을 출력합니다.
+
+사용법 (reranker 디렉토리에서 실행):
+    # 배포된 서버 대상 (동시 요청 32개, 30초)
+    python load_test.py --url http://localhost:8000 --concurrency 32 --duration 30
+
+    # 초당 50요청 고정 속도 (open loop, 서버가 밀려도 요청 간격 유지)
+    python load_test.py --url http://localhost:8000 --rate 50 --duration 30
+
+    # 모델 없이 앱을 프로세스 안에서 실행 (스텁 모델, CI 회귀 검사용)
+    python load_test.py --in-process --no-score-cache --concurrency 64 --requests 2000 --min-throughput 80
+    (스텁 기본 시간 기준 상한 약 150 req/s, 실측 100 req/s 안팎 → 80은 여유를 둔 회귀 기준)
+
+기준(--min-throughput / --max-p99-ms / --max-error-rate)을 못 맞추면 종료 코드 1
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from typing import List, Optional
+
+import httpx
+
+# 무역 실무 질문 / 청크 샘플 (청크는 문장을 이어 붙여 100~800자로 만듦)
+SAMPLE_QUERIES = [
+    "FOB 조건에서 위험은 언제 이전되나요?",
+    "신용장 개설 절차를 알려주세요",
+    "수출 신고 시 필요한 서류는 무엇인가요?",
+    "CIF와 CFR의 차이점은?",
+    "원산지 증명서 발급 방법",
+    "HS 코드는 어떻게 분류하나요?",
+    "관세 환급 신청 요건",
+    "선하증권의 종류와 역할",
+]
+SAMPLE_SENTENCES = [
+    "FOB 조건에서 물품의 멸실 또는 손상의 위험은 물품이 선적항에서 본선에 적재된 때 매수인에게 이전된다.",
+    "신용장은 수입자의 거래은행이 수출자에게 대금 지급을 확약하는 증서이다.",
+    "수출 신고 시에는 상업송장, 포장명세서, 필요에 따라 원산지 증명서를 함께 제출한다.",
+    "CIF 조건에서 매도인은 목적항까지의 운임과 최소 조건의 적하보험료를 부담한다.",
+    "HS 코드는 국제통일상품분류체계에 따라 6단위까지 국제적으로 공통으로 사용된다.",
+    "관세 환급은 수출용 원재료를 수입할 때 납부한 관세를 수출 이행 후 돌려받는 제도이다.",
+    "선하증권은 운송인이 화물을 수령했음을 증명하고 목적지에서 화물을 인도받을 권리를 나타내는 유가증권이다.",
+    "인코텀즈 2020은 11가지 거래 조건을 규정하며 운송 방식에 따라 두 그룹으로 나뉜다.",
+    "포장명세서에는 품목별 수량, 중량, 용적과 화인이 기재된다.",
+    "수입 통관 시 세관은 신고 내용과 실제 물품이 일치하는지 서류 심사 또는 물품 검사를 한다.",
+]
+CHUNKS_PER_REQUEST = 25
+
+
+def make_payloads(count: int, chunks: int, seed: int) -> List[dict]:
+    """(질문, 청크 chunks개) 요청 본문 count개 생성 (청크 길이는 100~800자로 섞임)"""
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        documents = []
+        for _ in range(chunks):
+            target = rng.randint(100, 800)
+            text = ""
+            while len(text) < target:
+                text += rng.choice(SAMPLE_SENTENCES) + " "
+            documents.append(text[:target])
+        payloads.append({"query": rng.choice(SAMPLE_QUERIES), "documents": documents, "top_k": 5})
+    return payloads
+
+
+def load_payloads(path: str) -> List[dict]:
+    """JSONL 파일에서 요청 본문 읽기 (한 줄에 {"query", "documents", "top_k"})"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """정렬 기반 백분위수 (최근접 순위)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class StubReranker:
+    """
+    모델 없이 배칭 / 대기열 코드만 측정하기 위한 스텁
+
+    forward pass 시간을 base_ms + per_pair_ms × 쌍 개수로 흉내내고 (GPU 배치 효율과 비슷한 모양),
+    점수는 쿼리와 문서의 글자 겹침으로 계산합니다.
+    """
+
+    def __init__(self, base_ms: float, per_pair_ms: float):
+        self.base = base_ms / 1000
+        self.per_pair = per_pair_ms / 1000
+
+    def predict(self, queries: List[str], documents: List[str]):
+        import numpy as np
+
+        time.sleep(self.base + self.per_pair * len(queries))
+        return np.array([len(set(q) & set(d)) / (len(set(q)) or 1) for q, d in zip(queries, documents)])
+
+
+class LoadTestResult:
+    """요청별 결과 수집 및 리포트"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.pairs = 0
+        self.started = 0.0
+        self.finished = 0.0
+
+    def record(self, status: str, latency: float, pairs: int):
+        self.statuses[status] += 1
+        if status == "200":
+            self.latencies.append(latency)
+            self.pairs += pairs
+
+    @property
+    def total(self) -> int:
+        return sum(self.statuses.values())
+
+    @property
+    def elapsed(self) -> float:
+        return max(self.finished - self.started, 1e-9)
+
+    @property
+    def error_rate(self) -> float:
+        return 1 - self.statuses["200"] / self.total if self.total else 0.0
+
+    def summary(self) -> dict:
+        ms = [latency * 1000 for latency in self.latencies]
+        return {
+            "requests": self.total,
+            "ok": self.statuses["200"],
+            "error_rate": round(self.error_rate, 4),
+            "statuses": dict(self.statuses),
+            "elapsed_s": round(self.elapsed, 2),
+            "throughput_rps": round(self.statuses["200"] / self.elapsed, 2),
+            "throughput_pairs_per_s": round(self.pairs / self.elapsed, 1),
+            "latency_ms": {
+                "p50": round(percentile(ms, 50), 1),
+                "p95": round(percentile(ms, 95), 1),
+                "p99": round(percentile(ms, 99), 1),
+                "mean": round(sum(ms) / len(ms), 1) if ms else 0.0,
+                "max": round(max(ms), 1) if ms else 0.0,
+            },
+        }
+
+
+async def _send(client: httpx.AsyncClient, payload: dict, result: LoadTestResult, timeout: float):
+    started = time.perf_counter()
+    try:
+        response = await client.post("/rerank", json=payload, timeout=timeout)
+        status = str(response.status_code)
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    result.record(status, time.perf_counter() - started, len(payload["documents"]))
+
+
+async def run_closed_loop(client, payloads, concurrency: int, total: Optional[int], duration: Optional[float],
+                          timeout: float) -> LoadTestResult:
+    """동시성 고정: 워커 concurrency개가 응답을 받는 즉시 다음 요청 전송"""
+    result = LoadTestResult()
+    counter = iter(range(total if total else sys.maxsize))
+    result.started = time.perf_counter()
+    deadline = result.started + duration if duration else None
+
+    async def worker():
+        for i in counter:
+            if deadline and time.perf_counter() >= deadline:
+                return
+            await _send(client, payloads[i % len(payloads)], result, timeout)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    result.finished = time.perf_counter()
+    return result
+
+
+async def run_open_loop(client, payloads, rate: float, total: Optional[int], duration: Optional[float],
+                        timeout: float, seed: int) -> LoadTestResult:
+    """속도 고정: 포아송 도착(평균 초당 rate개)으로 응답을 기다리지 않고 전송"""
+    result = LoadTestResult()
+    rng = random.Random(seed)
+    tasks = []
+    result.started = time.perf_counter()
+    next_at = result.started
+    i = 0
+    while (total is None or i < total) and (duration is None or next_at - result.started < duration):
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        tasks.append(asyncio.create_task(_send(client, payloads[i % len(payloads)], result, timeout)))
+        next_at += rng.expovariate(rate)
+        i += 1
+    await asyncio.gather(*tasks)
+    result.finished = time.perf_counter()
+    return result
+
+
+async def fetch_batching(client: httpx.AsyncClient) -> dict:
+    """서버 /health의 마이크로 배칭 통계"""
+    try:
+        response = await client.get("/health", timeout=10)
+        return response.json()["services"]["reranker"].get("batching", {}) or {}
+    except (httpx.HTTPError, KeyError, ValueError):
+        return {}
+
+
+def histogram_delta(before: dict, after: dict) -> dict:
+    """부하 테스트 동안 늘어난 배치 크기 분포"""
+    old = before.get("batch_pairs_histogram", {})
+    new = after.get("batch_pairs_histogram", {})
+    return {bucket: count - old.get(bucket, 0) for bucket, count in new.items() if count - old.get(bucket, 0)}
+
+
+def print_report(summary: dict, batching: dict, histogram: dict):
+    latency = summary["latency_ms"]
+    print("\n" + "=" * 60)
+    print("📊 Reranker 부하 테스트 결과")
+    print("=" * 60)
+    print(f"  요청: {summary['requests']}개 (성공 {summary['ok']}개, 에러율 {summary['error_rate']:.2%})")
+    print(f"  응답 코드: {summary['statuses']}")
+    print(f"  소요 시간: {summary['elapsed_s']}초")
+    print(f"  처리량: {summary['throughput_rps']} req/s, {summary['throughput_pairs_per_s']} pairs/s")
+    print(f"  지연 시간(ms): p50 {latency['p50']} / p95 {latency['p95']} / p99 {latency['p99']} "
+          f"/ 평균 {latency['mean']} / 최대 {latency['max']}")
+
+    if histogram:
+        total = sum(histogram.values())
+        print("\n  배치 크기 분포 (쌍):")
+        for bucket, count in histogram.items():
+            print(f"    {bucket:>7}: {count:6d} {'█' * max(1, round(count / total * 40))}")
+    if batching:
+        print(f"\n  서버 평균: 배치 {batching.get('avg_batch_pairs')}쌍, 대기 {batching.get('avg_queue_wait_ms')}ms, "
+              f"추론 {batching.get('avg_inference_ms')}ms")
+
+
+async def run(args) -> dict:
+    payloads = load_payloads(args.payload_file) if args.payload_file else make_payloads(
+        args.payload_count, args.chunks, args.seed
+    )
+
+    if args.in_process:
+        import logging
+        import main
+        import services.reranker
+        from services.reranker import reranker_service
+
+        logging.getLogger("httpx").setLevel(logging.WARNING)  # 요청마다 찍히는 ASGI 전송 로그 생략
+        if args.no_score_cache:
+            services.reranker.USE_SCORE_CACHE = False  # 반복 요청도 매번 배치 / 모델 경로를 타도록
+        reranker_service.model = StubReranker(args.stub_base_ms, args.stub_per_pair_ms)
+        reranker_service.state = "ready"
+        transport = httpx.ASGITransport(app=main.app)
+        base_url = "http://in-process"
+    else:
+        transport = None
+        base_url = args.url.rstrip("/")
+
+    limits = httpx.Limits(max_connections=max(args.concurrency, 100), max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits) as client:
+        before = await fetch_batching(client)
+        if args.rate:
+            result = await run_open_loop(client, payloads, args.rate, args.requests, args.duration, args.timeout, args.seed)
+        else:
+            result = await run_closed_loop(client, payloads, args.concurrency, args.requests, args.duration, args.timeout)
+        after = await fetch_batching(client)
+
+    if args.in_process:
+        await reranker_service.scheduler.stop()
+
+    summary = result.summary()
+    summary["batch_pairs_histogram"] = histogram_delta(before, after)
+    print_report(summary, after, summary["batch_pairs_histogram"])
+    return summary
+
+
+def check_thresholds(summary: dict, args) -> bool:
+    """CI 기준 검사 (기준 미달 항목 출력)"""
+    failures = []
+    if args.min_throughput is not None and summary["throughput_rps"] < args.min_throughput:
+        failures.append(f"처리량 {summary['throughput_rps']} req/s < {args.min_throughput}")
+    if args.max_p99_ms is not None and summary["latency_ms"]["p99"] > args.max_p99_ms:
+        failures.append(f"p99 {summary['latency_ms']['p99']}ms > {args.max_p99_ms}ms")
+    if summary["error_rate"] > args.max_error_rate:
+        failures.append(f"에러율 {summary['error_rate']:.2%} > {args.max_error_rate:.2%}")
+
+    for failure in failures:
+        print(f"❌ 기준 미달: {failure}")
+    if not failures:
+        print("\n✅ 기준 통과")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reranker 부하 테스트 / 지연 시간 벤치마크")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="대상 서버 주소 (예: http://localhost:8000)")
+    target.add_argument("--in-process", action="store_true", help="스텁 모델로 앱을 프로세스 안에서 실행")
+
+    parser.add_argument("--concurrency", type=int, default=16, help="동시 요청 수 (closed loop)")
+    parser.add_argument("--rate", type=float, default=None, help="초당 요청 수 (지정하면 open loop)")
+    parser.add_argument("--requests", type=int, default=None, help="총 요청 수")
+    parser.add_argument("--duration", type=float, default=None, help="실행 시간 (초)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="요청 1개 타임아웃 (초)")
+
+    parser.add_argument("--payload-file", default=None, help="요청 본문 JSONL (없으면 합성 요청 생성)")
+    parser.add_argument("--payload-count", type=int, default=200, help="합성 요청 종류 수")
+    parser.add_argument("--chunks", type=int, default=CHUNKS_PER_REQUEST, help="요청당 청크 수")
+    parser.add_argument("--seed", type=int, default=42)
+
+    parser.add_argument("--stub-base-ms", type=float, default=8.0, help="스텁 forward pass 고정 시간 (ms)")
+    parser.add_argument("--stub-per-pair-ms", type=float, default=0.2, help="스텁 쌍당 추가 시간 (ms)")
+    parser.add_argument("--no-score-cache", action="store_true", help="(--in-process) 점수 캐시 끄기")
+
+    parser.add_argument("--min-throughput", type=float, default=None, help="최소 처리량 (req/s)")
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="최대 p99 지연 시간 (ms)")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="최대 에러율 (0~1)")
+    parser.add_argument("--json", default=None, help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    if args.requests is None and args.duration is None:
+        args.requests = 500
+
+    summary = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    sys.exit(0 if check_thresholds(summary, args) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,18 @@ Unified API - Reranker + OCR
 import os
 os.environ["HF_HUB_ENABLE_HF_TRANSFER"] = "1" # 모델 로드 빠르게 하게 해줌 (필수)
 
+import asyncio
 import logging
-from fastapi import FastAPI
+import time
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 
 from routers import reranker_router
 from services.reranker import reranker_service
+from services.backends import RERANKER_BACKEND
+from services.worker_pool import RERANKER_WORKERS
 
 # 로깅 설정
 logging.basicConfig(
@@ -32,24 +39,59 @@ app = FastAPI(
 
 # ==================== 시작 이벤트 ====================
 
-@app.on_event("startup")
-async def startup_event():
-    """서버 시작 시 모델들을 로드합니다"""
-    logger.info("서버 시작 중...")
+# 백그라운드 모델 로딩 태스크 (서버는 바로 요청을 받고, /health로 준비 상태를 노출)
+_reranker_loader: Optional[asyncio.Task] = None
+
 
-    # Reranker 모델 로딩
+async def _load_reranker():
+    """Reranker 모델 로딩 + 워밍업 (RERANKER_WORKERS > 1이면 supervisor 모드: 워커 프로세스마다 모델 로드)"""
     try:
-        await reranker_service.load_model()
+        if RERANKER_WORKERS > 1:
+            await reranker_service.start_worker_pool(RERANKER_WORKERS)
+        else:
+            await reranker_service.load_model()
     except Exception as e:
         logger.error(f"Reranker 모델 로딩 실패: {e}")
 
+
+@app.on_event("startup")
+async def startup_event():
+    """서버 시작 시 모델 로딩을 백그라운드로 시작합니다"""
+    global _reranker_loader
+    logger.info("서버 시작 중...")
+
+    # Reranker 모델 로딩 (준비 전 /rerank 요청은 503 + Retry-After)
+    _reranker_loader = asyncio.create_task(_load_reranker())
+
     # OCR 모델 로딩 (나중에 추가)
     # try:
     #     await ocr_service.load_model()
     # except Exception as e:
     #     logger.error(f"OCR 모델 로딩 실패: {e}")
 
-    logger.info("서버 준비 완료 V")
+    logger.info("서버 준비 완료 V (모델은 백그라운드에서 로딩 중, /health의 status 확인)")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시 배치 스케줄러와 워커 프로세스를 정리합니다"""
+    if _reranker_loader is not None and not _reranker_loader.done():
+        _reranker_loader.cancel()
+    await reranker_service.scheduler.stop()
+    await reranker_service.stop_worker_pool()
+
+
+# ==================== 메트릭 수집 ====================
+
+@app.middleware("http")
+async def observe_rerank_requests(request: Request, call_next):
+    """/rerank 요청의 응답 코드 / 전체 지연 시간 기록"""
+    if not request.url.path.startswith("/rerank"):
+        return await call_next(request)
+    started = time.monotonic()
+    response = await call_next(request)
+    reranker_service.metrics.observe_request(request.url.path, response.status_code, time.monotonic() - started)
+    return response
 
 
 # ==================== 라우터 등록 ====================
@@ -71,8 +113,9 @@ async def root():
         "version": "1.0.0",
         "services": {
             "reranker": {
-                "status": "available" if reranker_service.is_ready() else "loading",
+                "status": "available" if reranker_service.is_ready() else reranker_service.status(),
                 "model": "mixedbread-ai/mxbai-rerank-large-v2",
+                "backend": RERANKER_BACKEND,
                 "endpoint": "/rerank"
             },
             "ocr": {
@@ -95,7 +138,12 @@ async def health_check():
         "services": {
             "reranker": {
                 "loaded": reranker_service.is_ready(),
-                "status": "ready" if reranker_service.is_ready() else "not loaded"
+                "status": reranker_service.status(),
+                "cold_start_seconds": reranker_service.cold_start_seconds,
+                "backend": RERANKER_BACKEND,
+                "batching": reranker_service.stats(),
+                "workers": reranker_service.worker_stats(),
+                "caches": reranker_service.cache_stats()
             }
             # "ocr": {
             #     "loaded": ocr_service.is_ready(),
@@ -105,6 +153,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 메트릭 (대기열 깊이 / 대기·추론 시간 / 배치 크기 / 캐시 적중 / 거절 수)"""
+    return PlainTextResponse(reranker_service.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # ==================== 서버 실행 ====================
 
 if __name__ == "__main__":
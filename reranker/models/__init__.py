@@ -0,0 +1,18 @@
+# Pydantic 모델 (Request/Response)
+from .reranker import (
+    RerankRequest,
+    RerankResult,
+    RerankResponse,
+    RerankGroup,
+    RerankBatchRequest,
+    RerankBatchResponse,
+)
+
+__all__ = [
+    "RerankRequest",
+    "RerankResult",
+    "RerankResponse",
+    "RerankGroup",
+    "RerankBatchRequest",
+    "RerankBatchResponse",
+]
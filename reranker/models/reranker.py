@@ -0,0 +1,86 @@
+"""Reranker API 요청/응답 모델"""
+
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class RerankRequest(BaseModel):
+    """
+    리랭킹 요청 (쿼리 1개)
+
+    documents 대신 document_hashes(본문 SHA-256)만 보낼 수 있음.
+    서버 저장소에 없는 해시는 document_texts로 본문을 함께 보내거나,
+    응답의 missing_hashes를 보고 다시 요청
+    """
+    query: str = Field(..., description="검색 쿼리")
+    documents: List[str] = Field(default_factory=list, description="리랭킹할 문서 리스트")
+    document_hashes: Optional[List[str]] = Field(default=None, description="문서 본문 SHA-256 해시 리스트 (documents 대신 사용)")
+    document_texts: Dict[str, str] = Field(default_factory=dict, description="서버에 없을 수 있는 문서의 {해시: 본문}")
+    top_k: int = Field(default=5, ge=1, le=100, description="반환할 상위 문서 개수")
+    return_documents: bool = Field(default=False, description="문서 내용 포함 여부")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "query": "규칙적인 운동의 건강상 이점은 무엇인가요?",
+                "documents": [
+                    "규칙적인 신체 활동은 칼로리를 연소하고 근육량을 늘려 체중 조절에 도움이 됩니다.",
+                    "올림픽 게임의 역사는 기원전 776년경 고대 그리스로 거슬러 올라갑니다."
+                ],
+                "top_k": 5,
+                "return_documents": True
+            }
+        }
+    )
+
+
+class RerankResult(BaseModel):
+    """리랭킹 결과 항목"""
+    index: int  # 원본 문서 리스트에서의 인덱스
+    score: float  # Reranker가 계산한 관련도 점수
+    document: Optional[str] = None  # 문서 내용 (return_documents=True일 때만)
+
+
+class RerankResponse(BaseModel):
+    """리랭킹 응답"""
+    results: List[RerankResult]  # 재정렬된 문서 리스트
+    query: str  # 원본 쿼리
+    total_documents: int  # 총 문서 개수
+    missing_hashes: List[str] = []  # 서버에 본문이 없는 해시 (있으면 results는 비어 있음 → 본문 포함해서 재요청)
+
+
+class RerankGroup(BaseModel):
+    """배치 리랭킹의 그룹 하나 (쿼리 + 문서 리스트 또는 해시 리스트 + top_k)"""
+    query: str = Field(..., description="검색 쿼리")
+    documents: List[str] = Field(default_factory=list, description="리랭킹할 문서 리스트")
+    document_hashes: Optional[List[str]] = Field(default=None, description="문서 본문 SHA-256 해시 리스트 (documents 대신 사용)")
+    top_k: int = Field(default=5, ge=1, le=100, description="반환할 상위 문서 개수")
+
+
+class RerankBatchRequest(BaseModel):
+    """
+    배치 리랭킹 요청 (쿼리 여러 개)
+
+    복합 질문의 서브 쿼리별 리랭킹을 HTTP 1회 + 모델 호출 1회로 처리
+    """
+    groups: List[RerankGroup] = Field(..., min_length=1, max_length=16, description="리랭킹 그룹 리스트")
+    document_texts: Dict[str, str] = Field(default_factory=dict, description="서버에 없을 수 있는 문서의 {해시: 본문} (그룹 공용)")
+    return_documents: bool = Field(default=False, description="문서 내용 포함 여부")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "groups": [
+                    {"query": "수출 절차", "documents": ["수출 신고 절차...", "수입 통관..."], "top_k": 1},
+                    {"query": "수입 절차", "documents": ["수출 신고 절차...", "수입 통관..."], "top_k": 1}
+                ],
+                "return_documents": False
+            }
+        }
+    )
+
+
+class RerankBatchResponse(BaseModel):
+    """배치 리랭킹 응답 (groups와 같은 순서)"""
+    results: List[RerankResponse]
+    missing_hashes: List[str] = []  # 서버에 본문이 없는 해시 (있으면 results는 비어 있음)
@@ -1,13 +1,27 @@
 """Reranker API 라우터"""
 
 import logging
+import os
 from fastapi import APIRouter, HTTPException
 
-from models.reranker import RerankRequest, RerankResponse, RerankResult
+from models.reranker import (
+    RerankRequest,
+    RerankResponse,
+    RerankResult,
+    RerankGroup,
+    RerankBatchRequest,
+    RerankBatchResponse,
+)
 from services.reranker import reranker_service
+from services.batcher import QueueFullError
+from services.worker_pool import WorkerPoolFullError
+from services.doc_store import document_store
 
 logger = logging.getLogger(__name__)
 
+# 과부하(503) 응답의 Retry-After 헤더 값 (초)
+RETRY_AFTER_SECONDS = os.getenv("RERANKER_RETRY_AFTER", "1")
+
 # 라우터
 router = APIRouter(
     prefix="/rerank",
@@ -15,23 +29,41 @@ router = APIRouter(
 )
 
 
+def _resolve_documents(documents: list[str], document_hashes, document_texts: dict) -> tuple:
+    """
+    요청의 문서 본문 확정
+
+    document_hashes가 있으면 문서 저장소(+ 요청에 함께 온 본문)에서 본문을 찾고,
+    없으면 documents를 그대로 사용
+
+    Returns:
+        (본문 리스트, 서버에 없는 해시 리스트)
+    """
+    if document_hashes is None:
+        return documents, []
+    return document_store.resolve(document_hashes, document_texts)
+
+
 @router.post("", response_model=RerankResponse)
-def rerank(request: RerankRequest):
+async def rerank(request: RerankRequest):
     """
     문서 리랭킹 엔드포인트
 
     주어진 쿼리와 문서 리스트를 기반으로 관련도 순으로 정렬합니다.
-    CPU/GPU 집약적 작업이므로 동기 함수로 구현.
+    모델 추론은 마이크로 배칭 스케줄러의 전용 스레드에서 실행되므로 이벤트 루프를 막지 않고,
+    동시에 들어온 다른 요청들과 같은 배치로 묶여서 계산됩니다.
     """
     # 모델 로딩 확인
     if not reranker_service.is_ready():
+        reranker_service.metrics.observe_rejection("not_ready")
         raise HTTPException(
             status_code=503,
-            detail="Reranker 모델이 아직 로드되지 않았습니다. 잠시 후 다시 시도해주세요."
+            detail=f"Reranker 모델이 아직 준비되지 않았습니다 (상태: {reranker_service.status()}). 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": RETRY_AFTER_SECONDS}
         )
 
     # 입력 검증
-    if not request.documents:
+    if not request.documents and not request.document_hashes:
         raise HTTPException(
             status_code=400,
             detail="documents 리스트가 비어있습니다."
@@ -43,13 +75,24 @@ def rerank(request: RerankRequest):
             detail="query가 비어있습니다."
         )
 
+    # 해시로 온 문서 본문 찾기 (서버에 없는 본문은 클라이언트에게 재요청)
+    documents, missing = _resolve_documents(request.documents, request.document_hashes, request.document_texts)
+    if missing:
+        return RerankResponse(
+            results=[],
+            query=request.query,
+            total_documents=len(documents),
+            missing_hashes=missing
+        )
+
     try:
-        # 리랭킹 수행
-        results = reranker_service.rank(
+        # 리랭킹 수행 (같은 요청이 진행 중이면 그 결과를 공유)
+        results = await reranker_service.rank_coalesced(
             query=request.query,
-            documents=request.documents,
+            documents=documents,
             top_k=request.top_k,
-            return_documents=request.return_documents
+            return_documents=request.return_documents,
+            document_hashes=request.document_hashes
         )
 
         # 결과 포맷팅
@@ -66,12 +109,17 @@ def rerank(request: RerankRequest):
         return RerankResponse(
             results=formatted_results,
             query=request.query,
-            total_documents=len(request.documents)
+            total_documents=len(documents)
         )
 
     except HTTPException:
         # HTTPException은 그대로 전달
         raise
+    except QueueFullError as e:
+        # 과부하: 대기열(또는 모든 워커)이 가득 차면 바로 거절 (클라이언트는 재시도 또는 Qdrant 순서로 대체)
+        logger.warning(f"⚠️ {e}")
+        reranker_service.metrics.observe_rejection("workers_full" if isinstance(e, WorkerPoolFullError) else "queue_full")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": RETRY_AFTER_SECONDS})
     except Exception as e:
         # 예상치 못한 에러만 500으로 처리
         logger.error(f"리랭킹 처리 중 오류 발생: {str(e)}")
@@ -79,3 +127,89 @@ def rerank(request: RerankRequest):
             status_code=500,
             detail=f"리랭킹 처리 중 오류 발생: {str(e)}"
         )
+
+
+@router.post("/batch", response_model=RerankBatchResponse)
+async def rerank_batch(request: RerankBatchRequest):
+    """
+    배치 리랭킹 엔드포인트
+
+    (query, documents, top_k) 그룹 여러 개를 한 번에 받아 모든 쌍을 하나의 배치로 점수 계산합니다.
+    복합 질문의 서브 쿼리별 리랭킹을 HTTP 1회로 처리하기 위한 엔드포인트.
+    """
+    # 모델 로딩 확인
+    if not reranker_service.is_ready():
+        reranker_service.metrics.observe_rejection("not_ready")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Reranker 모델이 아직 준비되지 않았습니다 (상태: {reranker_service.status()}). 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": RETRY_AFTER_SECONDS}
+        )
+
+    # 입력 검증
+    for i, group in enumerate(request.groups):
+        if not group.documents and not group.document_hashes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"groups[{i}]: documents 리스트가 비어있습니다."
+            )
+        if not group.query.strip():
+            raise HTTPException(
+                status_code=400,
+                detail=f"groups[{i}]: query가 비어있습니다."
+            )
+
+    # 해시로 온 문서 본문 찾기 (그룹 전체에서 없는 해시를 모아서 한 번에 재요청)
+    resolved, missing = [], []
+    for group in request.groups:
+        documents, group_missing = _resolve_documents(group.documents, group.document_hashes, request.document_texts)
+        missing.extend(h for h in group_missing if h not in missing)
+        resolved.append(documents)
+    if missing:
+        return RerankBatchResponse(results=[], missing_hashes=missing)
+
+    groups = [
+        RerankGroup(query=group.query, documents=documents, top_k=group.top_k)
+        for group, documents in zip(request.groups, resolved)
+    ]
+
+    try:
+        # 배치 리랭킹 수행
+        batch_results = await reranker_service.rank_batch_async(
+            groups=groups,
+            return_documents=request.return_documents
+        )
+
+        # 결과 포맷팅 (groups 순서 유지)
+        responses = []
+        for group, results in zip(groups, batch_results):
+            formatted_results = []
+            for result in results:
+                formatted_result = {
+                    "index": result.index,
+                    "score": result.score,
+                }
+                if request.return_documents:
+                    formatted_result["document"] = result.document
+                formatted_results.append(RerankResult(**formatted_result))
+
+            responses.append(RerankResponse(
+                results=formatted_results,
+                query=group.query,
+                total_documents=len(group.documents)
+            ))
+
+        return RerankBatchResponse(results=responses)
+
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        logger.warning(f"⚠️ {e}")
+        reranker_service.metrics.observe_rejection("workers_full" if isinstance(e, WorkerPoolFullError) else "queue_full")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": RETRY_AFTER_SECONDS})
+    except Exception as e:
+        logger.error(f"배치 리랭킹 처리 중 오류 발생: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"배치 리랭킹 처리 중 오류 발생: {str(e)}"
+        )
@@ -0,0 +1,158 @@
+"""
+Reranker 추론 백엔드
+
+RERANKER_BACKEND 환경 변수로 선택합니다.
+- torch (기본값): MxbaiRerankV2 그대로 사용 (GPU가 있으면 GPU, 기준 백엔드)
+- torch-int8: CPU + torch 동적 양자화 (nn.Linear 가중치 int8)
+- onnx: CPU + onnxruntime (export_onnx.py로 만든 fp32/int8 ONNX 모델)
+
+모든 백엔드는 MxbaiRerankV2와 같은 인터페이스(predict / forward / tokenizer 등)를 제공하므로
+RerankerService의 토큰 캐시 / 점수 캐시 / 마이크로 배칭 경로를 그대로 사용합니다.
+
+torch / mxbai_rerank는 모델을 로드할 때 import합니다 (스텁 모델로 도는 부하 테스트 / 단위 테스트는 설치 없이 실행).
+"""
+
+import logging
+import os
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from mxbai_rerank import MxbaiRerankV2
+
+logger = logging.getLogger(__name__)
+
+# 백엔드 설정
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "torch").lower()
+RERANKER_ONNX_PATH = os.getenv("RERANKER_ONNX_PATH", "onnx/model.int8.onnx")
+
+# 로컬 safetensors 캐시 (HF 허브 다운로드 / 변환 없이 바로 로드, 비우면 사용 안 함)
+RERANKER_LOCAL_MODEL_DIR = os.getenv("RERANKER_LOCAL_MODEL_DIR", "")
+RERANKER_SAVE_LOCAL_MODEL = os.getenv("RERANKER_SAVE_LOCAL_MODEL", "true").lower() in ("1", "true", "yes")
+
+SUPPORTED_BACKENDS = ("torch", "torch-int8", "onnx")
+
+# ONNX 모델의 입출력 이름 (export_onnx.py와 맞춰야 함)
+ONNX_INPUT_NAMES = ["input_ids", "attention_mask"]
+ONNX_OUTPUT_NAME = "score"
+
+
+def env_num_threads() -> int:
+    """
+    CPU 추론 스레드 수 RERANKER_NUM_THREADS (0이면 라이브러리 기본값)
+
+    워커 프로세스는 코어를 배정한 뒤 이 값을 환경 변수로 설정하므로, import 시점이 아니라 모델을 로드할 때 읽음
+    (spawn 자식이 __main__을 다시 import하면서 이 모듈을 워커 설정보다 먼저 로드할 수 있음)
+    """
+    return int(os.getenv("RERANKER_NUM_THREADS", "0"))
+
+
+def configure_threads(num_threads: int) -> None:
+    """CPU 추론 스레드 수 설정 (torch 백엔드용, 0이면 기본값 유지)"""
+    if num_threads > 0:
+        import torch
+
+        torch.set_num_threads(num_threads)
+        logger.info(f"🧵 torch 추론 스레드 수: {num_threads}")
+
+
+def resolve_model_source(model_name: str, local_dir: str = RERANKER_LOCAL_MODEL_DIR) -> str:
+    """로컬 safetensors 캐시가 있으면 그 경로, 없으면 HF 모델 이름"""
+    if local_dir and os.path.isfile(os.path.join(local_dir, "config.json")) and any(
+        name.endswith(".safetensors") for name in os.listdir(local_dir)
+    ):
+        return local_dir
+    return model_name
+
+
+def save_local_copy(model: "MxbaiRerankV2", local_dir: str) -> None:
+    """허브에서 받은 모델을 safetensors + 토크나이저로 저장 (다음 기동부터 로컬에서 로드)"""
+    try:
+        os.makedirs(local_dir, exist_ok=True)
+        model.model.save_pretrained(local_dir, safe_serialization=True)
+        model.tokenizer.save_pretrained(local_dir)
+        logger.info(f"💾 로컬 모델 캐시 저장: {local_dir}")
+    except Exception as e:
+        logger.warning(f"⚠️ 로컬 모델 캐시 저장 실패 (다음 기동도 허브에서 로드): {e}")
+
+
+def load_reranker(model_name: str, backend: Optional[str] = None, num_threads: Optional[int] = None) -> "MxbaiRerankV2":
+    """
+    설정된 백엔드로 Reranker 모델 로드
+
+    RERANKER_LOCAL_MODEL_DIR에 safetensors 캐시가 있으면 거기서 로드하고, 없으면 허브에서 받은 뒤
+    (RERANKER_SAVE_LOCAL_MODEL이면) 캐시로 저장합니다.
+
+    Args:
+        model_name: HF 모델 이름 (토크나이저 / 설정 로드에도 사용)
+        backend: torch / torch-int8 / onnx (None이면 RERANKER_BACKEND)
+        num_threads: CPU 추론 스레드 수 (None이면 지금 시점의 RERANKER_NUM_THREADS)
+    """
+    backend = (backend or RERANKER_BACKEND).lower()
+    if num_threads is None:
+        num_threads = env_num_threads()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"지원하지 않는 RERANKER_BACKEND: {backend} (가능: {', '.join(SUPPORTED_BACKENDS)})")
+
+    if backend == "onnx":
+        from services.onnx_backend import OnnxMxbaiRerankV2
+
+        source = resolve_model_source(model_name)
+        logger.info(f"⚙️ Reranker 백엔드: {backend} (모델 경로: {source})")
+        return OnnxMxbaiRerankV2(source, RERANKER_ONNX_PATH, num_threads=num_threads)
+
+    import torch
+    from mxbai_rerank import MxbaiRerankV2
+    from mxbai_rerank.mxbai_rerank_v2 import estimated_max_cfg
+
+    source = resolve_model_source(model_name)
+    save_to = RERANKER_LOCAL_MODEL_DIR if RERANKER_SAVE_LOCAL_MODEL and source == model_name else ""
+    logger.info(f"⚙️ Reranker 백엔드: {backend} (모델 경로: {source})")
+
+    if backend == "torch":
+        configure_threads(num_threads)
+        model = MxbaiRerankV2(source, estimated_max=estimated_max_cfg.get(model_name))
+        if save_to:
+            save_local_copy(model, save_to)
+        return model
+
+    # torch-int8
+    configure_threads(num_threads)
+    model = MxbaiRerankV2(source, device="cpu", torch_dtype=torch.float32, estimated_max=estimated_max_cfg.get(model_name))
+    if save_to:
+        save_local_copy(model, save_to)  # 양자화 전 가중치를 저장
+    # Linear 레이어 가중치를 int8로 양자화 (활성값은 실행 시 동적으로 양자화)
+    model.model = torch.ao.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def score_parity(reference: "MxbaiRerankV2", candidate: "MxbaiRerankV2", queries: list[str], documents: list[str]) -> dict:
+    """
+    두 백엔드의 점수 일치도 비교
+
+    Returns:
+        dict: 최대/평균 절대 오차, 쿼리별 top-1 일치율, 순위 상관(스피어만)
+    """
+    ref = np.asarray(reference.predict(queries, documents).tolist(), dtype=np.float64)
+    cand = np.asarray(candidate.predict(queries, documents).tolist(), dtype=np.float64)
+    diff = np.abs(ref - cand)
+
+    # 쿼리별 top-1 문서가 같은지
+    top1_matches, total_queries = 0, 0
+    for query in dict.fromkeys(queries):
+        idx = [i for i, q in enumerate(queries) if q == query]
+        total_queries += 1
+        top1_matches += int(idx[int(np.argmax(ref[idx]))] == idx[int(np.argmax(cand[idx]))])
+
+    ref_rank = np.argsort(np.argsort(ref))
+    cand_rank = np.argsort(np.argsort(cand))
+    spearman = float(np.corrcoef(ref_rank, cand_rank)[0, 1]) if len(ref) > 1 else 1.0
+
+    return {
+        "pairs": len(ref),
+        "max_abs_diff": float(diff.max()) if len(diff) else 0.0,
+        "mean_abs_diff": float(diff.mean()) if len(diff) else 0.0,
+        "top1_agreement": top1_matches / total_queries if total_queries else 1.0,
+        "spearman": spearman,
+    }
@@ -0,0 +1,292 @@
+"""
+동적 마이크로 배칭 스케줄러
+
+동시에 들어온 여러 HTTP 요청의 (query, document) 쌍을 짧은 시간/크기 창 안에서 모아
+모델 forward pass 한 번으로 점수를 계산하고, 요청별로 점수를 나눠 돌려줍니다.
+- 창 닫힘 조건: 모은 쌍이 max_batch_pairs 이상 또는 첫 요청 후 max_wait_ms 경과
+- 모델 실행은 전용 스레드에서 수행 (이벤트 루프를 막지 않음, 기본 1개로 GPU 작업 직렬화,
+  워커 풀 사용 시 워커 수만큼 배치를 동시에 실행)
+- 대기 중인 쌍이 max_queue_pairs를 넘으면 QueueFullError로 즉시 거절 (과부하 보호)
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """대기열이 가득 차서 요청을 받을 수 없음"""
+
+
+@dataclass
+class _PendingJob:
+    """대기열에 들어간 요청 하나 (쿼리 1개 + 문서 리스트)"""
+    query: str
+    documents: List[str]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class MicroBatchScheduler:
+    """
+    요청 간 (query, document) 쌍을 모아서 배치로 실행하는 스케줄러
+
+    Args:
+        predict_fn: (queries, documents) → 점수 리스트 (모델 호출, 동기 함수)
+        max_batch_pairs: 배치 1회에 넣을 최대 쌍 개수
+        max_wait_ms: 첫 요청 도착 후 추가 요청을 기다리는 최대 시간 (밀리초)
+        max_queue_pairs: 대기열에 쌓일 수 있는 최대 쌍 개수 (초과 시 거절)
+        concurrency: 동시에 실행할 수 있는 배치 수 (단일 모델이면 1)
+        on_batch: 배치 1회 실행 후 호출 (쌍 개수, 추론 시간, 요청별 대기 시간 리스트) - 메트릭 수집용
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[str], List[str]], List[float]],
+        max_batch_pairs: int,
+        max_wait_ms: float,
+        max_queue_pairs: int,
+        concurrency: int = 1,
+        on_batch: Optional[Callable[[int, float, List[float]], None]] = None
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_pairs = max_batch_pairs
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_pairs = max_queue_pairs
+        self.concurrency = max(1, concurrency)
+        self.on_batch = on_batch
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="rerank-batch")
+        self._slots: Optional[asyncio.Semaphore] = None  # 실행 중인 배치 수 제한
+        self._inflight: set = set()
+        self._carry: Optional[_PendingJob] = None  # 창 크기를 넘어 다음 배치로 넘긴 요청
+        self._collecting: List[_PendingJob] = []  # 수집 중인 배치 (대기열에서 꺼냈지만 아직 실행 전)
+
+        # 메트릭
+        self.queued_pairs = 0
+        self.running_batches = 0
+        self.total_batches = 0
+        self.total_pairs = 0
+        self.total_requests = 0
+        self.completed_requests = 0
+        self.rejected_requests = 0
+        self.last_batch_pairs = 0
+        self.max_batch_seen = 0
+        self.batch_histogram: dict = {}  # 배치 크기(2의 거듭제곱 상한) → 배치 수
+        self.total_wait_seconds = 0.0
+        self.total_inference_seconds = 0.0
+
+    # ==================== 수명 주기 ====================
+
+    def _ensure_worker(self) -> None:
+        """현재 이벤트 루프에서 배치 워커가 돌고 있지 않으면 시작"""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._carry = None
+        self._collecting = []
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+        logger.info(
+            f"🧺 마이크로 배칭 시작 (max_batch_pairs={self.max_batch_pairs}, "
+            f"max_wait_ms={self.max_wait * 1000:.0f}, max_queue_pairs={self.max_queue_pairs}, "
+            f"concurrency={self.concurrency})"
+        )
+
+    async def stop(self) -> None:
+        """배치 워커 종료 (대기 중인 요청은 에러로 종료)"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        inflight = list(self._inflight)
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)  # 실행 중이던 배치의 요청을 에러로 끝낼 때까지 대기
+        self._inflight.clear()
+
+        pending = ([self._carry] if self._carry else []) + self._collecting
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for job in pending:
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("Reranker 배치 스케줄러가 종료되었습니다"))
+        self._carry = None
+        self._collecting = []
+        self.queued_pairs = 0
+
+    # ==================== 요청 제출 ====================
+
+    def check_capacity(self, pairs: int) -> None:
+        """pairs개 쌍을 더 넣을 수 있는지 확인 (여러 그룹을 한꺼번에 넣기 전 사전 검사용)"""
+        if self.queued_pairs + pairs > self.max_queue_pairs:
+            self.rejected_requests += 1
+            raise QueueFullError(
+                f"Reranker 대기열이 가득 찼습니다 (대기 중 {self.queued_pairs}쌍 / 최대 {self.max_queue_pairs}쌍)"
+            )
+
+    async def submit(self, query: str, documents: List[str]) -> List[float]:
+        """
+        쿼리 1개와 문서 리스트를 대기열에 넣고 점수가 계산될 때까지 대기
+
+        Returns:
+            documents와 같은 순서의 점수 리스트
+
+        Raises:
+            QueueFullError: 대기 중인 쌍이 max_queue_pairs를 넘을 때
+        """
+        if not documents:
+            return []
+
+        self.check_capacity(len(documents))
+        self._ensure_worker()
+        job = _PendingJob(query=query, documents=documents, future=asyncio.get_running_loop().create_future())
+        self.queued_pairs += len(documents)
+        self.total_requests += 1
+        self._queue.put_nowait(job)
+        return await job.future
+
+    # ==================== 배치 워커 ====================
+
+    async def _collect_batch(self) -> List[_PendingJob]:
+        """시간/크기 창 안에서 요청들을 모아 배치 하나를 구성"""
+        first = self._carry or await self._queue.get()
+        self._carry = None
+        batch, pairs = [first], len(first.documents)
+        self._collecting = batch
+        deadline = time.monotonic() + self.max_wait
+
+        while pairs < self.max_batch_pairs:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    job = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                else:
+                    job = self._queue.get_nowait()  # 창은 닫혔지만 이미 도착한 요청은 포함
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+
+            if pairs + len(job.documents) > self.max_batch_pairs:
+                self._carry = job  # 이번 배치에 넣으면 초과 → 다음 배치의 첫 요청으로
+                break
+            batch.append(job)
+            pairs += len(job.documents)
+
+        self._collecting = []
+        return batch
+
+    async def _run(self) -> None:
+        """배치 수집 → 모델 실행 → 점수 분배 반복 (실행 슬롯이 빌 때까지 다음 배치 수집을 미룸)"""
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+
+            # 연결이 끊긴(취소된) 요청은 모델에 넣지 않음
+            dropped = [job for job in batch if job.future.cancelled()]
+            self.queued_pairs -= sum(len(job.documents) for job in dropped)
+            batch = [job for job in batch if not job.future.cancelled()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            if self.concurrency == 1:
+                await self._execute(batch)
+            else:
+                task = asyncio.get_running_loop().create_task(self._execute(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _execute(self, batch: List[_PendingJob]) -> None:
+        """배치 1개 모델 실행 후 요청별로 점수 분배"""
+        self.running_batches += 1
+        try:
+            queries, documents = [], []
+            for job in batch:
+                queries.extend([job.query] * len(job.documents))
+                documents.extend(job.documents)
+
+            started = time.monotonic()
+            try:
+                scores = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.predict_fn, queries, documents
+                )
+            except asyncio.CancelledError:
+                # stop()으로 취소됨: 모델 결과를 기다리던 요청이 무한 대기하지 않도록 에러로 종료
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(RuntimeError("Reranker 배치 스케줄러가 종료되었습니다"))
+                raise
+            except Exception as e:
+                logger.error(f"❌ 배치 리랭킹 실패 ({len(batch)}개 요청, {len(queries)}쌍): {e}")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                scores = None
+            finally:
+                self.queued_pairs -= sum(len(job.documents) for job in batch)
+
+            finished = time.monotonic()
+            self.total_batches += 1
+            self.total_pairs += len(queries)
+            self.last_batch_pairs = len(queries)
+            self.max_batch_seen = max(self.max_batch_seen, len(queries))
+            bucket = 1 << (len(queries) - 1).bit_length()
+            self.batch_histogram[bucket] = self.batch_histogram.get(bucket, 0) + 1
+            self.total_inference_seconds += finished - started
+            self.completed_requests += len(batch)
+            waits = [started - job.enqueued_at for job in batch]
+            self.total_wait_seconds += sum(waits)
+            if self.on_batch is not None:
+                self.on_batch(len(queries), finished - started, waits)
+
+            if scores is None:
+                return
+
+            # 요청별로 점수 분배
+            offset = 0
+            for job in batch:
+                job_scores = scores[offset:offset + len(job.documents)]
+                offset += len(job.documents)
+                if not job.future.done():
+                    job.future.set_result(job_scores)
+        finally:
+            self.running_batches -= 1
+            self._slots.release()
+
+    # ==================== 메트릭 ====================
+
+    def stats(self) -> dict:
+        """대기열 깊이, 배치 크기, 대기/추론 시간 통계"""
+        return {
+            "queue_depth_pairs": self.queued_pairs,
+            "max_queue_pairs": self.max_queue_pairs,
+            "max_batch_pairs": self.max_batch_pairs,
+            "max_wait_ms": self.max_wait * 1000,
+            "concurrency": self.concurrency,
+            "running_batches": self.running_batches,
+            "batches": self.total_batches,
+            "requests": self.total_requests,
+            "rejected_requests": self.rejected_requests,
+            "avg_batch_pairs": round(self.total_pairs / self.total_batches, 2) if self.total_batches else 0.0,
+            "last_batch_pairs": self.last_batch_pairs,
+            "max_batch_pairs_seen": self.max_batch_seen,
+            "batch_pairs_histogram": {f"<={k}": v for k, v in sorted(self.batch_histogram.items())},
+            "avg_queue_wait_ms": round(self.total_wait_seconds / self.completed_requests * 1000, 2)
+            if self.completed_requests else 0.0,
+            "avg_inference_ms": round(self.total_inference_seconds / self.total_batches * 1000, 2)
+            if self.total_batches else 0.0,
+        }
@@ -0,0 +1,143 @@
+"""
+내용 주소 기반(content-addressed) 문서 저장소
+
+지식베이스 청크는 거의 바뀌지 않으므로, 클라이언트는 청크 본문 대신 SHA-256 해시만 보내고
+서버는 해시 → 본문, 해시 → 토큰 ID를 LRU로 보관합니다.
+- DocumentStore: 해시 → 본문 (없는 해시만 클라이언트에게 본문을 다시 요청)
+- TokenCache: 해시 → 문서 토큰 ID (같은 청크가 반복되면 토크나이징 생략)
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 저장소 크기 설정
+DOC_STORE_MAX_ITEMS = int(os.getenv("RERANKER_DOC_STORE_MAX_ITEMS", "50000"))
+DOC_STORE_MAX_CHARS = int(os.getenv("RERANKER_DOC_STORE_MAX_CHARS", str(100_000_000)))  # 본문 총 글자 수 상한
+TOKEN_CACHE_MAX_ITEMS = int(os.getenv("RERANKER_TOKEN_CACHE_MAX_ITEMS", "50000"))
+
+
+def content_hash(text: str) -> str:
+    """문서 본문 해시 (UTF-8 SHA-256 hex, 클라이언트와 같은 방식)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DocumentStore:
+    """해시 → 문서 본문 LRU 저장소 (항목 수 + 총 글자 수 제한)"""
+
+    def __init__(self, max_items: int, max_chars: int):
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0  # 해시가 본문과 맞지 않아 거절된 항목
+
+    def put(self, doc_hash: str, text: str) -> bool:
+        """본문 저장 (해시 불일치 시 저장하지 않고 False)"""
+        if content_hash(text) != doc_hash:
+            self.rejected += 1
+            return False
+
+        with self._lock:
+            if doc_hash in self._data:
+                self._data.move_to_end(doc_hash)
+                return True
+
+            self._data[doc_hash] = text
+            self._chars += len(text)
+            while self._data and (len(self._data) > self.max_items or self._chars > self.max_chars):
+                _, evicted = self._data.popitem(last=False)
+                self._chars -= len(evicted)
+        return True
+
+    def resolve(self, hashes: List[str], texts: Dict[str, str]) -> Tuple[List[Optional[str]], List[str]]:
+        """
+        해시 리스트를 본문 리스트로 변환
+
+        Args:
+            hashes: 문서 해시 리스트 (순서 유지)
+            texts: 이번 요청에 함께 온 {해시: 본문} (저장소에 없을 수 있는 문서)
+
+        Returns:
+            (본문 리스트, 저장소에도 요청에도 없는 해시 리스트)
+        """
+        for doc_hash, text in texts.items():
+            self.put(doc_hash, text)
+
+        documents, missing = [], []
+        with self._lock:
+            for doc_hash in hashes:
+                text = self._data.get(doc_hash)
+                if text is None:
+                    self.misses += 1
+                    if doc_hash not in missing:
+                        missing.append(doc_hash)
+                else:
+                    self.hits += 1
+                    self._data.move_to_end(doc_hash)
+                documents.append(text)
+        return documents, missing
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._data),
+            "chars": self._chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "rejected": self.rejected,
+        }
+
+
+class TokenCache:
+    """해시 → 문서 토큰 ID LRU 캐시 (잘라내기 전 전체 토큰, 쿼리별 길이 제한은 사용 시점에 적용)"""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._data: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, doc_hash: str) -> Optional[List[int]]:
+        with self._lock:
+            ids = self._data.get(doc_hash)
+            if ids is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(doc_hash)
+            return ids
+
+    def set(self, doc_hash: str, ids: List[int]) -> None:
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._data[doc_hash] = ids
+            self._data.move_to_end(doc_hash)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# 전역 인스턴스
+document_store = DocumentStore(max_items=DOC_STORE_MAX_ITEMS, max_chars=DOC_STORE_MAX_CHARS)
+token_cache = TokenCache(max_items=TOKEN_CACHE_MAX_ITEMS)
@@ -0,0 +1,107 @@
+"""
+Reranker 메트릭 (Prometheus 텍스트 형식)
+
+요청 경로에서는 정수 / 실수 덧셈만 하는 가벼운 카운터와 고정 버킷 히스토그램으로 모으고,
+/metrics 요청 시에만 텍스트로 변환합니다 (prometheus_client 의존성 없음).
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 히스토그램 버킷 상한
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_PAIRS_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class Histogram:
+    """고정 버킷 히스토그램 (observe는 버킷 검색 + 덧셈)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, 누적 개수) 리스트"""
+        total, rows = 0, []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            rows.append((str(bound), total))
+        return rows
+
+
+class RerankerMetrics:
+    """RerankerService가 모으는 요청 / 배치 메트릭"""
+
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str], int] = defaultdict(int)  # (endpoint, status) → 개수
+        self.request_seconds: Dict[str, Histogram] = {}
+        self.rejected: Dict[str, int] = defaultdict(int)  # 사유 → 개수
+        self.queue_wait_seconds = Histogram(LATENCY_BUCKETS)
+        self.inference_seconds = Histogram(LATENCY_BUCKETS)
+        self.batch_pairs = Histogram(BATCH_PAIRS_BUCKETS)
+        self.pairs_scored = 0
+
+    def observe_request(self, endpoint: str, status: int, seconds: float) -> None:
+        self.requests[(endpoint, str(status))] += 1
+        histogram = self.request_seconds.get(endpoint)
+        if histogram is None:
+            histogram = self.request_seconds[endpoint] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    def observe_rejection(self, reason: str) -> None:
+        self.rejected[reason] += 1
+
+    def observe_batch(self, pairs: int, inference_seconds: float, queue_waits: Iterable[float]) -> None:
+        """배치 1회 (마이크로 배칭 스케줄러 / 단일 요청 경로에서 호출)"""
+        self.pairs_scored += pairs
+        self.batch_pairs.observe(pairs)
+        self.inference_seconds.observe(inference_seconds)
+        for wait in queue_waits:
+            self.queue_wait_seconds.observe(wait)
+
+
+class MetricsWriter:
+    """Prometheus 텍스트 형식 작성기"""
+
+    def __init__(self, prefix: str = "reranker_"):
+        self.prefix = prefix
+        self.lines: List[str] = []
+
+    @staticmethod
+    def _labels(labels: Optional[dict]) -> str:
+        if not labels:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+        return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+    def _header(self, name: str, kind: str, help_text: str) -> str:
+        full = self.prefix + name
+        self.lines.append(f"# HELP {full} {help_text}")
+        self.lines.append(f"# TYPE {full} {kind}")
+        return full
+
+    def scalar(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Optional[dict], float]]) -> None:
+        """counter / gauge (라벨별 값 여러 개)"""
+        full = self._header(name, kind, help_text)
+        for labels, value in samples:
+            self.lines.append(f"{full}{self._labels(labels)} {float(value)}")
+
+    def histogram(self, name: str, help_text: str, series: Iterable[Tuple[Optional[dict], Histogram]]) -> None:
+        full = self._header(name, "histogram", help_text)
+        for labels, histogram in series:
+            labels = labels or {}
+            for le, count in histogram.cumulative():
+                self.lines.append(f"{full}_bucket{self._labels({**labels, 'le': le})} {count}")
+            self.lines.append(f"{full}_sum{self._labels(labels)} {histogram.sum}")
+            self.lines.append(f"{full}_count{self._labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -0,0 +1,89 @@
+"""
+ONNX 백엔드 (RERANKER_BACKEND=onnx) 및 ONNX 내보내기용 점수 헤드
+
+torch / mxbai_rerank / onnxruntime이 필요하므로 backends.load_reranker와 export_onnx.py에서만 import합니다.
+"""
+
+import os
+
+import numpy as np
+import torch
+from mxbai_rerank import MxbaiRerankV2
+from mxbai_rerank.mxbai_rerank_v2 import estimated_max_cfg
+from mxbai_rerank.utils import TorchModule
+
+from services.backends import ONNX_OUTPUT_NAME
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+
+class RerankerScoreHead(torch.nn.Module):
+    """
+    ONNX 내보내기용 래퍼: 마지막 토큰의 "1" 로짓 - "0" 로짓만 출력
+
+    전체 vocab 로짓([B, T, V])을 내보내지 않도록 logits_to_keep=1로 마지막 위치만 계산
+    (MxbaiRerankV2.forward와 같은 점수)
+    """
+
+    def __init__(self, reranker: MxbaiRerankV2):
+        super().__init__()
+        self.model = reranker.model
+        self.yes_loc = reranker.yes_loc
+        self.no_loc = reranker.no_loc
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        outputs = self.model(input_ids=input_ids, attention_mask=attention_mask, use_cache=False, logits_to_keep=1)
+        last = outputs.logits[:, -1, :]
+        return last[:, self.yes_loc] - last[:, self.no_loc]
+
+
+class _ScoreOutput:
+    """MxbaiRerankV2.forward 반환값과 같은 모양 (logits만 사용)"""
+
+    def __init__(self, logits: torch.Tensor):
+        self.logits = logits
+
+
+class OnnxMxbaiRerankV2(MxbaiRerankV2):
+    """
+    onnxruntime(CPU)으로 점수를 계산하는 MxbaiRerankV2
+
+    토크나이저 / 프롬프트 템플릿 / 입력 구성은 MxbaiRerankV2를 그대로 쓰고,
+    forward만 ONNX 세션으로 대체합니다 (HF 가중치는 로드하지 않음).
+    """
+
+    def __init__(self, model_name_or_path: str, onnx_path: str, num_threads: int = 0, max_length: int = 8192):
+        if ort is None:
+            raise RuntimeError("onnx 백엔드를 사용하려면 onnxruntime이 필요합니다 (pip install onnxruntime)")
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(f"ONNX 모델 파일이 없습니다: {onnx_path} (export_onnx.py로 먼저 생성하세요)")
+
+        from transformers import AutoConfig, AutoTokenizer
+
+        TorchModule.__init__(self)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name_or_path, padding_side="left")
+        self.cfg = AutoConfig.from_pretrained(model_name_or_path)
+        self.max_length = max_length or self.cfg.max_position_embeddings
+        self.model_max_length = self.cfg.max_position_embeddings
+        self.estimated_max = estimated_max_cfg.get(model_name_or_path, 12.0)
+        self.prepare_predefined_inputs()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.eval()
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor, labels=None) -> _ScoreOutput:
+        scores = self.session.run(
+            [ONNX_OUTPUT_NAME],
+            {
+                "input_ids": input_ids.cpu().numpy().astype(np.int64),
+                "attention_mask": attention_mask.cpu().numpy().astype(np.int64),
+            }
+        )[0]
+        return _ScoreOutput(torch.from_numpy(scores))
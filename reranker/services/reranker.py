@@ -1,52 +1,647 @@
 """Reranker 서비스 - 모델 로딩 및 비즈니스 로직"""
 
+import asyncio
+import hashlib
 import logging
-from typing import Optional
-from mxbai_rerank import MxbaiRerankV2
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from services.backends import RERANKER_BACKEND, load_reranker
+from services.batcher import MicroBatchScheduler
+from services.doc_store import content_hash, document_store, token_cache
+from services.metrics import MetricsWriter, RerankerMetrics
+from services.singleflight import SingleFlight
+from services.worker_pool import (
+    RERANKER_WORKER_DEVICES,
+    RERANKER_WORKER_MAX_PENDING,
+    RERANKER_WORKER_TIMEOUT,
+    WorkerPool,
+)
+
+if TYPE_CHECKING:
+    from mxbai_rerank import MxbaiRerankV2  # 모델은 load_reranker에서 import (스텁 모델 테스트는 torch 없이 실행)
 
 logger = logging.getLogger(__name__)
 
+# 배치 리랭킹 시 한 번의 forward pass에 넣을 최대 (query, document) 쌍 개수 (GPU 메모리 보호)
+MAX_BATCH_PAIRS = int(os.getenv("RERANKER_MAX_BATCH_PAIRS", "128"))
+
+# 동적 마이크로 배칭 설정 (동시 요청들의 쌍을 모아서 한 번에 추론)
+MICRO_BATCHING_ENABLED = os.getenv("RERANKER_MICRO_BATCHING", "true").lower() in ("1", "true", "yes")
+BATCH_WAIT_MS = float(os.getenv("RERANKER_BATCH_WAIT_MS", "5"))  # 첫 요청 후 추가 요청을 기다리는 시간
+MAX_QUEUE_PAIRS = int(os.getenv("RERANKER_MAX_QUEUE_PAIRS", "4096"))  # 대기열 최대 쌍 개수 (초과 시 503)
+
+# 길이 버킷 배칭 / 문서 토큰 윈도우 설정
+# 쌍을 토큰 길이 순으로 정렬해서 비슷한 길이끼리 배치로 묶음 (짧은 청크가 긴 PDF 페이지 길이만큼 패딩되는 낭비 방지)
+LENGTH_BUCKETING = os.getenv("RERANKER_LENGTH_BUCKETING", "true").lower() in ("1", "true", "yes")
+MAX_DOC_TOKENS = int(os.getenv("RERANKER_MAX_DOC_TOKENS", "1024"))  # 문서 1개당 최대 토큰 수 (0이면 모델 한도까지)
+
+# 문서 토큰 캐시 사용 여부 (본문 해시 → 토큰 ID, 반복되는 청크의 토크나이징 생략)
+# MxbaiRerankV2.prepare_inputs를 다시 구현한 경로라서 기본값은 꺼둠 (mxbai-rerank 버전을 올리면
+# tests/test_token_cache_parity.py로 model.predict와 점수가 같은지 확인한 뒤 켤 것)
+USE_TOKEN_CACHE = os.getenv("RERANKER_TOKEN_CACHE", "false").lower() in ("1", "true", "yes")
+
+
+# 동일 요청 합치기 사용 여부 (같은 (query, documents, top_k) 요청이 동시에 진행 중이면 결과 공유)
+SINGLEFLIGHT_ENABLED = os.getenv("RERANKER_SINGLEFLIGHT", "true").lower() in ("1", "true", "yes")
+
+# 워밍업 설정 (첫 실제 요청이 CUDA 초기화 / 커널 선택 비용을 내지 않도록 합성 배치를 미리 실행)
+WARMUP_ENABLED = os.getenv("RERANKER_WARMUP", "true").lower() in ("1", "true", "yes")
+WARMUP_BATCH_PAIRS = int(os.getenv("RERANKER_WARMUP_BATCH_PAIRS", "32"))
+WARMUP_DOC_CHARS = [int(n) for n in os.getenv("RERANKER_WARMUP_DOC_CHARS", "200,500,2000").split(",") if n.strip()]
+WARMUP_QUERY = "FOB 조건에서 위험은 언제 이전되나요?"
+WARMUP_TEXT = "수출입 통관 절차와 신용장 거래 조건, 인코텀즈에 따른 위험 이전 시점을 설명합니다. "
+
+
+# 점수 캐시 설정 ((정규화 쿼리, 문서) 쌍 → 점수, 인기 질문 반복 시 모델 호출 생략)
+USE_SCORE_CACHE = os.getenv("RERANKER_SCORE_CACHE", "true").lower() in ("1", "true", "yes")
+SCORE_CACHE_MAX_ITEMS = int(os.getenv("RERANKER_SCORE_CACHE_MAX_ITEMS", "500000"))
+SCORE_CACHE_MAX_MB = float(os.getenv("RERANKER_SCORE_CACHE_MAX_MB", "64"))  # 메모리 상한
+SCORE_CACHE_TTL = float(os.getenv("RERANKER_SCORE_CACHE_TTL", "86400"))  # 유효 시간 (초, 0이면 무제한)
+
+
+@dataclass
+class RankResult:
+    """리랭킹 결과 항목 (mxbai_rerank.base.RankResult와 같은 필드)"""
+    index: int
+    score: float
+    document: Optional[str]
+
+
+def normalize_query(query: str) -> str:
+    """쿼리 정규화 (NFKC + 연속 공백 압축 + 앞뒤 공백 제거, 모델 입력 / 점수 캐시 키 / 동일 요청 합치기 키 공용)"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", query)).strip()
+
+
+class ScoreCache:
+    """
+    (쿼리, 문서) 쌍 점수 LRU 캐시 (TTL + 메모리 상한)
+
+    키는 정규화 쿼리와 문서 본문 해시를 합친 SHA-256 digest(32바이트)라서
+    항목 하나가 차지하는 메모리가 본문 길이와 무관하게 일정합니다.
+    """
+
+    # 항목 1개당 대략적인 메모리 (digest bytes + (float, 만료 시각) 튜플 + OrderedDict 노드)
+    ENTRY_BYTES = 200
+
+    def __init__(self, max_items: int, max_mb: float, ttl_seconds: float):
+        self.max_items = min(max_items, int(max_mb * 1024 * 1024 / self.ENTRY_BYTES))
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, document: str) -> bytes:
+        """query는 모델이 실제로 점수를 계산한 (정규화된) 쿼리"""
+        return hashlib.sha256(f"{query}\x00{content_hash(document)}".encode("utf-8")).digest()
+
+    def get_many(self, keys: list[bytes]) -> list[Optional[float]]:
+        """키별 점수 반환 (없거나 만료되면 None)"""
+        now = time.monotonic()
+        scores = []
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and entry[1] is not None and entry[1] < now:
+                    del self._data[key]
+                    entry = None
+
+                if entry is None:
+                    self.misses += 1
+                    scores.append(None)
+                else:
+                    self.hits += 1
+                    self._data.move_to_end(key)
+                    scores.append(entry[0])
+        return scores
+
+    def set_many(self, items: list[tuple]) -> None:
+        """[(키, 점수), ...] 저장 (용량 초과 시 LRU 항목 제거)"""
+        if self.max_items <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            for key, score in items:
+                self._data[key] = (score, expires_at)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._data),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
 
 class RerankerService:
     """Reranker 모델 관리 및 실행"""
 
     def __init__(self):
-        self.model: Optional[MxbaiRerankV2] = None
+        self.model: Optional["MxbaiRerankV2"] = None
+        self.state = "loading"  # loading → warming → ready (실패 시 failed)
+        self.load_started_at: Optional[float] = None
+        self.cold_start_seconds: Optional[float] = None
+        self._first_request_logged = False
+        self.metrics = RerankerMetrics()
+        self.flight = SingleFlight()
+        self.pool: Optional[WorkerPool] = None  # supervisor 모드에서만 사용 (모델은 워커 프로세스에 로드)
         self.model_name = "mixedbread-ai/mxbai-rerank-large-v2"
+        self.score_cache = ScoreCache(
+            max_items=SCORE_CACHE_MAX_ITEMS,
+            max_mb=SCORE_CACHE_MAX_MB,
+            ttl_seconds=SCORE_CACHE_TTL
+        )
+        self.scheduler = MicroBatchScheduler(
+            predict_fn=self._predict_scores,
+            max_batch_pairs=MAX_BATCH_PAIRS,
+            max_wait_ms=BATCH_WAIT_MS,
+            max_queue_pairs=MAX_QUEUE_PAIRS,
+            on_batch=self.metrics.observe_batch
+        )
 
     async def load_model(self):
-        """모델을 로드합니다"""
+        """
+        모델을 로드하고 워밍업합니다
+
+        로딩 / 워밍업은 스레드에서 실행하므로 그동안 이벤트 루프는 /health 등에 응답할 수 있습니다.
+        """
+        self.load_started_at = time.monotonic()
+        self.state = "loading"
         try:
-            logger.info(f"🔄 Reranker 모델 로딩 시작: {self.model_name}")
-            self.model = MxbaiRerankV2(self.model_name)
-            logger.info("✅ Reranker 모델 로딩 완료")
+            logger.info(f"🔄 Reranker 모델 로딩 시작: {self.model_name} (백엔드: {RERANKER_BACKEND})")
+            self.model = await asyncio.to_thread(load_reranker, self.model_name)
+            load_seconds = time.monotonic() - self.load_started_at
+            logger.info(f"✅ Reranker 모델 로딩 완료 ({load_seconds:.1f}초)")
+
+            if WARMUP_ENABLED:
+                self.state = "warming"
+                await asyncio.to_thread(self.warm_up)
+
+            self.cold_start_seconds = time.monotonic() - self.load_started_at
+            self.state = "ready"
+            logger.info(
+                f"🚀 Reranker 준비 완료 (cold start {self.cold_start_seconds:.1f}초 = "
+                f"로딩 {load_seconds:.1f}초 + 워밍업 {self.cold_start_seconds - load_seconds:.1f}초)"
+            )
         except Exception as e:
             logger.error(f"❌ Reranker 모델 로딩 실패: {str(e)}")
             self.model = None
+            self.state = "failed"
             raise
 
+    def warm_up(self):
+        """
+        예상 입력 모양(문서 길이별 WARMUP_BATCH_PAIRS쌍)으로 합성 배치를 한 번씩 실행
+
+        점수 캐시를 거치지 않으므로 실제 요청의 캐시 적중률에는 영향이 없습니다.
+        """
+        for chars in WARMUP_DOC_CHARS:
+            document = (WARMUP_TEXT * (chars // len(WARMUP_TEXT) + 1))[:chars]
+            started = time.monotonic()
+            self._predict_uncached([WARMUP_QUERY] * WARMUP_BATCH_PAIRS, [document] * WARMUP_BATCH_PAIRS)
+            logger.info(
+                f"🔥 워밍업: {WARMUP_BATCH_PAIRS}쌍 × 문서 {chars}자 ({(time.monotonic() - started) * 1000:.0f}ms)"
+            )
+
+    def _log_first_request(self):
+        """첫 정상 응답까지 걸린 시간 기록 (기동 시작 기준, 1회만)"""
+        if self._first_request_logged or self.load_started_at is None:
+            return
+        self._first_request_logged = True
+        logger.info(f"⏱️ 첫 정상 리랭킹 응답: 기동 후 {time.monotonic() - self.load_started_at:.1f}초")
+
+    async def start_worker_pool(self, num_workers: int, ready_timeout: float = 600.0):
+        """
+        supervisor 모드: 모델 워커 프로세스 num_workers개를 시작합니다
+
+        이 프로세스에는 모델을 로드하지 않고, 마이크로 배칭으로 모은 배치를 가장 한가한 워커에 보냅니다.
+        점수 캐시는 supervisor에 있으므로 모든 워커가 공유합니다.
+        """
+        logger.info(f"🔄 Reranker 워커 풀 시작: {num_workers}개 (백엔드: {RERANKER_BACKEND})")
+        self.load_started_at = time.monotonic()
+        self.pool = WorkerPool(
+            num_workers,
+            devices=RERANKER_WORKER_DEVICES,
+            max_pending=RERANKER_WORKER_MAX_PENDING,
+            timeout=RERANKER_WORKER_TIMEOUT
+        )
+        # 워커 수 × 워커당 대기 배치 수만큼 배치를 동시에 실행
+        self.scheduler = MicroBatchScheduler(
+            predict_fn=self._predict_scores,
+            max_batch_pairs=MAX_BATCH_PAIRS,
+            max_wait_ms=BATCH_WAIT_MS,
+            max_queue_pairs=MAX_QUEUE_PAIRS,
+            concurrency=num_workers * RERANKER_WORKER_MAX_PENDING,
+            on_batch=self.metrics.observe_batch
+        )
+        self.pool.start()
+
+        if await asyncio.to_thread(self.pool.wait_ready, ready_timeout):
+            self.cold_start_seconds = time.monotonic() - self.load_started_at
+            logger.info(f"🚀 Reranker 워커 풀 준비 완료 (cold start {self.cold_start_seconds:.1f}초)")
+        else:
+            logger.error("❌ 준비된 Reranker 워커가 없습니다")
+
+    async def stop_worker_pool(self):
+        """워커 프로세스 종료"""
+        if self.pool is not None:
+            await asyncio.to_thread(self.pool.stop)
+            self.pool = None
+
     def is_ready(self) -> bool:
-        """모델이 준비되었는지 확인"""
-        return self.model is not None
+        """모델이 준비되었는지 확인 (supervisor 모드면 준비된 워커가 1개 이상)"""
+        return self.status() == "ready"
+
+    def status(self) -> str:
+        """준비 상태: loading / warming / ready / failed (supervisor 모드는 워커 기준, 워밍업은 워커 안에서 진행)"""
+        if self.pool is not None:
+            if self.pool.is_ready():
+                return "ready"
+            return "loading" if self.pool.any_alive() else "failed"
+        return self.state
 
     def rank(self, query: str, documents: list[str], top_k: int, return_documents: bool):
         """문서 리랭킹을 수행합니다"""
         if not self.is_ready():
             raise RuntimeError("Reranker 모델이 로드되지 않았습니다")
 
-        # top_k 값이 문서 개수를 초과하지 않도록 조정
-        actual_top_k = min(top_k, len(documents))
+        # 리랭킹 수행 (점수 캐시에 없는 쌍만 모델로 계산)
+        scores = self._predict_scores([query] * len(documents), documents)
+        return self._top_k_results(documents, scores, top_k, return_documents)
 
-        # 리랭킹 수행
-        results = self.model.rank(
-            query,
-            documents,
-            return_documents=return_documents,
-            top_k=actual_top_k
-        )
+    def rank_batch(self, groups: list, return_documents: bool) -> list[list[RankResult]]:
+        """
+        여러 쿼리의 문서 리랭킹을 한 번에 수행합니다
+
+        모든 그룹의 (query, document) 쌍을 펼쳐서 패딩된 배치 하나로 점수를 계산하고
+        (MAX_BATCH_PAIRS 초과 시에만 나눠서 계산), 그룹별로 top_k를 골라 돌려줍니다.
+
+        Args:
+            groups: query / documents / top_k 속성을 가진 그룹 리스트
+            return_documents: 결과에 문서 내용 포함 여부
+
+        Returns:
+            groups와 같은 순서의 그룹별 결과 리스트
+        """
+        if not self.is_ready():
+            raise RuntimeError("Reranker 모델이 로드되지 않았습니다")
+
+        # 1) 모든 그룹의 쌍을 하나로 펼치기
+        queries, documents = [], []
+        for group in groups:
+            queries.extend([group.query] * len(group.documents))
+            documents.extend(group.documents)
+
+        # 2) 점수 계산 (패딩된 forward pass)
+        scores = self._predict_scores(queries, documents)
+
+        # 3) 그룹별로 다시 나눠서 top_k 선택
+        results = []
+        offset = 0
+        for group in groups:
+            group_scores = scores[offset:offset + len(group.documents)]
+            offset += len(group.documents)
+            results.append(self._top_k_results(group.documents, group_scores, group.top_k, return_documents))
 
         return results
 
+    async def rank_async(self, query: str, documents: list[str], top_k: int, return_documents: bool) -> list[RankResult]:
+        """
+        문서 리랭킹을 비동기로 수행합니다 (/rerank 핸들러용)
+
+        마이크로 배칭이 켜져 있으면 다른 동시 요청들과 같은 배치로 묶어서 점수를 계산합니다.
+
+        Raises:
+            QueueFullError: 배치 대기열이 가득 찼을 때
+        """
+        if not self.is_ready():
+            raise RuntimeError("Reranker 모델이 로드되지 않았습니다")
+
+        if not MICRO_BATCHING_ENABLED:
+            started = time.monotonic()
+            results = await asyncio.to_thread(self.rank, query, documents, top_k, return_documents)
+            self.metrics.observe_batch(len(documents), time.monotonic() - started, [0.0])
+            self._log_first_request()
+            return results
+
+        scores = await self.scheduler.submit(query, documents)
+        self._log_first_request()
+        return self._top_k_results(documents, scores, top_k, return_documents)
+
+    async def rank_coalesced(
+        self,
+        query: str,
+        documents: list[str],
+        top_k: int,
+        return_documents: bool,
+        document_hashes: Optional[list[str]] = None,
+    ) -> list[RankResult]:
+        """
+        rank_async + 동일 요청 합치기 (/rerank 핸들러용)
+
+        키는 (정규화 쿼리, 문서 본문 해시들, top_k, return_documents)라서 점수 캐시와 같은 기준으로 같은 요청을 판별합니다.
+        해시로 온 요청은 문서 저장소에서 검증된 document_hashes를 그대로 쓰고 본문을 다시 해싱하지 않습니다.
+        """
+        if not SINGLEFLIGHT_ENABLED:
+            return await self.rank_async(query, documents, top_k, return_documents)
+
+        if document_hashes is None:
+            document_hashes = [content_hash(document) for document in documents]
+        digest = hashlib.sha256(f"{top_k}\x00{int(return_documents)}\x00{normalize_query(query)}".encode("utf-8"))
+        for doc_hash in document_hashes:
+            digest.update(doc_hash.encode("ascii"))
+        return await self.flight.do(
+            digest.digest(), lambda: self.rank_async(query, documents, top_k, return_documents)
+        )
+
+    async def rank_batch_async(self, groups: list, return_documents: bool) -> list[list[RankResult]]:
+        """
+        여러 쿼리의 문서 리랭킹을 비동기로 수행합니다 (/rerank/batch 핸들러용)
+
+        그룹들을 스케줄러에 동시에 넣어서 다른 요청들과 함께 배치로 계산합니다.
+        """
+        if not self.is_ready():
+            raise RuntimeError("Reranker 모델이 로드되지 않았습니다")
+
+        if not MICRO_BATCHING_ENABLED:
+            started = time.monotonic()
+            results = await asyncio.to_thread(self.rank_batch, groups, return_documents)
+            self.metrics.observe_batch(
+                sum(len(group.documents) for group in groups), time.monotonic() - started, [0.0] * len(groups)
+            )
+            self._log_first_request()
+            return results
+
+        # 일부 그룹만 대기열에 들어가는 일이 없도록 전체 쌍 개수로 먼저 검사
+        self.scheduler.check_capacity(sum(len(group.documents) for group in groups))
+        all_scores = await asyncio.gather(*[
+            self.scheduler.submit(group.query, group.documents) for group in groups
+        ])
+        self._log_first_request()
+        return [
+            self._top_k_results(group.documents, scores, group.top_k, return_documents)
+            for group, scores in zip(groups, all_scores)
+        ]
+
+    def _predict_scores(self, queries: list[str], documents: list[str]) -> list[float]:
+        """
+        (query, document) 쌍 점수 계산
+
+        점수 캐시에 있는 쌍은 재사용하고, 없는 쌍만 MAX_BATCH_PAIRS 단위로 나눠서 forward pass
+        캐시 키와 모델 입력이 같은 텍스트가 되도록 쿼리는 정규화한 뒤 점수를 계산합니다.
+        """
+        normalized = {query: normalize_query(query) for query in set(queries)}
+        queries = [normalized[query] for query in queries]
+
+        if not USE_SCORE_CACHE:
+            return self._predict_uncached(queries, documents)
+
+        keys = [ScoreCache.make_key(query, document) for query, document in zip(queries, documents)]
+        scores = self.score_cache.get_many(keys)
+
+        # 같은 배치 안의 중복 쌍은 한 번만 계산
+        pending: dict[bytes, list[int]] = {}
+        for i, score in enumerate(scores):
+            if score is None:
+                pending.setdefault(keys[i], []).append(i)
+        if not pending:
+            return scores
+
+        first = [positions[0] for positions in pending.values()]
+        computed = self._predict_uncached([queries[i] for i in first], [documents[i] for i in first])
+
+        for (key, positions), score in zip(pending.items(), computed):
+            for i in positions:
+                scores[i] = score
+        self.score_cache.set_many(list(zip(pending.keys(), computed)))
+        return scores
+
+    def _predict_uncached(self, queries: list[str], documents: list[str]) -> list[float]:
+        """
+        (query, document) 쌍 점수 계산
+
+        쌍을 길이 순으로 정렬한 뒤 MAX_BATCH_PAIRS 단위로 잘라서 forward pass하고 (길이 버킷),
+        점수는 원래 인덱스 위치에 되돌려 놓습니다.
+        """
+        if self.pool is not None:
+            return self.pool.predict(queries, documents)  # 나누기는 워커가 수행
+        if not queries:
+            return []
+
+        model = self.model
+        if USE_TOKEN_CACHE and hasattr(model, "tokenizer"):
+            items = self._encode_pairs(queries, documents)
+            lengths = [len(item["input_ids"]) for item in items]
+            run_batch = lambda idx: self._forward_items([items[i] for i in idx])
+        else:
+            # 토큰 캐시가 꺼져 있거나 토크나이저가 없는 모델이면 model.predict를 그대로 사용 (길이는 글자 수로 근사)
+            documents = self._truncate_documents(documents)
+            lengths = [len(query) + len(document) for query, document in zip(queries, documents)]
+            run_batch = lambda idx: model.predict([queries[i] for i in idx], [documents[i] for i in idx]).tolist()
+
+        order = list(range(len(queries)))
+        if LENGTH_BUCKETING:
+            order.sort(key=lengths.__getitem__)
+
+        scores: list[float] = [0.0] * len(queries)
+        for start in range(0, len(order), MAX_BATCH_PAIRS):
+            batch_idx = order[start:start + MAX_BATCH_PAIRS]
+            for i, score in zip(batch_idx, run_batch(batch_idx)):
+                scores[i] = score
+        return scores
+
+    def _truncate_documents(self, documents: list[str]) -> list[str]:
+        """
+        문서 본문을 앞에서부터 MAX_DOC_TOKENS 토큰까지만 남김 (model.predict 경로용)
+
+        토큰 캐시 경로(_encode_pairs)는 토큰 ID를 자르고, 이 경로는 토크나이저 offset으로 본문을 잘라서
+        두 경로 모두 같은 문서 토큰 윈도우로 점수를 계산합니다.
+        토큰은 1바이트 이상이므로 UTF-8 길이가 MAX_DOC_TOKENS 이하인 문서는 토크나이징하지 않습니다.
+        """
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if MAX_DOC_TOKENS <= 0 or tokenizer is None:
+            return documents
+
+        truncated: dict[str, str] = {}  # 같은 배치 안에서 반복되는 문서는 한 번만 토크나이징
+        for document in documents:
+            if document in truncated or len(document.encode("utf-8")) <= MAX_DOC_TOKENS:
+                continue
+            encoded = tokenizer(
+                document,
+                add_special_tokens=False,
+                max_length=MAX_DOC_TOKENS,
+                truncation=True,
+                return_offsets_mapping=tokenizer.is_fast,
+            )
+            if tokenizer.is_fast:
+                offsets = encoded["offset_mapping"]
+                truncated[document] = document[:offsets[-1][1]] if offsets else document
+            else:
+                truncated[document] = tokenizer.decode(encoded["input_ids"])
+        return [truncated.get(document, document) for document in documents]
+
+    def _encode_pairs(self, queries: list[str], documents: list[str]) -> list[dict]:
+        """
+        (query, document) 쌍을 모델 입력 토큰으로 변환 (문서 토큰 캐시 사용)
+
+        MxbaiRerankV2.prepare_inputs와 같은 방식으로 입력을 만들되, 문서 토큰은 본문 해시 기준으로
+        TokenCache에서 재사용하고 (같은 청크가 반복되면 토크나이징 생략), MAX_DOC_TOKENS로 잘라서 씁니다.
+        """
+        model = self.model
+        tokenizer = model.tokenizer
+        query_ids: dict[str, list[int]] = {}  # 같은 배치 안에서 반복되는 쿼리는 한 번만 토크나이징
+        inputs = []
+        for query, document in zip(queries, documents):
+            q_ids = query_ids.get(query)
+            if q_ids is None:
+                q_ids = tokenizer(
+                    model.query_prompt.format(query=query),
+                    return_tensors=None,
+                    add_special_tokens=False,
+                    max_length=model.max_length * 3 // 4,
+                    truncation=True,
+                )["input_ids"]
+                query_ids[query] = q_ids
+
+            # 문서 토큰: 쿼리와 무관하게 max_length까지 캐시해두고, 쿼리 길이 / 토큰 윈도우에 맞춰 잘라서 사용
+            doc_hash = content_hash(document)
+            d_ids = token_cache.get(doc_hash)
+            if d_ids is None:
+                d_ids = tokenizer(
+                    model.doc_prompt.format(document=document),
+                    return_tensors=None,
+                    add_special_tokens=False,
+                    max_length=model.max_length,
+                    truncation=True,
+                )["input_ids"]
+                token_cache.set(doc_hash, d_ids)
+
+            available_tokens = model.model_max_length - len(q_ids) - model.predefined_length
+            doc_maxlen = min(available_tokens, model.max_length)
+            if MAX_DOC_TOKENS > 0:
+                doc_maxlen = min(doc_maxlen, MAX_DOC_TOKENS)
+
+            item = tokenizer.prepare_for_model(
+                q_ids,
+                model.sep_inputs + d_ids[:doc_maxlen],
+                truncation="only_second",
+                max_length=model.max_length,
+                padding=False,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+                add_special_tokens=False,
+            )
+            item["input_ids"] = model.concat_input_ids(item["input_ids"])
+            item["attention_mask"] = [1] * len(item["input_ids"])
+            inputs.append(item)
+        return inputs
+
+    def _forward_items(self, inputs: list[dict]) -> list[float]:
+        """토큰화된 입력 배치 forward pass 1회 (배치 안에서 가장 긴 입력 길이로 패딩)"""
+        import torch
+
+        model = self.model
+        batch = model.tokenizer.pad(
+            inputs,
+            padding="longest",
+            max_length=model.max_length_padding,
+            pad_to_multiple_of=8,
+            return_tensors="pt",
+        )
+        with torch.inference_mode():
+            batch = {k: v.to(model.device) for k, v in batch.items()}
+            return model.forward(**batch).logits.cpu().float().tolist()
+
+    @staticmethod
+    def _top_k_results(
+        documents: list[str], scores: list[float], top_k: int, return_documents: bool
+    ) -> list[RankResult]:
+        """점수 상위 top_k개 문서를 원본 인덱스와 함께 반환"""
+        actual_top_k = min(top_k, len(documents))
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:actual_top_k]
+        return [
+            RankResult(
+                index=i,
+                score=float(scores[i]),
+                document=documents[i] if return_documents else None
+            )
+            for i in ranked
+        ]
+
+    def stats(self) -> dict:
+        """마이크로 배칭 메트릭 (/health 노출용)"""
+        return {
+            "micro_batching": MICRO_BATCHING_ENABLED,
+            **self.scheduler.stats()
+        }
+
+    def render_metrics(self) -> str:
+        """Prometheus 텍스트 형식 메트릭 (/metrics 노출용)"""
+        metrics, batching = self.metrics, self.scheduler.stats()
+        caches = self.cache_stats()
+        out = MetricsWriter()
+
+        out.scalar("ready", "gauge", "1 if the reranker can serve requests", [(None, int(self.is_ready()))])
+        out.scalar("cold_start_seconds", "gauge", "Model load + warm-up time", [(None, self.cold_start_seconds or 0.0)])
+        out.scalar("requests_total", "counter", "Rerank HTTP requests by endpoint and status",
+                   [({"endpoint": endpoint, "status": status}, count)
+                    for (endpoint, status), count in sorted(metrics.requests.items())])
+        out.histogram("request_duration_seconds", "End-to-end rerank request latency",
+                      [({"endpoint": endpoint}, histogram) for endpoint, histogram in sorted(metrics.request_seconds.items())])
+        out.histogram("queue_wait_seconds", "Time a request waited in the micro-batch queue",
+                      [(None, metrics.queue_wait_seconds)])
+        out.histogram("inference_seconds", "Model time per batch (score cache lookups included)",
+                      [(None, metrics.inference_seconds)])
+        out.histogram("batch_pairs", "(query, document) pairs per batch", [(None, metrics.batch_pairs)])
+        out.scalar("pairs_scored_total", "counter", "(query, document) pairs scored", [(None, metrics.pairs_scored)])
+        out.scalar("queue_depth_pairs", "gauge", "Pairs waiting in the micro-batch queue",
+                   [(None, batching["queue_depth_pairs"])])
+        out.scalar("queue_capacity_pairs", "gauge", "Micro-batch queue capacity", [(None, batching["max_queue_pairs"])])
+        out.scalar("running_batches", "gauge", "Batches currently running", [(None, batching["running_batches"])])
+        out.scalar("coalesced_requests_total", "counter", "Requests that shared an identical in-flight request",
+                   [(None, self.flight.shared)])
+        out.scalar("rejected_requests_total", "counter", "Requests rejected with 503 by reason",
+                   [({"reason": reason}, count) for reason, count in sorted(metrics.rejected.items())])
+
+        cache_rows = [(name, caches[name]) for name in ("score_cache", "document_store", "token_cache")]
+        out.scalar("cache_hits_total", "counter", "Cache hits", [({"cache": name}, c["hits"]) for name, c in cache_rows])
+        out.scalar("cache_misses_total", "counter", "Cache misses", [({"cache": name}, c["misses"]) for name, c in cache_rows])
+        out.scalar("cache_items", "gauge", "Cache entries", [({"cache": name}, c["items"]) for name, c in cache_rows])
+
+        workers = self.worker_stats()
+        if workers is not None:
+            out.scalar("worker_pending_batches", "gauge", "In-flight batches per model worker",
+                       [({"worker": w["id"], "device": w["device"]}, w["pending"]) for w in workers["workers"]])
+            out.scalar("worker_ready", "gauge", "1 if the model worker is alive and loaded",
+                       [({"worker": w["id"], "device": w["device"]}, int(w["ready"] and w["alive"]))
+                        for w in workers["workers"]])
+        return out.render()
+
+    def worker_stats(self) -> Optional[dict]:
+        """워커별 부하 (/health 노출용, supervisor 모드가 아니면 None)"""
+        return self.pool.stats() if self.pool is not None else None
+
+    def cache_stats(self) -> dict:
+        """점수 캐시 / 문서 저장소 / 토큰 캐시 메트릭 (/health 노출용)"""
+        return {
+            "score_cache": {"enabled": USE_SCORE_CACHE, **self.score_cache.stats()},
+            "document_store": document_store.stats(),
+            "token_cache": token_cache.stats(),
+        }
+
 
 # 전역 서비스 인스턴스 -> 로딩된 리랭커 모델 저장
 reranker_service = RerankerService()
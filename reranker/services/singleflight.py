@@ -0,0 +1,57 @@
+"""
+동일 요청 합치기 (singleflight)
+
+같은 질문이 동시에 몰리면 (공지 / 교육 시간 등) 점수 캐시가 채워지기 전에 같은 요청이 여러 번 배치에 들어갑니다.
+진행 중인 같은 요청이 있으면 새로 계산하지 않고 그 결과를 함께 받습니다.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 비동기 호출을 1회로 합침 (singleflight)
+
+    첫 호출만 실제로 실행하고, 완료 전에 들어온 같은 키의 호출은 그 결과(또는 예외)를 함께 받습니다.
+    완료되면 키를 지우므로 결과를 캐시하지는 않습니다. 이벤트 루프별로 따로 관리하고,
+    기다리던 호출이 모두 취소되면 실행 중인 호출도 취소합니다.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], list] = {}  # (루프 id, 키) → [task, 대기 중인 호출 수]
+        self.shared = 0  # 다른 호출의 결과를 공유받은 횟수
+
+    def in_flight(self, key: Hashable) -> bool:
+        """현재 이벤트 루프에서 같은 키의 호출이 진행 중인지"""
+        return (id(asyncio.get_running_loop()), key) in self._calls
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Args:
+            key: 같은 요청을 판별하는 키
+            factory: 실제 호출 코루틴을 만드는 함수 (첫 호출에서만 실행)
+        """
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        entry = self._calls.get(slot)
+        if entry is None:
+            entry = [loop.create_task(factory()), 0]
+            self._calls[slot] = entry
+            entry[0].add_done_callback(lambda _: self._forget(slot, entry))
+        else:
+            self.shared += 1
+
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()
+
+    def _forget(self, slot: Tuple[int, Hashable], entry: list) -> None:
+        if self._calls.get(slot) is entry:
+            del self._calls[slot]
@@ -0,0 +1,413 @@
+"""
+멀티 프로세스 Reranker 워커 풀 (supervisor 모드)
+
+uvicorn 프로세스(supervisor)는 HTTP / 마이크로 배칭 / 점수 캐시만 담당하고,
+모델 추론은 N개의 워커 프로세스가 나눠서 수행합니다.
+- 워커마다 장치(cpu / cuda:N)를 하나씩 배정하고, CPU 워커는 코어를 나눠서 고정(affinity)
+- 배치마다 처리 중인 작업이 가장 적은 워커로 전달 (least-loaded)
+- 모든 워커의 대기열이 가득 차면 WorkerPoolFullError → 503 + Retry-After
+- 워커 프로세스가 죽으면 처리 중이던 배치를 바로 에러로 끝내고 새 프로세스로 교체
+"""
+
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError  # Python 3.10에서는 내장 TimeoutError와 다른 클래스
+from multiprocessing.connection import wait as wait_connections
+from typing import Callable, List, Optional
+
+from services.batcher import QueueFullError
+
+logger = logging.getLogger(__name__)
+
+# supervisor 모드 설정
+RERANKER_WORKERS = int(os.getenv("RERANKER_WORKERS", "0"))  # 0 또는 1이면 단일 프로세스 모드
+RERANKER_WORKER_DEVICES = os.getenv("RERANKER_WORKER_DEVICES", "")  # 예: "cuda:0,cuda:1" / "cpu" (비우면 자동)
+RERANKER_WORKER_MAX_PENDING = int(os.getenv("RERANKER_WORKER_MAX_PENDING", "2"))  # 워커당 최대 동시 배치 수
+RERANKER_WORKER_TIMEOUT = float(os.getenv("RERANKER_WORKER_TIMEOUT", "60"))  # 배치 1개 최대 대기 시간 (초)
+RERANKER_WORKER_MAX_RESTARTS = int(os.getenv("RERANKER_WORKER_MAX_RESTARTS", "5"))  # 워커 1개당 최대 재시작 횟수
+
+
+class WorkerPoolFullError(QueueFullError):
+    """모든 워커의 대기열이 가득 참"""
+
+
+def resolve_devices(num_workers: int, devices: str) -> List[str]:
+    """워커별 장치 목록 (설정이 없으면 GPU 개수만큼 cuda:N, GPU가 없으면 cpu)"""
+    if devices:
+        listed = [d.strip() for d in devices.split(",") if d.strip()]
+        return [listed[i % len(listed)] for i in range(num_workers)]
+
+    try:
+        import torch
+        gpu_count = torch.cuda.device_count()
+    except ImportError:
+        gpu_count = 0
+
+    if gpu_count:
+        return [f"cuda:{i % gpu_count}" for i in range(num_workers)]
+    return ["cpu"] * num_workers
+
+
+def split_cores(devices: List[str]) -> List[Optional[List[int]]]:
+    """CPU 워커끼리 사용 가능한 코어를 균등 분할 (GPU 워커는 고정하지 않음)"""
+    try:
+        available = sorted(os.sched_getaffinity(0))
+    except AttributeError:  # sched_getaffinity가 없는 OS
+        available = list(range(os.cpu_count() or 1))
+
+    cpu_workers = [i for i, device in enumerate(devices) if device == "cpu"]
+    assignment: List[Optional[List[int]]] = [None] * len(devices)
+    if not cpu_workers:
+        return assignment
+
+    per_worker = max(1, len(available) // len(cpu_workers))
+    for n, worker_id in enumerate(cpu_workers):
+        start = (n * per_worker) % len(available)
+        assignment[worker_id] = available[start:start + per_worker] or available[:per_worker]
+    return assignment
+
+
+def _worker_main(worker_id: int, device: str, cores: Optional[List[int]], requests, responses) -> None:
+    """
+    워커 프로세스 진입점
+
+    torch / 모델 import 전에 장치와 스레드 수를 환경 변수로 고정한 뒤 모델을 로드하고,
+    (job_id, queries, documents)를 받아 점수를 돌려줌
+    (응답은 워커 전용 파이프로 보냄: 워커끼리 쓰기 잠금을 공유하지 않으므로 한 워커가 죽어도 다른 워커 응답이 막히지 않음)
+    """
+    if device == "cpu":
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    elif device.startswith("cuda:"):
+        os.environ["CUDA_VISIBLE_DEVICES"] = device.split(":", 1)[1]
+
+    if cores:
+        os.sched_setaffinity(0, cores)
+        os.environ["RERANKER_NUM_THREADS"] = str(len(cores))
+
+    # 워커는 점수 캐시 없이 모델만 실행 (캐시는 supervisor가 공유)
+    os.environ["RERANKER_MICRO_BATCHING"] = "false"
+    from services.reranker import RerankerService
+
+    service = RerankerService()
+    try:
+        import asyncio
+        asyncio.run(service.load_model())
+    except Exception as e:
+        responses.send(("failed", worker_id, str(e)))
+        return
+    responses.send(("ready", worker_id, None))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        job_id, queries, documents = message
+        try:
+            responses.send(("result", job_id, service._predict_uncached(queries, documents)))
+        except Exception as e:
+            responses.send(("error", job_id, str(e)))
+
+
+class _WorkerHandle:
+    """supervisor 쪽에서 관리하는 워커 1개의 상태"""
+
+    def __init__(self, worker_id: int, device: str, cores: Optional[List[int]]):
+        self.worker_id = worker_id
+        self.device = device
+        self.cores = cores
+        self.process = None  # 시작 / 재시작할 때마다 새 프로세스, 요청 큐, 응답 파이프로 교체
+        self.requests = None
+        self.responses = None  # 워커 → supervisor 응답 파이프 (수신 쪽)
+        self.ready = False
+        self.load_failed = False  # 모델 로딩 실패 (재시작해도 같은 결과이므로 교체하지 않음)
+        self.restarts = 0
+        self.retired = False  # 종료 후 교체하지 않기로 한 워커 (더 이상 감시하지 않음)
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class WorkerPool:
+    """
+    모델 워커 프로세스 풀
+
+    Args:
+        num_workers: 워커 프로세스 수
+        devices: 워커별 장치 설정 문자열 (RERANKER_WORKER_DEVICES 형식)
+        max_pending: 워커당 동시에 처리 중일 수 있는 최대 배치 수
+        timeout: 배치 1개 결과를 기다리는 최대 시간 (초)
+        max_restarts: 워커 1개가 죽었을 때 새 프로세스로 교체하는 최대 횟수
+        worker_target: 워커 프로세스 진입점 (테스트에서 모델 없는 스텁 워커로 교체)
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        devices: str = "",
+        max_pending: int = 2,
+        timeout: float = 60.0,
+        max_restarts: int = RERANKER_WORKER_MAX_RESTARTS,
+        worker_target: Callable = _worker_main
+    ):
+        self.num_workers = num_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self.worker_target = worker_target
+
+        self._ctx = mp.get_context("spawn")  # CUDA는 fork 이후 초기화할 수 없으므로 spawn 사용
+        self._futures: dict = {}
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.rejected = 0
+
+        worker_devices = resolve_devices(num_workers, devices)
+        self._workers: List[_WorkerHandle] = [
+            _WorkerHandle(worker_id, device, cores)
+            for worker_id, (device, cores) in enumerate(zip(worker_devices, split_cores(worker_devices)))
+        ]
+
+    # ==================== 수명 주기 ====================
+
+    def start(self) -> None:
+        """워커 프로세스 시작 (모델 로딩은 워커에서 비동기로 진행)"""
+        for worker in self._workers:
+            self._spawn(worker)
+            logger.info(
+                f"🚀 Reranker 워커 {worker.worker_id} 시작 (pid={worker.process.pid}, 장치={worker.device}, "
+                f"코어={worker.cores if worker.cores else '제한 없음'})"
+            )
+        self._reader = threading.Thread(target=self._read_responses, name="reranker-pool-reader", daemon=True)
+        self._reader.start()
+
+    def _spawn(self, worker: _WorkerHandle) -> None:
+        """워커 프로세스를 새 요청 큐 / 응답 파이프와 함께 시작"""
+        receiver, sender = self._ctx.Pipe(duplex=False)
+        worker.requests = self._ctx.Queue()
+        worker.responses = receiver
+        worker.ready = False
+        worker.process = self._ctx.Process(
+            target=self.worker_target,
+            args=(worker.worker_id, worker.device, worker.cores, worker.requests, sender),
+            name=f"reranker-worker-{worker.worker_id}",
+            daemon=True
+        )
+        worker.process.start()
+        sender.close()  # supervisor 쪽 송신 끝을 닫아야 워커가 죽었을 때 수신 쪽에서 EOF를 받음
+
+    def wait_ready(self, timeout: float) -> bool:
+        """워커가 1개 이상 준비될 때까지 대기"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.is_ready():
+                return True
+            if not self.any_alive():
+                return False
+            time.sleep(0.5)
+        return self.is_ready()
+
+    def stop(self) -> None:
+        """워커 종료 (처리 중인 배치는 에러로 종료)"""
+        self._stopping.set()
+        if self._reader is not None:
+            self._reader.join(timeout=5)  # 종료 중에 죽는 워커를 다시 띄우지 않도록 먼저 정지
+        for worker in self._workers:
+            if worker.alive:
+                worker.requests.put(None)
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for _, future in futures.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Reranker 워커 풀이 종료되었습니다"))
+
+    def is_ready(self) -> bool:
+        return any(w.ready and w.alive for w in self._workers)
+
+    def any_alive(self) -> bool:
+        return any(w.alive for w in self._workers)
+
+    # ==================== 요청 처리 ====================
+
+    def predict(self, queries: List[str], documents: List[str]) -> List[float]:
+        """
+        가장 한가한 워커에 배치를 보내고 점수를 받을 때까지 대기 (블로킹, 스레드에서 호출)
+
+        Raises:
+            WorkerPoolFullError: 모든 워커가 max_pending개씩 처리 중일 때
+        """
+        with self._lock:
+            candidates = [w for w in self._workers if w.ready and w.alive]
+            if not candidates:
+                raise RuntimeError("사용 가능한 Reranker 워커가 없습니다")
+
+            worker = min(candidates, key=lambda w: (w.pending, w.completed))
+            if worker.pending >= self.max_pending:
+                self.rejected += 1
+                raise WorkerPoolFullError(
+                    f"모든 Reranker 워커가 바쁩니다 (워커 {len(candidates)}개 × 최대 {self.max_pending}배치)"
+                )
+
+            job_id = next(self._job_ids)
+            future: Future = Future()
+            self._futures[job_id] = (worker, future)
+            worker.pending += 1
+            worker.requests.put((job_id, queries, documents))  # 재시작으로 큐가 교체되는 중이 아닐 때 전달
+            process = worker.process
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if future.done():  # 타임아웃 직후에 응답이 도착한 경우
+                return future.result()
+            # 워커는 아직 이 배치를 처리 중이므로 pending을 풀지 않고 프로세스를 종료 →
+            # 감시 스레드가 남은 배치를 에러로 끝내고 (pending 정리) 새 프로세스로 교체
+            logger.error(
+                f"⏱️ Reranker 워커 {worker.worker_id} 응답 없음 ({self.timeout:.0f}초 초과) → 프로세스 종료 후 재시작"
+            )
+            if process.is_alive():
+                process.terminate()
+            raise
+
+    def _read_responses(self) -> None:
+        """
+        워커 응답을 받아 대기 중인 Future에 전달하고, 워커 프로세스 종료를 감시 (백그라운드 스레드)
+
+        응답 파이프와 프로세스 sentinel을 함께 기다리므로 워커가 죽으면 바로 감지해서,
+        그 워커에 보낸 배치는 타임아웃을 기다리지 않고 에러로 끝내고 프로세스를 다시 띄웁니다.
+        """
+        while not self._stopping.is_set():
+            workers = [w for w in self._workers if not w.retired]
+            if not workers:
+                return
+            channels = {w.responses: w for w in workers if w.responses is not None}
+            sentinels = {w.process.sentinel: w for w in workers}
+            ready = wait_connections(list(channels) + list(sentinels), timeout=0.5)
+            if self._stopping.is_set():
+                return
+
+            # 죽기 직전에 보낸 응답부터 처리한 뒤 종료 처리
+            for conn in ready:
+                if conn in channels:
+                    self._drain(channels[conn])
+            for sentinel in ready:
+                if sentinel in sentinels:
+                    self._drain(sentinels[sentinel])
+                    self._handle_exit(sentinels[sentinel])
+
+    def _drain(self, worker: _WorkerHandle) -> None:
+        """응답 파이프에 도착한 메시지를 모두 처리 (EOF면 파이프를 닫고 종료 처리는 sentinel에 맡김)"""
+        conn = worker.responses
+        try:
+            while conn is not None and conn.poll():
+                self._dispatch(worker, *conn.recv())
+        except (EOFError, OSError):
+            conn.close()
+            worker.responses = None
+
+    def _dispatch(self, worker: _WorkerHandle, kind: str, key, payload) -> None:
+        """워커 메시지 1개 처리 (준비 / 로딩 실패 / 결과 / 에러)"""
+        if kind in ("ready", "failed"):
+            worker.ready = kind == "ready"
+            worker.load_failed = kind == "failed"
+            if worker.ready:
+                logger.info(f"✅ Reranker 워커 {key} 준비 완료 ({worker.device})")
+            else:
+                logger.error(f"❌ Reranker 워커 {key} 모델 로딩 실패: {payload}")
+            return
+
+        with self._lock:
+            entry = self._futures.pop(key, None)
+            if entry is None:
+                return  # 이미 타임아웃 처리된 작업
+            owner, future = entry
+            owner.pending -= 1
+            if kind == "result":
+                owner.completed += 1
+            else:
+                owner.failed += 1
+
+        if kind == "result":
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _handle_exit(self, worker: _WorkerHandle) -> None:
+        """죽은 워커의 대기 중 배치를 에러로 끝내고 (가능하면) 새 프로세스로 교체"""
+        worker.process.join(timeout=1)  # sentinel은 종료 직후 준비되므로 exitcode를 얻으려면 회수 필요
+        exitcode = worker.process.exitcode
+        with self._lock:
+            lost = [(job_id, future) for job_id, (owner, future) in self._futures.items() if owner is worker]
+            for job_id, _ in lost:
+                del self._futures[job_id]
+            worker.failed += len(lost)
+            worker.pending = 0
+            was_ready, worker.ready = worker.ready, False
+
+            # 죽은 프로세스가 읽지 못한 작업이 남은 큐는 버림 (종료 시 feeder 스레드를 기다리지 않음)
+            worker.requests.cancel_join_thread()
+            worker.requests.close()
+            if worker.responses is not None:
+                worker.responses.close()
+                worker.responses = None
+
+            # 모델 로딩 중 실패 / 재시작 한도 초과 워커는 교체하지 않음
+            restart = not worker.load_failed and was_ready and worker.restarts < self.max_restarts
+            if restart:
+                worker.restarts += 1
+                self._spawn(worker)
+            else:
+                worker.retired = True
+
+        error = RuntimeError(f"Reranker 워커 {worker.worker_id} 프로세스가 종료되었습니다 (exitcode={exitcode})")
+        for _, future in lost:
+            if not future.done():
+                future.set_exception(error)
+
+        logger.error(f"💥 Reranker 워커 {worker.worker_id} 종료 (exitcode={exitcode}, 처리 중이던 배치 {len(lost)}개 실패)")
+        if restart:
+            logger.info(
+                f"🔁 Reranker 워커 {worker.worker_id} 재시작 ({worker.restarts}/{self.max_restarts}회, pid={worker.process.pid})"
+            )
+        else:
+            logger.error(f"❌ Reranker 워커 {worker.worker_id}는 다시 시작하지 않습니다 (재시작 {worker.restarts}회)")
+
+    # ==================== 메트릭 ====================
+
+    def stats(self) -> dict:
+        """워커별 상태 (/health 노출용)"""
+        return {
+            "workers": [
+                {
+                    "id": w.worker_id,
+                    "device": w.device,
+                    "cores": w.cores,
+                    "alive": w.alive,
+                    "ready": w.ready,
+                    "pending": w.pending,
+                    "completed": w.completed,
+                    "failed": w.failed,
+                    "restarts": w.restarts,
+                }
+                for w in self._workers
+            ],
+            "max_pending_per_worker": self.max_pending,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,34 @@
+"""
+Reranker 테스트 공용 픽스처
+
+실제 모델(torch / mxbai-rerank) 없이 스텁 모델로 배칭 / 캐시 / 엔드포인트 코드를 검증합니다.
+실행 (reranker 디렉토리에서): python -m pytest tests -q
+"""
+
+import pytest
+
+import services.reranker
+from services.doc_store import DocumentStore
+from services.reranker import RerankerService
+from tests.stubs import StubModel
+
+
+@pytest.fixture
+def stub_model() -> StubModel:
+    return StubModel()
+
+
+@pytest.fixture
+def service(stub_model, monkeypatch) -> RerankerService:
+    """스텁 모델이 로드된 새 RerankerService (라우터 / 미들웨어도 이 인스턴스를 사용)"""
+    import main
+    import routers.reranker
+
+    svc = RerankerService()
+    svc.model = stub_model
+    svc.state = "ready"
+    monkeypatch.setattr(routers.reranker, "reranker_service", svc)
+    monkeypatch.setattr(main, "reranker_service", svc)
+    monkeypatch.setattr(routers.reranker, "document_store", DocumentStore(max_items=100, max_chars=100_000))
+    monkeypatch.setattr(services.reranker, "USE_SCORE_CACHE", False)  # 캐시 테스트에서만 켬
+    return svc
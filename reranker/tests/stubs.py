@@ -0,0 +1,72 @@
+"""테스트용 스텁 모델 (torch / mxbai-rerank 없이 model.predict 흉내)"""
+
+import re
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+
+class StubModel:
+    """
+    점수 = 쿼리와 문서의 공통 글자 수 (결정적), 호출마다 입력 쌍을 기록
+
+    gate를 넘기면 gate가 set될 때까지 predict가 블록됩니다 (배치 실행 중 상태를 만들 때 사용).
+    """
+
+    def __init__(self, gate: Optional[threading.Event] = None, error: Optional[Exception] = None):
+        self.calls: List[List[tuple]] = []
+        self.gate = gate
+        self.error = error
+        self.started = threading.Event()
+
+    def predict(self, queries: List[str], documents: List[str]):
+        self.calls.append(list(zip(queries, documents)))
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return np.array([float(len(set(q) & set(d))) for q, d in zip(queries, documents)])
+
+    @property
+    def pairs(self) -> int:
+        return sum(len(call) for call in self.calls)
+
+
+class WhitespaceTokenizer:
+    """공백 단위 토크나이저 스텁 (fast 토크나이저처럼 offset_mapping 반환)"""
+
+    is_fast = True
+
+    def __call__(self, text: str, add_special_tokens: bool = True, max_length: Optional[int] = None,
+                 truncation: bool = False, return_offsets_mapping: bool = False):
+        spans = [m.span() for m in re.finditer(r"\S+", text)]
+        if truncation and max_length is not None:
+            spans = spans[:max_length]
+        encoded = {"input_ids": list(range(len(spans)))}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = spans
+        return encoded
+
+
+def stub_worker_main(worker_id, device, cores, requests, responses) -> None:
+    """
+    WorkerPool용 스텁 워커 프로세스 (모델 없이 점수 = 문서 길이)
+
+    문서가 "crash"면 프로세스를 바로 종료하고, "hang"이면 응답하지 않습니다.
+    """
+    import os
+    import time
+
+    responses.send(("ready", worker_id, None))
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        job_id, queries, documents = message
+        if "crash" in documents:
+            os._exit(1)
+        if "hang" in documents:
+            time.sleep(3)  # 풀 타임아웃보다 길게
+        responses.send(("result", job_id, [float(len(document)) for document in documents]))
@@ -0,0 +1,190 @@
+"""MicroBatchScheduler 테스트 (창 닫힘 조건 / 에러 전파 / 취소 / 과부하 거절)"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.batcher import MicroBatchScheduler, QueueFullError
+from tests.stubs import StubModel
+
+
+def _scheduler(model: StubModel, max_batch_pairs: int = 64, max_wait_ms: float = 20, max_queue_pairs: int = 1000):
+    return MicroBatchScheduler(
+        predict_fn=lambda queries, documents: model.predict(queries, documents).tolist(),
+        max_batch_pairs=max_batch_pairs,
+        max_wait_ms=max_wait_ms,
+        max_queue_pairs=max_queue_pairs,
+    )
+
+
+def test_requests_within_window_share_one_batch():
+    model = StubModel()
+    scheduler = _scheduler(model, max_wait_ms=50)
+
+    async def scenario():
+        first = asyncio.create_task(scheduler.submit("ab", ["a", "b"]))
+        await asyncio.sleep(0.01)  # 창(50ms) 안에 두 번째 요청 도착
+        second = asyncio.create_task(scheduler.submit("bc", ["c"]))
+        results = await asyncio.gather(first, second)
+        await scheduler.stop()
+        return results
+
+    first, second = asyncio.run(scenario())
+    assert first == [1.0, 1.0] and second == [1.0]
+    assert model.calls == [[("ab", "a"), ("ab", "b"), ("bc", "c")]]
+
+
+def test_deadline_flushes_partial_batch():
+    model = StubModel()
+    scheduler = _scheduler(model, max_batch_pairs=64, max_wait_ms=30)
+
+    async def scenario():
+        started = time.monotonic()
+        scores = await scheduler.submit("q", ["q"])
+        elapsed = time.monotonic() - started
+        late = await scheduler.submit("q", ["x"])  # 창이 닫힌 뒤 도착 → 다음 배치
+        await scheduler.stop()
+        return scores, late, elapsed
+
+    scores, late, elapsed = asyncio.run(scenario())
+    assert scores == [1.0] and late == [0.0]
+    assert 0.025 <= elapsed < 1.0  # 배치가 차지 않아도 max_wait_ms 뒤에 실행
+    assert len(model.calls) == 2
+
+
+def test_full_batch_flushes_before_deadline_and_carries_overflow():
+    model = StubModel()
+    scheduler = _scheduler(model, max_batch_pairs=4, max_wait_ms=10_000)
+
+    async def scenario():
+        started = time.monotonic()
+        jobs = [
+            asyncio.create_task(scheduler.submit("q1", ["a", "b"])),
+            asyncio.create_task(scheduler.submit("q2", ["c", "d"])),
+            asyncio.create_task(scheduler.submit("q3", ["e", "f", "g"])),
+        ]
+        await asyncio.gather(jobs[0], jobs[1])
+        elapsed = time.monotonic() - started
+        jobs[2].cancel()  # 다음 배치 창(10초)은 기다리지 않음
+        await scheduler.stop()
+        return elapsed
+
+    elapsed = asyncio.run(scenario())
+    assert elapsed < 1.0  # max_batch_pairs에 도달하면 max_wait_ms를 기다리지 않음
+    assert [len(call) for call in model.calls] == [4]  # 넘치는 요청(3쌍)은 다음 배치로 이월
+    assert scheduler.queued_pairs == 0
+
+
+def test_predict_error_fails_every_waiter():
+    model = StubModel(error=RuntimeError("CUDA OOM"))
+    scheduler = _scheduler(model, max_wait_ms=20)
+
+    async def scenario():
+        jobs = [asyncio.create_task(scheduler.submit(f"q{i}", ["a", "b"])) for i in range(3)]
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        await scheduler.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(model.calls) == 1
+    assert all(isinstance(r, RuntimeError) and "CUDA OOM" in str(r) for r in results)
+    assert scheduler.queued_pairs == 0
+
+
+def test_cancelled_request_is_not_sent_to_model():
+    gate = threading.Event()
+    model = StubModel(gate=gate)
+    scheduler = _scheduler(model, max_wait_ms=5)
+
+    async def scenario():
+        running = asyncio.create_task(scheduler.submit("q0", ["a"]))
+        await asyncio.to_thread(model.started.wait, 5)  # 첫 배치가 모델 안에서 블록된 상태
+        cancelled = asyncio.create_task(scheduler.submit("q1", ["b", "c"]))
+        kept = asyncio.create_task(scheduler.submit("q2", ["d"]))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()  # 클라이언트 연결 끊김
+        gate.set()
+        await asyncio.gather(running, kept)
+        await scheduler.stop()
+        return cancelled
+
+    cancelled = asyncio.run(scenario())
+    assert cancelled.cancelled()
+    assert [pair[0] for call in model.calls for pair in call] == ["q0", "q2"]
+    assert scheduler.queued_pairs == 0
+
+
+def test_queue_full_rejects_without_enqueueing():
+    gate = threading.Event()
+    model = StubModel(gate=gate)
+    scheduler = _scheduler(model, max_queue_pairs=3)
+
+    async def scenario():
+        running = asyncio.create_task(scheduler.submit("q", ["a", "b"]))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await scheduler.submit("q", ["c", "d"])
+        gate.set()
+        await running
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert scheduler.rejected_requests == 1
+    assert model.pairs == 2
+
+
+def test_stop_fails_pending_requests():
+    model = StubModel()
+    scheduler = _scheduler(model, max_wait_ms=10_000, max_batch_pairs=64)
+
+    async def scenario():
+        job = asyncio.create_task(scheduler.submit("q", ["a"]))
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return await asyncio.gather(job, return_exceptions=True)
+
+    (result,) = asyncio.run(scenario())
+    assert model.calls == []
+    assert isinstance(result, RuntimeError)  # 수집 중이던 요청도 에러로 종료 (무한 대기 없음)
+
+
+def test_stop_fails_running_batch():
+    gate = threading.Event()
+    model = StubModel(gate=gate)
+    scheduler = _scheduler(model, max_wait_ms=5)
+
+    async def scenario():
+        job = asyncio.create_task(scheduler.submit("q", ["a"]))
+        await asyncio.to_thread(model.started.wait, 5)  # 배치가 모델 안에서 실행 중
+        await scheduler.stop()
+        gate.set()
+        return await asyncio.wait_for(asyncio.gather(job, return_exceptions=True), timeout=2)
+
+    (result,) = asyncio.run(scenario())
+    assert isinstance(result, RuntimeError)  # 실행 중이던 배치의 요청도 무한 대기 없이 에러로 종료
+    assert scheduler.running_batches == 0
+
+
+def test_stop_fails_running_batches_with_concurrency():
+    gate = threading.Event()
+    model = StubModel(gate=gate)
+    scheduler = MicroBatchScheduler(
+        predict_fn=lambda queries, documents: model.predict(queries, documents).tolist(),
+        max_batch_pairs=1,
+        max_wait_ms=5,
+        max_queue_pairs=100,
+        concurrency=2,
+    )
+
+    async def scenario():
+        jobs = [asyncio.create_task(scheduler.submit(f"q{i}", ["a"])) for i in range(2)]
+        await asyncio.to_thread(model.started.wait, 5)
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        gate.set()
+        return await asyncio.wait_for(asyncio.gather(*jobs, return_exceptions=True), timeout=2)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
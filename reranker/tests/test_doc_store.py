@@ -0,0 +1,48 @@
+"""DocumentStore / TokenCache 테스트 (해시 검증 / 누락 해시 / LRU 상한)"""
+
+from services.doc_store import DocumentStore, TokenCache, content_hash
+
+
+def test_put_rejects_mismatched_hash():
+    store = DocumentStore(max_items=10, max_chars=1000)
+    assert store.put(content_hash("본문"), "본문")
+    assert not store.put(content_hash("본문"), "다른 본문")
+    assert store.stats()["rejected"] == 1
+
+
+def test_resolve_uses_request_texts_and_reports_missing_once():
+    store = DocumentStore(max_items=10, max_chars=1000)
+    known, sent, unknown = content_hash("a"), content_hash("b"), content_hash("c")
+    store.put(known, "a")
+
+    documents, missing = store.resolve([known, sent, unknown, unknown], {sent: "b"})
+    assert documents == ["a", "b", None, None]
+    assert missing == [unknown]
+
+    documents, missing = store.resolve([sent], {})  # 요청에 함께 온 본문은 저장됨
+    assert documents == ["b"] and missing == []
+
+
+def test_eviction_by_items_and_chars():
+    store = DocumentStore(max_items=2, max_chars=1000)
+    for text in ("a", "b", "c"):
+        store.put(content_hash(text), text)
+    assert store.resolve([content_hash("a")], {})[1] == [content_hash("a")]
+
+    store = DocumentStore(max_items=10, max_chars=5)
+    store.put(content_hash("abc"), "abc")
+    store.put(content_hash("defg"), "defg")  # 총 7자 > 5자 → 오래된 항목 제거
+    assert store.stats()["items"] == 1 and store.stats()["chars"] == 4
+
+
+def test_token_cache_lru():
+    cache = TokenCache(max_items=2)
+    cache.set("a", [1])
+    cache.set("b", [2])
+    assert cache.get("a") == [1]
+    cache.set("c", [3])
+    assert cache.get("b") is None and cache.get("c") == [3]
+
+    disabled = TokenCache(max_items=0)
+    disabled.set("a", [1])
+    assert disabled.get("a") is None
@@ -0,0 +1,29 @@
+"""RERANKER_MAX_DOC_TOKENS 문서 토큰 윈도우가 model.predict 경로에도 적용되는지 검증"""
+
+import services.reranker
+from tests.stubs import WhitespaceTokenizer
+
+
+def test_predict_path_truncates_documents_to_token_window(service, stub_model, monkeypatch):
+    monkeypatch.setattr(services.reranker, "USE_TOKEN_CACHE", False)
+    monkeypatch.setattr(services.reranker, "MAX_DOC_TOKENS", 2)
+    stub_model.tokenizer = WhitespaceTokenizer()
+
+    service._predict_uncached(["q"] * 3, ["a b c d", "x", "a b c d"])
+    assert sorted(document for _, document in stub_model.calls[0]) == ["a b", "a b", "x"]
+
+
+def test_window_disabled_keeps_documents(service, stub_model, monkeypatch):
+    monkeypatch.setattr(services.reranker, "USE_TOKEN_CACHE", False)
+    monkeypatch.setattr(services.reranker, "MAX_DOC_TOKENS", 0)
+    stub_model.tokenizer = WhitespaceTokenizer()
+
+    service._predict_uncached(["q"], ["a b c d"])
+    assert stub_model.calls[0] == [("q", "a b c d")]
+
+
+def test_model_without_tokenizer_is_untouched(service, stub_model, monkeypatch):
+    monkeypatch.setattr(services.reranker, "MAX_DOC_TOKENS", 2)
+
+    service._predict_uncached(["q"], ["a b c d"])
+    assert stub_model.calls[0] == [("q", "a b c d")]
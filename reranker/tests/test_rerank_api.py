@@ -0,0 +1,115 @@
+"""/rerank, /rerank/batch 엔드포인트 테스트 (스텁 모델, 프로세스 안 ASGI 호출)"""
+
+import asyncio
+
+import httpx
+
+from services.doc_store import content_hash
+
+DOCUMENTS = ["수출 신고 절차", "수입 통관 절차", "선하증권"]
+
+
+def _post(service, path: str, payload: dict) -> httpx.Response:
+    """앱에 요청 1개를 보내고 배치 스케줄러를 정리 (스케줄러 워커는 요청을 처리한 이벤트 루프에 묶임)"""
+    import main
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            try:
+                return await client.post(path, json=payload)
+            finally:
+                await service.scheduler.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_batch_scores_all_groups_in_one_forward_pass(service, stub_model):
+    response = _post(service, "/rerank/batch", {
+        "groups": [
+            {"query": "수출 신고", "documents": DOCUMENTS, "top_k": 1},
+            {"query": "수입 통관", "documents": DOCUMENTS, "top_k": 2},
+        ],
+        "return_documents": True,
+    })
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["query"] for r in results] == ["수출 신고", "수입 통관"]  # groups 순서 유지
+    assert [(r["index"], r["document"]) for r in results[0]["results"]] == [(0, "수출 신고 절차")]
+    assert [r["index"] for r in results[1]["results"]] == [1, 0]
+    assert all(r["total_documents"] == 3 for r in results)
+    assert len(stub_model.calls) == 1 and stub_model.pairs == 6
+
+
+def test_batch_requests_missing_hashes_then_resolves_them(service, stub_model):
+    hashes = [content_hash(document) for document in DOCUMENTS]
+    groups = [{"query": "선하증권", "document_hashes": hashes, "top_k": 1}]
+
+    response = _post(service, "/rerank/batch", {"groups": groups})
+    assert response.status_code == 200
+    assert response.json() == {"results": [], "missing_hashes": hashes}
+    assert stub_model.calls == []
+
+    texts = dict(zip(hashes, DOCUMENTS))
+    response = _post(service, "/rerank/batch", {"groups": groups, "document_texts": texts})
+    assert response.json()["missing_hashes"] == []
+    assert response.json()["results"][0]["results"][0]["index"] == 2
+
+    # 저장된 본문은 다음 요청부터 해시만으로 사용
+    response = _post(service, "/rerank/batch", {"groups": groups})
+    assert response.json()["results"][0]["results"][0]["index"] == 2
+
+
+def test_batch_rejects_empty_group(service):
+    response = _post(service, "/rerank/batch", {
+        "groups": [{"query": "수출", "documents": DOCUMENTS}, {"query": " ", "documents": DOCUMENTS}],
+    })
+    assert response.status_code == 400
+    assert "groups[1]" in response.json()["detail"]
+
+
+def test_batch_not_ready_returns_503_with_retry_after(service, stub_model):
+    service.state = "loading"
+    response = _post(service, "/rerank/batch", {"groups": [{"query": "수출", "documents": DOCUMENTS}]})
+    assert response.status_code == 503
+    assert response.headers["retry-after"]
+    assert stub_model.calls == []
+
+
+def test_batch_over_queue_capacity_is_rejected_whole(service, stub_model):
+    service.scheduler.max_queue_pairs = 4  # 그룹 2개 × 3쌍 = 6쌍 → 일부 그룹만 들어가지 않고 전체 거절
+    response = _post(service, "/rerank/batch", {
+        "groups": [{"query": "수출", "documents": DOCUMENTS}, {"query": "수입", "documents": DOCUMENTS}],
+    })
+    assert response.status_code == 503
+    assert stub_model.calls == []
+    assert service.metrics.rejected["queue_full"] == 1
+
+
+def test_batch_model_error_returns_500(service, stub_model):
+    stub_model.error = RuntimeError("CUDA OOM")
+    response = _post(service, "/rerank/batch", {"groups": [{"query": "수출", "documents": DOCUMENTS}]})
+    assert response.status_code == 500
+    assert "CUDA OOM" in response.json()["detail"]
+
+
+def test_single_rerank_endpoint(service):
+    response = _post(service, "/rerank", {"query": "선하증권", "documents": DOCUMENTS, "top_k": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["index"] for r in body["results"]] == [2, 0]
+    assert body["results"][0]["document"] is None  # return_documents 기본값 False
+
+
+def test_hashed_request_reuses_document_hashes(service, monkeypatch):
+    import services.reranker
+
+    hashes = [content_hash(document) for document in DOCUMENTS]
+    texts = dict(zip(hashes, DOCUMENTS))
+    hashed = []
+    monkeypatch.setattr(services.reranker, "content_hash", lambda text: hashed.append(text) or content_hash(text))
+
+    response = _post(service, "/rerank", {"query": "선하증권", "document_hashes": hashes, "document_texts": texts})
+    assert response.json()["results"][0]["index"] == 2
+    assert hashed == []  # 동일 요청 합치기 키에 요청의 해시를 그대로 사용 (본문 재해싱 없음)
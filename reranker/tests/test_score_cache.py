@@ -0,0 +1,77 @@
+"""ScoreCache 테스트 (쿼리 정규화 / TTL / LRU 상한) + 서비스의 캐시 경유 점수 계산"""
+
+import pytest
+
+import services.reranker
+from services.reranker import ScoreCache, normalize_query
+
+
+def test_normalize_query_collapses_whitespace_and_width():
+    assert normalize_query("  FOB   조건 ") == "FOB 조건"
+    assert normalize_query("ＦＯＢ") == "FOB"  # NFKC
+    assert ScoreCache.make_key("FOB", "doc") != ScoreCache.make_key("FOB", "doc2")
+
+
+@pytest.mark.parametrize("use_cache", [True, False])
+def test_model_scores_the_normalized_query(service, stub_model, monkeypatch, use_cache):
+    monkeypatch.setattr(services.reranker, "USE_SCORE_CACHE", use_cache)
+    service._predict_scores(["  ＦＯＢ   조건 "], ["a"])
+    assert stub_model.calls == [[("FOB 조건", "a")]]  # 캐시 키와 같은 텍스트로 점수 계산
+
+
+def test_get_many_counts_hits_and_misses():
+    cache = ScoreCache(max_items=10, max_mb=1, ttl_seconds=0)
+    a, b = ScoreCache.make_key("q", "a"), ScoreCache.make_key("q", "b")
+    cache.set_many([(a, 0.5)])
+    assert cache.get_many([a, b]) == [0.5, None]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entry_is_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(services.reranker.time, "monotonic", lambda: now[0])
+    cache = ScoreCache(max_items=10, max_mb=1, ttl_seconds=60)
+    key = ScoreCache.make_key("q", "a")
+    cache.set_many([(key, 0.5)])
+
+    now[0] += 59
+    assert cache.get_many([key]) == [0.5]
+    now[0] += 2
+    assert cache.get_many([key]) == [None]
+    assert cache.stats()["items"] == 0
+
+
+def test_lru_eviction_and_memory_cap():
+    cache = ScoreCache(max_items=2, max_mb=1, ttl_seconds=0)
+    a, b, c = (ScoreCache.make_key("q", d) for d in "abc")
+    cache.set_many([(a, 1.0), (b, 2.0)])
+    cache.get_many([a])  # a를 최근 사용으로
+    cache.set_many([(c, 3.0)])
+    assert cache.get_many([a, b, c]) == [1.0, None, 3.0]
+
+    # 메모리 상한이 항목 수 상한보다 작으면 메모리 기준으로 제한
+    assert ScoreCache(max_items=10**9, max_mb=1, ttl_seconds=0).max_items == 1024 * 1024 // ScoreCache.ENTRY_BYTES
+
+
+def test_service_scores_only_uncached_unique_pairs(service, stub_model, monkeypatch):
+    monkeypatch.setattr(services.reranker, "USE_SCORE_CACHE", True)
+
+    first = service._predict_scores(["ab", "ab", "ab"], ["a", "b", "a"])  # 배치 안 중복 쌍은 1번만 계산
+    assert first == [1.0, 1.0, 1.0]
+    assert stub_model.pairs == 2
+
+    second = service._predict_scores([" ab ", "ab"], ["a", "abc"])  # 정규화 쿼리로 적중, 새 문서만 계산
+    assert second == [1.0, 2.0]
+    assert stub_model.pairs == 3
+    assert service.score_cache.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("bucketing", [True, False])
+def test_predict_uncached_restores_order_across_batches(service, stub_model, monkeypatch, bucketing):
+    monkeypatch.setattr(services.reranker, "MAX_BATCH_PAIRS", 2)
+    monkeypatch.setattr(services.reranker, "LENGTH_BUCKETING", bucketing)
+    documents = ["abcd", "a", "abc", "ab", "x"]
+
+    scores = service._predict_uncached(["abcd"] * len(documents), documents)
+    assert scores == [4.0, 1.0, 3.0, 2.0, 0.0]
+    assert [len(call) for call in stub_model.calls] == [2, 2, 1]
@@ -0,0 +1,51 @@
+"""
+문서 토큰 캐시 경로(_encode_pairs + forward)와 model.predict의 점수 일치 검증
+
+실제 모델이 필요하므로 RERANKER_PARITY_MODEL에 모델 이름(예: mixedbread-ai/mxbai-rerank-base-v2)을 지정하고
+torch / mxbai-rerank가 설치된 환경에서만 실행됩니다 (그 외에는 skip).
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import services.reranker
+from services.reranker import RerankerService
+
+PARITY_MODEL = os.getenv("RERANKER_PARITY_MODEL")
+
+pytestmark = pytest.mark.skipif(not PARITY_MODEL, reason="RERANKER_PARITY_MODEL 미설정 (실제 모델 필요)")
+
+
+class _TokenCachePath:
+    """score_parity에 넘길 수 있도록 토큰 캐시 경로를 predict 인터페이스로 감쌈"""
+
+    def __init__(self, service: RerankerService):
+        self.service = service
+
+    def predict(self, queries, documents):
+        return np.asarray(self.service._predict_uncached(queries, documents))
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch = pytest.importorskip("torch")
+    mxbai_rerank = pytest.importorskip("mxbai_rerank")
+    return mxbai_rerank.MxbaiRerankV2(PARITY_MODEL, device="cpu", torch_dtype=torch.float32)
+
+
+def test_token_cache_path_matches_model_predict(model, monkeypatch):
+    from export_onnx import parity_pairs
+    from services.backends import score_parity
+
+    monkeypatch.setattr(services.reranker, "USE_TOKEN_CACHE", True)
+    monkeypatch.setattr(services.reranker, "MAX_DOC_TOKENS", 0)  # 문서 토큰 윈도우 없이 같은 입력이어야 함
+    service = RerankerService()
+    service.model = model
+
+    queries, documents = parity_pairs()
+    for _ in range(2):  # 두 번째는 토큰 캐시 적중 경로
+        report = score_parity(model, _TokenCachePath(service), queries, documents)
+        assert report["max_abs_diff"] < 1e-3, report
+        assert report["top1_agreement"] == 1.0, report
@@ -0,0 +1,74 @@
+"""WorkerPool 테스트 (타임아웃 / 워커 프로세스 종료 감지 및 재시작, 스텁 워커 프로세스 사용)"""
+
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from services.worker_pool import WorkerPool
+from tests.stubs import stub_worker_main
+
+
+def _wait_until(condition, timeout: float = 30) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**kwargs) -> WorkerPool:
+        pool = WorkerPool(1, devices="cpu", worker_target=stub_worker_main, **kwargs)
+        pool.start()
+        pools.append(pool)
+        assert pool.wait_ready(30)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.stop()
+
+
+def test_predict_returns_worker_scores(make_pool):
+    pool = make_pool(timeout=30)
+    assert pool.predict(["q", "q"], ["ab", "abc"]) == [2.0, 3.0]
+    assert pool.stats()["workers"][0]["completed"] == 1
+
+
+def test_timeout_restarts_hung_worker(make_pool):
+    pool = make_pool(timeout=0.5)
+    with pytest.raises(FutureTimeoutError):
+        pool.predict(["q"], ["hang"])
+
+    # 응답 없는 워커는 pending을 유지한 채 종료되고, 감시 스레드가 정리 후 새 프로세스로 교체
+    assert _wait_until(lambda: pool.stats()["workers"][0]["restarts"] == 1)
+    assert _wait_until(pool.is_ready)
+    worker = pool.stats()["workers"][0]
+    assert worker["pending"] == 0 and worker["failed"] == 1
+    assert pool.predict(["q"], ["ab"]) == [2.0]
+
+
+def test_dead_worker_fails_pending_batch_immediately_and_restarts(make_pool):
+    pool = make_pool(timeout=30, max_restarts=1)
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="프로세스가 종료"):
+        pool.predict(["q"], ["crash"])
+    assert time.monotonic() - started < 10  # 30초 타임아웃을 기다리지 않음
+
+    assert _wait_until(pool.is_ready)  # 감시 스레드가 새 프로세스를 띄움
+    assert pool.predict(["q"], ["ab"]) == [2.0]
+    worker = pool.stats()["workers"][0]
+    assert worker["restarts"] == 1 and worker["pending"] == 0
+
+    # 재시작 한도를 넘으면 교체하지 않음
+    with pytest.raises(RuntimeError):
+        pool.predict(["q"], ["crash"])
+    assert _wait_until(lambda: not pool.any_alive(), timeout=5)
+    time.sleep(1)
+    assert not pool.any_alive() and pool.stats()["workers"][0]["restarts"] == 1